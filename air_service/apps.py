@@ -7,3 +7,7 @@ class AirServiceConfig(AppConfig):
 
     def ready(self):
         import air_service.signals
+        import air_service.throttling
+        from air_service.db_pool import register_pool_metrics
+
+        register_pool_metrics()
@@ -0,0 +1,331 @@
+"""
+Async (ASGI) variants of the busiest read endpoints.
+
+DRF views are synchronous, so these are plain Django async views that reuse
+the DRF authentication, permission, filter and serializer classes. With a
+connection pool (PostgreSQL and ``DATABASE_POOL``), queries that do not
+depend on each other run concurrently, each in its own worker thread and
+pooled connection. Without one they run one after another on the request's
+connection, since a connection per query costs more than the overlap saves.
+"""
+import asyncio
+import math
+from functools import wraps
+from types import SimpleNamespace
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import Count
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from rest_framework import exceptions
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from air_service import availability
+from air_service.filters import FlightFilter, RouteFilter
+from air_service.models import Flight, Route, Ticket
+from air_service.ordering import AirServiceOrdering
+from air_service.response_cache import cache_response
+from air_service.serializers import (
+    FlightListSerializer,
+    FlightRetrieveSerializer,
+    RouteListSerializer,
+)
+from air_service.table_versions import add_validators, validators
+from air_service.views import FlightViewSet, RouteViewSet
+
+
+class PrefetchedFlightRetrieveSerializer(FlightRetrieveSerializer):
+    def get_tickets(self, obj) -> list[tuple[int, int]]:
+        return self.context["tickets"]
+
+
+def render(data, status: int = 200) -> HttpResponse:
+    return HttpResponse(
+        JSONRenderer().render(data), status=status, content_type="application/json"
+    )
+
+
+def error_response(error: exceptions.APIException) -> HttpResponse:
+    response = render({"detail": error.detail}, error.status_code)
+    if isinstance(error, exceptions.NotAuthenticated | exceptions.AuthenticationFailed):
+        response["WWW-Authenticate"] = 'Bearer realm="api"'
+    return response
+
+
+def pooled() -> bool:
+    return "pool" in connections[DEFAULT_DB_ALIAS].settings_dict.get("OPTIONS", {})
+
+
+async def gather_queries(*funcs):
+    """
+    Run blocking ORM callables, concurrently on pooled connections if there
+    is a pool, otherwise in turn on the thread-sensitive connection.
+    """
+    if not pooled():
+        return await sync_to_async(lambda: [func() for func in funcs])()
+
+    def isolated(func):
+        def run():
+            try:
+                return func()
+            finally:
+                connections.close_all()
+
+        return sync_to_async(run, thread_sensitive=False)()
+
+    return await asyncio.gather(*(isolated(func) for func in funcs))
+
+
+def authenticated(throttle_scope: str | None = None):
+    """Apply the DRF default authentication, permission and throttle classes."""
+    throttled_view = SimpleNamespace(throttle_scope=throttle_scope)
+
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            request.user, request.auth = AnonymousUser(), None
+            try:
+                for authentication_class in api_settings.DEFAULT_AUTHENTICATION_CLASSES:
+                    result = await sync_to_async(authentication_class().authenticate)(
+                        request
+                    )
+                    if result is not None:
+                        request.user, request.auth = result
+                        break
+            except exceptions.APIException as error:
+                return error_response(error)
+
+            for permission_class in api_settings.DEFAULT_PERMISSION_CLASSES:
+                if not permission_class().has_permission(request, None):
+                    if not request.user.is_authenticated:
+                        return error_response(exceptions.NotAuthenticated())
+                    return error_response(exceptions.PermissionDenied())
+
+            for throttle_class in api_settings.DEFAULT_THROTTLE_CLASSES:
+                throttle = throttle_class()
+                allowed = await sync_to_async(throttle.allow_request)(
+                    request, throttled_view
+                )
+                if not allowed:
+                    wait = throttle.wait()
+                    response = error_response(exceptions.Throttled(wait))
+                    if wait is not None:
+                        response["Retry-After"] = str(math.ceil(wait))
+                    return response
+
+            return await view(request, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def conditional(models):
+    """
+    ``ConditionalGetMixin`` for async views: answer with 304 when the
+    client's validators match the versions of ``models``. Goes outside of
+    ``cache_response``, which then keys on the ETag.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            # The views only render JSON, so these match the DRF views' ones.
+            etag, last_modified = await sync_to_async(validators)(models, "json")
+            request.cache_variant = etag
+            response = get_conditional_response(
+                request, etag=etag, last_modified=last_modified
+            )
+            if response is None or response.status_code != 304:
+                response = await view(request, *args, **kwargs)
+            return add_validators(response, etag, last_modified)
+
+        return wrapper
+
+    return decorator
+
+
+def page_number(request) -> int:
+    try:
+        number = int(request.GET.get("page", 1))
+    except ValueError:
+        raise exceptions.NotFound("Invalid page.")
+    if number < 1:
+        raise exceptions.NotFound("Invalid page.")
+    return number
+
+
+def paginated(request, number: int, count: int, results: list) -> HttpResponse:
+    page_size = settings.REST_FRAMEWORK["PAGE_SIZE"]
+    if number > 1 and (number - 1) * page_size >= count:
+        return error_response(exceptions.NotFound("Invalid page."))
+
+    url = request.build_absolute_uri()
+    next_url = previous_url = None
+    if number * page_size < count:
+        next_url = replace_query_param(url, "page", number + 1)
+    if number == 2:
+        previous_url = remove_query_param(url, "page")
+    elif number > 2:
+        previous_url = replace_query_param(url, "page", number - 1)
+    return render(
+        {
+            "count": count,
+            "next": next_url,
+            "previous": previous_url,
+            "results": results,
+        }
+    )
+
+
+def ordered(request, queryset, fields):
+    ordering = AirServiceOrdering.get_ordering_fields(Request(request), list(fields))
+    # pk breaks ties, so queries slicing the same page agree on its rows.
+    if "pk" not in ordering and "-pk" not in ordering:
+        ordering.append("pk")
+    return queryset.order_by(*ordering)
+
+
+@authenticated(throttle_scope="flight_search")
+@cache_response(60 * 15)
+async def flight_list(request):
+    filterset = FlightFilter(request.GET, queryset=Flight.objects.all(), request=request)
+    if not filterset.is_valid():
+        return render(filterset.errors, 400)
+    try:
+        number = page_number(request)
+    except exceptions.NotFound as error:
+        return error_response(error)
+
+    page_size = settings.REST_FRAMEWORK["PAGE_SIZE"]
+    offset = (number - 1) * page_size
+    flights = ordered(request, filterset.qs, FlightViewSet.ordering_fields)
+    page = flights[offset:offset + page_size]
+
+    # Availability is counted for the page's flights in a separate query,
+    # so the row query does not join and group all tickets.
+    count, rows, sold = await gather_queries(
+        flights.count,
+        lambda: list(page.select_related()),
+        lambda: dict(
+            Ticket.objects.filter(flight__in=page.values("pk"))
+            .values("flight")
+            .annotate(sold=Count("pk"))
+            .values_list("flight", "sold")
+        ),
+    )
+    for flight in rows:
+        flight.tickets_available = (
+            flight.airplane.rows * flight.airplane.seats_in_row - sold.get(flight.pk, 0)
+        )
+    return paginated(
+        request, number, count, FlightListSerializer(rows, many=True).data
+    )
+
+
+@authenticated()
+async def flight_detail(request, pk: int):
+    flight, tickets = await gather_queries(
+        lambda: Flight.objects.select_related().filter(pk=pk).first(),
+        lambda: list(Ticket.objects.filter(flight_id=pk).values_list("seat", "row")),
+    )
+    if flight is None:
+        return error_response(exceptions.NotFound("No Flight matches the given query."))
+    return render(
+        PrefetchedFlightRetrieveSerializer(flight, context={"tickets": tickets}).data
+    )
+
+
+@authenticated()
+@conditional(RouteViewSet.version_models)
+@cache_response(60 * 15)
+async def route_list(request):
+    filterset = RouteFilter(request.GET, queryset=Route.objects.all(), request=request)
+    if not filterset.is_valid():
+        return render(filterset.errors, 400)
+    try:
+        number = page_number(request)
+    except exceptions.NotFound as error:
+        return error_response(error)
+
+    page_size = settings.REST_FRAMEWORK["PAGE_SIZE"]
+    offset = (number - 1) * page_size
+    routes = ordered(request, filterset.qs, RouteViewSet.ordering_fields)
+    count, rows = await gather_queries(
+        routes.count,
+        lambda: list(routes.select_related()[offset:offset + page_size]),
+    )
+    return paginated(request, number, count, RouteListSerializer(rows, many=True).data)
+
+
+def flight_ids(request) -> list[int]:
+    values = request.GET.get("flights", "").split(",")
+    try:
+        ids = list(dict.fromkeys(int(value) for value in values))
+    except ValueError:
+        raise exceptions.ValidationError(
+            {"flights": "A comma-separated list of flight ids is required."}
+        )
+    if len(ids) > settings.AVAILABILITY_STREAM_MAX_FLIGHTS:
+        raise exceptions.ValidationError(
+            {
+                "flights": "At most "
+                f"{settings.AVAILABILITY_STREAM_MAX_FLIGHTS} flights per stream."
+            }
+        )
+    return ids
+
+
+async def availability_events(ids: list[int]):
+    hub = availability.get_hub()
+    subscription, events = await hub.subscribe(ids)
+    try:
+        for event in events:
+            yield event
+        while True:
+            try:
+                event = await asyncio.wait_for(
+                    subscription.queue.get(),
+                    settings.AVAILABILITY_STREAM_HEARTBEAT,
+                )
+            except TimeoutError:
+                # Keeps proxies from closing the idle connection.
+                yield b": keepalive\n\n"
+                continue
+            if event is None or subscription.closed:
+                return
+            yield event
+    finally:
+        hub.unsubscribe(subscription)
+
+
+@authenticated()
+async def flight_availability(request):
+    """
+    Server-sent events with the free seats of ``?flights=1,2,3``: one event
+    per flight with every taken seat, then one per sold or released seat.
+    """
+    try:
+        ids = flight_ids(request)
+    except exceptions.ValidationError as error:
+        return render(error.detail, 400)
+
+    existing = [
+        pk async for pk in Flight.objects.filter(pk__in=ids).values_list("pk", flat=True)
+    ]
+    if not existing:
+        return error_response(exceptions.NotFound("No Flight matches the given query."))
+
+    response = StreamingHttpResponse(
+        availability_events(existing), content_type="text/event-stream"
+    )
+    response["Cache-Control"] = "no-cache"
+    # nginx would otherwise buffer the stream.
+    response["X-Accel-Buffering"] = "no"
+    return response
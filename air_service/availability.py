@@ -0,0 +1,232 @@
+"""
+Seat availability pushed to subscribed clients.
+
+Ticket creations and deletions are published once committed: on the Redis
+channel ``CHANNEL`` with Redis, or straight to this process's hub without it
+(enough for runserver and tests, where everything runs in one process).
+
+Each ASGI process runs one ``AvailabilityHub``. It keeps the sold seats of
+the flights its clients watch, loaded once when the first client subscribes
+and updated from the published changes, and fans every change out to the
+subscribed streams as one pre-encoded event. An idle stream is a coroutine
+waiting on its queue, so a process holds thousands of them.
+"""
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from functools import lru_cache
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import F
+
+from air_service.models import Flight, Ticket
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "flight-availability"
+
+
+def publish(flight_id: int, seat: int, row: int, sold: bool):
+    message = {"flight": flight_id, "seat": seat, "row": row, "sold": sold}
+    if settings.USE_REDIS:
+        from django_redis import get_redis_connection
+
+        get_redis_connection("default").publish(CHANNEL, json.dumps(message))
+    else:
+        get_hub().dispatch_threadsafe(message)
+
+
+def encode_event(data: dict) -> bytes:
+    return f"event: availability\ndata: {json.dumps(data)}\n\n".encode()
+
+
+def load_flights(flight_ids) -> dict[int, tuple[int, set]]:
+    """``{flight_id: (seat count, {(seat, row), ...})}`` of existing flights."""
+    capacities = Flight.objects.filter(pk__in=flight_ids).values_list(
+        "pk", F("airplane__rows") * F("airplane__seats_in_row")
+    )
+    sold = defaultdict(set)
+    for flight_id, seat, row in Ticket.objects.filter(
+        flight_id__in=flight_ids
+    ).values_list("flight_id", "seat", "row"):
+        sold[flight_id].add((seat, row))
+    return {
+        flight_id: (capacity, sold[flight_id]) for flight_id, capacity in capacities
+    }
+
+
+class Subscription:
+    def __init__(self, flight_ids):
+        self.flight_ids = flight_ids
+        self.queue = asyncio.Queue(settings.AVAILABILITY_STREAM_QUEUE_SIZE)
+        self.closed = False
+
+    def put(self, event: bytes | None):
+        if self.closed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Too slow to keep up: end the stream, the client reconnects and
+            # starts again from a snapshot.
+            self.closed = True
+
+    def close(self):
+        self.put(None)
+        self.closed = True
+
+
+class FlightState:
+    def __init__(self):
+        self.capacity = None
+        self.sold = set()
+        self.subscribers = set()
+        self.ready = asyncio.Event()
+        # Changes published while the snapshot loads, applied after it.
+        self.pending = []
+
+    @property
+    def available(self) -> int:
+        return self.capacity - len(self.sold)
+
+    def apply(self, message: dict) -> bool:
+        seat = (message["seat"], message["row"])
+        if message["sold"] == (seat in self.sold):
+            return False
+        if message["sold"]:
+            self.sold.add(seat)
+        else:
+            self.sold.discard(seat)
+        return True
+
+    def snapshot_event(self, flight_id: int) -> bytes:
+        return encode_event(
+            {
+                "flight": flight_id,
+                "tickets_available": self.available,
+                "taken": sorted(self.sold),
+            }
+        )
+
+
+class AvailabilityHub:
+    def __init__(self):
+        self.loop = None
+        self.listener = None
+        self.flights: dict[int, FlightState] = {}
+
+    def bind(self):
+        loop = asyncio.get_running_loop()
+        if self.loop is not loop:
+            self.loop, self.listener, self.flights = loop, None, {}
+        if settings.USE_REDIS and self.listener is None:
+            self.listener = loop.create_task(self.listen())
+
+    async def subscribe(self, flight_ids) -> tuple[Subscription, list[bytes]]:
+        """Register a stream, returns it with the current state as events."""
+        self.bind()
+        subscription = Subscription(flight_ids)
+        loading = {}
+        for flight_id in flight_ids:
+            state = self.flights.get(flight_id)
+            if state is None:
+                state = loading[flight_id] = self.flights[flight_id] = FlightState()
+            state.subscribers.add(subscription)
+
+        if loading:
+            try:
+                snapshot = await sync_to_async(load_flights)(list(loading))
+            except BaseException:
+                for state in loading.values():
+                    state.pending = None
+                self.unsubscribe(subscription)
+                raise
+            finally:
+                for state in loading.values():
+                    state.ready.set()
+            for flight_id, state in loading.items():
+                state.capacity, state.sold = snapshot.get(flight_id, (None, set()))
+                for message in state.pending:
+                    state.apply(message)
+                state.pending = None
+
+        events = []
+        for flight_id in flight_ids:
+            state = self.flights.get(flight_id)
+            if state is None:
+                continue
+            await state.ready.wait()
+            if state.capacity is not None:
+                events.append(state.snapshot_event(flight_id))
+        return subscription, events
+
+    def unsubscribe(self, subscription: Subscription):
+        for flight_id in subscription.flight_ids:
+            state = self.flights.get(flight_id)
+            if state is None:
+                continue
+            state.subscribers.discard(subscription)
+            if not state.subscribers:
+                del self.flights[flight_id]
+
+    def dispatch(self, message: dict):
+        state = self.flights.get(message["flight"])
+        if state is None:
+            return
+        if state.pending is not None:
+            state.pending.append(message)
+            return
+        if state.capacity is None or not state.apply(message):
+            return
+        seats = [[message["seat"], message["row"]]]
+        event = encode_event(
+            {
+                "flight": message["flight"],
+                "tickets_available": state.available,
+                "taken" if message["sold"] else "released": seats,
+            }
+        )
+        for subscription in state.subscribers:
+            subscription.put(event)
+
+    def dispatch_threadsafe(self, message: dict):
+        if self.loop is None or self.loop.is_closed():
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self.loop:
+            self.dispatch(message)
+        else:
+            self.loop.call_soon_threadsafe(self.dispatch, message)
+
+    def reset(self):
+        """Drop every stream, their clients reconnect from a new snapshot."""
+        for state in self.flights.values():
+            for subscription in state.subscribers:
+                subscription.close()
+        self.flights = {}
+
+    async def listen(self):
+        import redis.asyncio as aioredis
+
+        client = aioredis.from_url(settings.CACHES["default"]["LOCATION"])
+        while True:
+            try:
+                async with client.pubsub(ignore_subscribe_messages=True) as pubsub:
+                    await pubsub.subscribe(CHANNEL)
+                    async for message in pubsub.listen():
+                        self.dispatch(json.loads(message["data"]))
+            except aioredis.ConnectionError:
+                logger.warning("Lost the availability channel, reconnecting")
+                # Changes published meanwhile are lost.
+                self.reset()
+                await asyncio.sleep(1)
+
+
+@lru_cache
+def get_hub() -> AvailabilityHub:
+    return AvailabilityHub()
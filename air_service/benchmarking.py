@@ -0,0 +1,196 @@
+import http.client
+import json
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from urllib.parse import urlsplit
+
+QUERY_COUNT_HEADER = "X-Query-Count"
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of ``values`` (``pct`` in 0..100)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(math.ceil(pct / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+@dataclass
+class Sample:
+    latency: float
+    status: int
+    queries: int | None = None
+
+
+@dataclass
+class Summary:
+    requests: int
+    errors: int
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    mean_ms: float
+    max_ms: float
+    throughput_rps: float
+    queries_per_request: float | None = None
+
+    @classmethod
+    def from_samples(cls, samples: list[Sample], elapsed: float) -> "Summary":
+        latencies = [sample.latency * 1000 for sample in samples]
+        queries = [sample.queries for sample in samples if sample.queries is not None]
+        return cls(
+            requests=len(samples),
+            errors=sum(1 for sample in samples if sample.status >= 400),
+            p50_ms=round(percentile(latencies, 50), 2),
+            p95_ms=round(percentile(latencies, 95), 2),
+            p99_ms=round(percentile(latencies, 99), 2),
+            mean_ms=round(sum(latencies) / len(latencies), 2) if latencies else 0.0,
+            max_ms=round(max(latencies, default=0.0), 2),
+            throughput_rps=round(len(samples) / elapsed, 2) if elapsed else 0.0,
+            queries_per_request=(
+                round(sum(queries) / len(queries), 2) if queries else None
+            ),
+        )
+
+    def as_dict(self) -> dict:
+        return dict(self.__dict__)
+
+
+@dataclass
+class HttpRequest:
+    method: str
+    path: str
+    body: dict | None = None
+    headers: dict = field(default_factory=dict)
+
+
+class HttpClient:
+    """
+    Keep-alive HTTP client with one connection per calling thread.
+    """
+
+    def __init__(self, base_url: str, headers: dict | None = None, timeout: float = 30):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or (443 if parts.scheme == "https" else 80)
+        self.connection_class = (
+            http.client.HTTPSConnection
+            if parts.scheme == "https"
+            else http.client.HTTPConnection
+        )
+        self.prefix = parts.path.rstrip("/")
+        self.headers = headers or {}
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self) -> http.client.HTTPConnection:
+        if getattr(self._local, "connection", None) is None:
+            self._local.connection = self.connection_class(
+                self.host, self.port, timeout=self.timeout
+            )
+        return self._local.connection
+
+    def send(self, request: HttpRequest) -> Sample:
+        headers = {**self.headers, **request.headers}
+        body = None
+        if request.body is not None:
+            body = json.dumps(request.body)
+            headers["Content-Type"] = "application/json"
+
+        started = time.perf_counter()
+        try:
+            connection = self._connection()
+            connection.request(
+                request.method, self.prefix + request.path, body=body, headers=headers
+            )
+            response = connection.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException):
+            self._local.connection = None
+            return Sample(time.perf_counter() - started, 599)
+
+        queries = response.getheader(QUERY_COUNT_HEADER)
+        return Sample(
+            time.perf_counter() - started,
+            response.status,
+            int(queries) if queries is not None else None,
+        )
+
+
+def run_load(send, requests: list, concurrency: int) -> Summary:
+    """Issue ``requests`` through ``send`` from ``concurrency`` threads."""
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(concurrency, 1)) as executor:
+        samples = list(executor.map(send, requests))
+    return Summary.from_samples(samples, time.perf_counter() - started)
+
+
+def compare_to_baseline(
+    results: dict[str, dict],
+    baseline: dict[str, dict],
+    tolerance: float,
+) -> list[str]:
+    """
+    Return human readable regressions of ``results`` against ``baseline``.
+
+    Latency may grow by ``tolerance`` (a fraction) before it is reported,
+    query counts may not grow at all.
+    """
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        for metric in ("p50_ms", "p95_ms", "p99_ms"):
+            if current[metric] > previous[metric] * (1 + tolerance):
+                regressions.append(
+                    f"{name}: {metric} {previous[metric]} -> {current[metric]}"
+                )
+        before = previous.get("queries_per_request")
+        after = current.get("queries_per_request")
+        if before is not None and after is not None and after > before:
+            regressions.append(
+                f"{name}: queries_per_request {before} -> {after}"
+            )
+        if current["errors"] > previous.get("errors", 0):
+            regressions.append(
+                f"{name}: errors {previous.get('errors', 0)} -> {current['errors']}"
+            )
+    return regressions
+
+
+def process_tree_rss(pid: int) -> float | None:
+    """Resident memory in MB of ``pid`` and all its descendants (Linux only)."""
+    children = {}
+    try:
+        for entry in os.listdir("/proc"):
+            if not entry.isdigit():
+                continue
+            try:
+                with open(f"/proc/{entry}/stat") as stat:
+                    # The command name may contain spaces, fields after it don't.
+                    parent = int(stat.read().rsplit(")", 1)[1].split()[1])
+            except (OSError, IndexError, ValueError):
+                continue
+            children.setdefault(parent, []).append(int(entry))
+    except OSError:
+        return None
+
+    total_kb = 0
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        pending.extend(children.get(current, []))
+        try:
+            with open(f"/proc/{current}/status") as status:
+                for line in status:
+                    if line.startswith("VmRSS:"):
+                        total_kb += int(line.split()[1])
+        except OSError:
+            continue
+    return round(total_kb / 1024, 1)
@@ -0,0 +1,315 @@
+"""
+Bulk create and upsert for catalogue viewsets.
+
+``POST <list url>/bulk/`` creates a list of rows and ``PUT <list url>/bulk/``
+upserts them: rows with an ``id`` replace that object, rows without one are
+created. Rows are validated with the viewset's write serializer, except for
+the checks that would query per row, which run once for the whole payload:
+
+* existence of the ``id`` of updated rows, one ``IN`` query,
+* existence of related objects, one ``IN`` query per related model,
+* unique fields and constraints, one query per unique set, plus duplicates
+  inside the payload,
+* for flights, airplanes booked on overlapping flights, see
+  ``air_service.overlaps``.
+
+Valid rows are written with ``bulk_create``/``bulk_update`` and the response
+lists one result per row, in order: ``{"status": 201, "id": 1}`` or
+``{"status": 400, "errors": {...}}``. It is a 207 when only some rows were
+written.
+"""
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q, UniqueConstraint
+from rest_framework import serializers, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.validators import UniqueValidator
+
+from air_service import occupancy, overlaps, reference_data, table_versions
+from air_service.models import Flight
+
+
+def row_serializer(serializer_class):
+    """
+    ``serializer_class`` with relations as plain ids and without unique
+    validators or flight overlap checks, which BulkWriter replaces by
+    set-wise checks.
+    """
+
+    class RowSerializer(serializer_class):
+        check_overlaps = False
+
+        class Meta(serializer_class.Meta):
+            validators = []
+
+        def build_relational_field(self, field_name, relation_info):
+            _, kwargs = super().build_relational_field(field_name, relation_info)
+            kwargs = {
+                key: value
+                for key, value in kwargs.items()
+                if key in ("required", "allow_null", "read_only", "label", "help_text")
+            }
+            return serializers.IntegerField, {"min_value": 1, **kwargs}
+
+        def build_standard_field(self, field_name, model_field):
+            field_class, kwargs = super().build_standard_field(field_name, model_field)
+            if "validators" in kwargs:
+                kwargs["validators"] = [
+                    validator
+                    for validator in kwargs["validators"]
+                    if not isinstance(validator, UniqueValidator)
+                ]
+            return field_class, kwargs
+
+    RowSerializer.__name__ = f"Bulk{serializer_class.__name__}"
+    return RowSerializer
+
+
+class BulkWriter:
+    def __init__(self, serializer_class, upsert: bool):
+        self.serializer_class = row_serializer(serializer_class)
+        self.model = serializer_class.Meta.model
+        self.upsert = upsert
+
+    def write(self, rows: list) -> list[dict]:
+        self.results = [{} for _ in rows]
+        self.valid: dict[int, dict] = {}
+        self.ids: dict[int, int] = {}
+        for index, row in enumerate(rows):
+            self.validate_row(index, row)
+        if self.upsert:
+            self.check_ids()
+        self.check_relations()
+        self.check_unique()
+        if self.model is Flight:
+            self.check_overlaps()
+        self.save()
+        return self.results
+
+    def fail(self, index: int, field: str, message: str):
+        self.valid.pop(index, None)
+        self.ids.pop(index, None)
+        result = self.results[index]
+        result["status"] = status.HTTP_400_BAD_REQUEST
+        result.setdefault("errors", {}).setdefault(field, []).append(message)
+
+    def validate_row(self, index: int, row):
+        if not isinstance(row, dict):
+            self.fail(index, "non_field_errors", "Expected an object.")
+            return
+        if self.upsert and row.get("id") is not None:
+            try:
+                self.ids[index] = serializers.IntegerField(min_value=1).run_validation(
+                    row["id"]
+                )
+            except ValidationError as error:
+                self.results[index] = {
+                    "status": status.HTTP_400_BAD_REQUEST,
+                    "errors": {"id": error.detail},
+                }
+                return
+
+        serializer = self.serializer_class(data=row)
+        if not serializer.is_valid():
+            self.ids.pop(index, None)
+            self.results[index] = {
+                "status": status.HTTP_400_BAD_REQUEST,
+                "errors": serializer.errors,
+            }
+            return
+        attrs = dict(serializer.validated_data)
+        normalize = getattr(self.model, "normalize_name", None)
+        if normalize is not None and "name" in attrs:
+            attrs["name"] = normalize(attrs["name"])
+        self.valid[index] = attrs
+
+    def check_ids(self):
+        found = set(
+            self.model.objects.filter(pk__in=set(self.ids.values())).values_list(
+                "pk", flat=True
+            )
+        )
+        for index, pk in list(self.ids.items()):
+            if pk not in found:
+                self.fail(index, "id", "Not found.")
+
+    def relation_fields(self) -> list:
+        return [
+            field
+            for field in self.model._meta.concrete_fields
+            if field.is_relation and field.name in self.serializer_class().fields
+        ]
+
+    def check_relations(self):
+        by_model = {}
+        for field in self.relation_fields():
+            by_model.setdefault(field.related_model, []).append(field)
+        for related_model, fields in by_model.items():
+            ids = {
+                attrs[field.name]
+                for attrs in self.valid.values()
+                for field in fields
+                if attrs.get(field.name) is not None
+            }
+            found = set(
+                related_model.objects.filter(pk__in=ids).values_list("pk", flat=True)
+            )
+            for index, attrs in list(self.valid.items()):
+                for field in fields:
+                    pk = attrs.get(field.name)
+                    if pk is not None and pk not in found:
+                        self.fail(
+                            index,
+                            field.name,
+                            f'Invalid pk "{pk}" - object does not exist.',
+                        )
+
+    def unique_sets(self) -> list[tuple[str, ...]]:
+        meta = self.model._meta
+        writable = set(self.serializer_class().fields)
+        sets = [
+            (field.name,)
+            for field in meta.concrete_fields
+            if field.unique and not field.primary_key
+        ]
+        sets += [
+            tuple(constraint.fields)
+            for constraint in meta.constraints
+            if isinstance(constraint, UniqueConstraint)
+            and constraint.fields
+            and constraint.condition is None
+        ]
+        sets += [tuple(fields) for fields in meta.unique_together]
+        return [fields for fields in sets if writable.issuperset(fields)]
+
+    def check_unique(self):
+        meta = self.model._meta
+        for fields in self.unique_sets():
+            attnames = [meta.get_field(name).attname for name in fields]
+            keys = {
+                index: tuple(attrs[name] for name in fields)
+                for index, attrs in self.valid.items()
+            }
+            lookups = {
+                f"{attname}__in": {key[position] for key in keys.values()}
+                for position, attname in enumerate(attnames)
+            }
+            existing = {
+                tuple(row[1:]): row[0]
+                for row in self.model.objects.filter(**lookups).values_list(
+                    "pk", *attnames
+                )
+            }
+            field = fields[0] if len(fields) == 1 else "non_field_errors"
+            seen = {}
+            for index, key in keys.items():
+                if key in seen:
+                    self.fail(index, field, f"Duplicate of row {seen[key]}.")
+                    continue
+                seen[key] = index
+                pk = existing.get(key)
+                if pk is not None and pk != self.ids.get(index):
+                    self.fail(
+                        index,
+                        field,
+                        f"{meta.verbose_name} with this {', '.join(fields)} "
+                        "already exists.",
+                    )
+
+    def check_overlaps(self):
+        found = overlaps.conflicts(
+            {
+                index: (
+                    attrs["airplane"],
+                    attrs["departure_time"],
+                    attrs["arrival_time"],
+                )
+                for index, attrs in self.valid.items()
+            },
+            # Updated flights are checked with their new times.
+            exclude=Q(pk__in=self.ids.values()),
+        )
+        for index, reason in found.items():
+            self.fail(index, "airplane", reason)
+
+    def instance(self, attrs: dict, pk=None):
+        values = {
+            self.model._meta.get_field(name).attname: value
+            for name, value in attrs.items()
+        }
+        return self.model(pk=pk, **values)
+
+    def save(self):
+        creates = {
+            index: self.instance(attrs)
+            for index, attrs in self.valid.items()
+            if index not in self.ids
+        }
+        updates = {
+            index: self.instance(attrs, self.ids[index])
+            for index, attrs in self.valid.items()
+            if index in self.ids
+        }
+        batch_size = settings.BULK_BATCH_SIZE
+        with transaction.atomic():
+            self.model.objects.bulk_create(creates.values(), batch_size=batch_size)
+            if updates:
+                fields = {name for attrs in self.valid.values() for name in attrs}
+                self.model.objects.bulk_update(
+                    updates.values(), list(fields), batch_size=batch_size
+                )
+            ids = [instance.pk for instance in [*creates.values(), *updates.values()]]
+            if ids:
+                written(self.model, ids)
+
+        for index, instance in creates.items():
+            self.results[index] = {"status": status.HTTP_201_CREATED, "id": instance.pk}
+        for index, instance in updates.items():
+            self.results[index] = {"status": status.HTTP_200_OK, "id": instance.pk}
+
+
+def written(model, ids: list[int]):
+    """What the save and delete signals would do for bulk-written rows."""
+    if model in table_versions.TRACKED_MODELS:
+        table_versions.bump(model)
+        reference_data.record_changes(model, ids)
+    if model is Flight:
+        occupancy.flights_changed(ids)
+
+
+class BulkWriteMixin:
+    @action(detail=False, methods=["POST", "PUT"], url_path="bulk")
+    def bulk(self, request):
+        """Create (POST) or upsert (PUT) a list of rows, see air_service.bulk."""
+        rows = request.data
+        if not isinstance(rows, list):
+            raise ValidationError({"non_field_errors": ["Expected a list of rows."]})
+        if len(rows) > settings.BULK_MAX_ROWS:
+            raise ValidationError(
+                {"non_field_errors": [f"At most {settings.BULK_MAX_ROWS} rows."]}
+            )
+
+        writer = BulkWriter(self.get_serializer_class(), request.method == "PUT")
+        try:
+            results = writer.write(rows)
+        except IntegrityError:
+            # A concurrent write took a unique value after the checks.
+            return Response(
+                {"detail": "Conflicting concurrent write, retry the request."},
+                status=status.HTTP_409_CONFLICT,
+            )
+
+        failed = sum(
+            result["status"] == status.HTTP_400_BAD_REQUEST for result in results
+        )
+        if failed and failed == len(results):
+            response_status = status.HTTP_400_BAD_REQUEST
+        elif failed:
+            response_status = status.HTTP_207_MULTI_STATUS
+        elif request.method == "POST":
+            response_status = status.HTTP_201_CREATED
+        else:
+            response_status = status.HTTP_200_OK
+        return Response(results, status=response_status)
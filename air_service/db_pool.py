@@ -0,0 +1,84 @@
+from django.db import connections
+from prometheus_client import REGISTRY
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+
+def existing_pools():
+    """Yield ``(alias, pool)`` without creating pools like ``.pool`` would."""
+    for alias in connections:
+        pools = getattr(type(connections[alias]), "_connection_pools", {})
+        if alias in pools:
+            yield alias, pools[alias]
+
+
+def close_pools():
+    for alias, _ in list(existing_pools()):
+        connections[alias].close_pool()
+
+
+class ConnectionPoolCollector:
+    """
+    Export psycopg connection pool stats of every database alias.
+
+    Stats are read at scrape time with ``get_stats()``, which does not reset
+    the pool counters, so the cumulative ones are exported as counters.
+    """
+
+    def collect(self):
+        in_use = GaugeMetricFamily(
+            "air_service_db_pool_connections_in_use",
+            "Pool connections currently handed out.",
+            labels=["alias"],
+        )
+        size = GaugeMetricFamily(
+            "air_service_db_pool_connections",
+            "Connections currently managed by the pool.",
+            labels=["alias"],
+        )
+        max_size = GaugeMetricFamily(
+            "air_service_db_pool_max_connections",
+            "Configured pool max_size.",
+            labels=["alias"],
+        )
+        waiting = GaugeMetricFamily(
+            "air_service_db_pool_waiters",
+            "Requests waiting for a pool connection.",
+            labels=["alias"],
+        )
+        requests = CounterMetricFamily(
+            "air_service_db_pool_requests",
+            "Connections requested from the pool.",
+            labels=["alias"],
+        )
+        wait = CounterMetricFamily(
+            "air_service_db_pool_wait_seconds",
+            "Time spent waiting for a pool connection.",
+            labels=["alias"],
+        )
+        errors = CounterMetricFamily(
+            "air_service_db_pool_errors",
+            "Pool requests that timed out or failed.",
+            labels=["alias"],
+        )
+
+        for alias, pool in existing_pools():
+            stats = pool.get_stats()
+            in_use.add_metric(
+                [alias], stats.get("pool_size", 0) - stats.get("pool_available", 0)
+            )
+            size.add_metric([alias], stats.get("pool_size", 0))
+            max_size.add_metric([alias], stats.get("pool_max", 0))
+            waiting.add_metric([alias], stats.get("requests_waiting", 0))
+            requests.add_metric([alias], stats.get("requests_num", 0))
+            wait.add_metric([alias], stats.get("requests_wait_ms", 0) / 1000)
+            errors.add_metric([alias], stats.get("requests_errors", 0))
+
+        yield from (in_use, size, max_size, waiting, requests, wait, errors)
+
+
+def register_pool_metrics(registry=REGISTRY):
+    try:
+        registry.register(ConnectionPoolCollector())
+    except ValueError:
+        # Already registered, ready() can run more than once.
+        pass
@@ -0,0 +1,193 @@
+import base64
+import json
+import logging
+import random
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from prometheus_client import Counter, Gauge, Histogram
+
+logger = logging.getLogger(__name__)
+
+DB_QUERIES = Counter(
+    "air_service_db_queries_total",
+    "SQL queries executed, by database alias.",
+    ["alias"],
+)
+DB_QUERY_DURATION = Histogram(
+    "air_service_db_query_duration_seconds",
+    "SQL query duration, by database alias.",
+    ["alias"],
+)
+DB_READS_ROUTED = Counter(
+    "air_service_db_reads_routed_total",
+    "Read routing decisions of ReplicaRouter.",
+    ["alias", "reason"],
+)
+REPLICA_LAG = Gauge(
+    "air_service_db_replica_lag_seconds",
+    "Last measured replication lag.",
+    ["alias"],
+)
+
+REPLICA_LAG_SQL = (
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() "
+    "THEN 0 ELSE COALESCE("
+    "EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+
+@dataclass
+class RoutingState:
+    """Per-request routing facts, set by ``ReplicaRoutingMiddleware``."""
+
+    client: str | None
+    read_only: bool = False
+    decision: str | None = field(default=None, repr=False)
+
+
+_state: ContextVar[RoutingState | None] = ContextVar("db_routing_state", default=None)
+_local_pins: dict[str, float] = {}
+_pins_lock = threading.Lock()
+
+
+def replica_aliases() -> list[str]:
+    return [alias for alias in settings.DATABASES if alias.startswith("replica")]
+
+
+def client_key(request) -> str | None:
+    """
+    Identify the caller for read-your-writes pinning.
+
+    The JWT payload is decoded without verification: it only decides which
+    database serves the read, authentication still happens in the view.
+    """
+    header = request.META.get("HTTP_AUTHORIZATION", "")
+    if header.startswith("Bearer "):
+        try:
+            payload = header.split()[1].split(".")[1]
+            claims = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+            return f"user:{claims[settings.SIMPLE_JWT.get('USER_ID_CLAIM', 'user_id')]}"
+        except (IndexError, KeyError, ValueError):
+            return None
+    session = request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    return f"session:{session}" if session else None
+
+
+def pin_to_primary(client: str):
+    until = time.time() + settings.REPLICA_PIN_SECONDS
+    with _pins_lock:
+        _local_pins[client] = until
+    cache.set(f"db-pin:{client}", until, settings.REPLICA_PIN_SECONDS)
+
+
+def is_pinned(client: str) -> bool:
+    now = time.time()
+    until = _local_pins.get(client)
+    if until is not None:
+        if until > now:
+            return True
+        with _pins_lock:
+            _local_pins.pop(client, None)
+    until = cache.get(f"db-pin:{client}")
+    return until is not None and until > now
+
+
+class ReplicaHealth:
+    """Cache replica lag checks for ``REPLICA_LAG_CHECK_INTERVAL`` seconds."""
+
+    def __init__(self):
+        self._checked: dict[str, tuple[float, bool]] = {}
+        self._lock = threading.Lock()
+
+    def is_healthy(self, alias: str) -> bool:
+        now = time.monotonic()
+        checked = self._checked.get(alias)
+        if checked and now - checked[0] < settings.REPLICA_LAG_CHECK_INTERVAL:
+            return checked[1]
+        with self._lock:
+            checked = self._checked.get(alias)
+            if checked and now - checked[0] < settings.REPLICA_LAG_CHECK_INTERVAL:
+                return checked[1]
+            healthy = self.check(alias)
+            self._checked[alias] = (now, healthy)
+            return healthy
+
+    def check(self, alias: str) -> bool:
+        connection = connections[alias]
+        if connection.vendor != "postgresql":
+            return True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(REPLICA_LAG_SQL)
+                lag = float(cursor.fetchone()[0])
+        except DatabaseError:
+            logger.warning("Replica %s is unreachable, reading from primary", alias)
+            return False
+        REPLICA_LAG.labels(alias).set(lag)
+        return lag <= settings.REPLICA_MAX_LAG_SECONDS
+
+    def reset(self):
+        self._checked.clear()
+
+
+health = ReplicaHealth()
+
+
+class ReplicaRouter:
+    """
+    Send reads of safe air_service requests to a healthy replica.
+
+    Everything else (writes, unsafe requests, management commands, callers
+    that wrote within ``REPLICA_PIN_SECONDS``) stays on the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or not state.read_only:
+            return None
+        if state.decision is None:
+            state.decision = self.choose(state)
+        return state.decision
+
+    def choose(self, state: RoutingState) -> str:
+        replicas = replica_aliases()
+        if not replicas:
+            return DEFAULT_DB_ALIAS
+        if state.client and is_pinned(state.client):
+            DB_READS_ROUTED.labels(DEFAULT_DB_ALIAS, "pinned").inc()
+            return DEFAULT_DB_ALIAS
+        healthy = [alias for alias in replicas if health.is_healthy(alias)]
+        if not healthy:
+            DB_READS_ROUTED.labels(DEFAULT_DB_ALIAS, "replica_lag").inc()
+            return DEFAULT_DB_ALIAS
+        alias = random.choice(healthy)
+        DB_READS_ROUTED.labels(alias, "replica").inc()
+        return alias
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+def query_metrics(alias: str):
+    def wrapper(execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            DB_QUERIES.labels(alias).inc()
+            DB_QUERY_DURATION.labels(alias).observe(time.perf_counter() - started)
+
+    wrapper.query_metrics = True
+    return wrapper
@@ -1,8 +1,19 @@
+from functools import lru_cache
+
 from django.conf import settings
-from sendgrid.helpers.mail import Mail
+
+
+@lru_cache(maxsize=None)
+def get_sendgrid_client():
+    # Imported on first use, most processes never send mail.
+    from sendgrid import SendGridAPIClient
+
+    return SendGridAPIClient(settings.SENDGRID_API_KEY)
 
 
 def send_email(subject, message, to_email):
+    from sendgrid.helpers.mail import Mail
+
     message = Mail(
         from_email=settings.DEFAULT_FROM_EMAIL,
         to_emails=to_email,
@@ -11,7 +22,7 @@ def send_email(subject, message, to_email):
     )
 
     try:
-        sg = settings.SENDGRID_CLIENT
+        sg = get_sendgrid_client()
         sg.send(message)
     except Exception as e:
         print(f"An error occurred while sending email to {to_email}. {e}")
@@ -95,3 +95,13 @@ class AirplaneFilter(django_filters.FilterSet):
     crew_person_last_name = django_filters.CharFilter(
         field_name="crew__last_name", lookup_expr="iexact"
     )
+
+
+class NumberInFilter(django_filters.BaseInFilter, django_filters.NumberFilter):
+    pass
+
+
+class OccupancyFilter(django_filters.FilterSet):
+    date_from = django_filters.DateFilter(field_name="day", lookup_expr="gte")
+    date_to = django_filters.DateFilter(field_name="day", lookup_expr="lte")
+    route_ids = NumberInFilter(field_name="route_id", lookup_expr="in")
@@ -0,0 +1,64 @@
+"""
+Responsive variants of uploaded airplane images.
+
+Every variant is re-encoded from the pixel data only, so EXIF (camera, GPS),
+ICC and other metadata of the upload never reach clients.
+"""
+import io
+import pathlib
+from dataclasses import dataclass
+
+from PIL import Image, ImageOps
+
+
+@dataclass(frozen=True)
+class Variant:
+    name: str
+    max_size: int
+    format: str
+    quality: int
+
+    @property
+    def extension(self) -> str:
+        return "webp" if self.format == "WEBP" else "jpg"
+
+
+VARIANTS = (
+    Variant("thumbnail", 320, "JPEG", 80),
+    Variant("thumbnail_webp", 320, "WEBP", 75),
+    Variant("medium", 1024, "JPEG", 85),
+    Variant("medium_webp", 1024, "WEBP", 80),
+)
+
+
+def variant_path(image_name: str, variant: Variant) -> str:
+    path = pathlib.PurePosixPath(image_name)
+    return str(path.parent / "variants" / f"{path.stem}-{variant.name}.{variant.extension}")
+
+
+def render_variants(source) -> dict[str, bytes]:
+    """Encode every variant of the image in the ``source`` file object."""
+    with Image.open(source) as image:
+        # Apply the camera orientation before the EXIF tag is dropped.
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+
+        rendered = {}
+        for variant in VARIANTS:
+            resized = image.copy()
+            resized.thumbnail((variant.max_size, variant.max_size), Image.LANCZOS)
+            if variant.format == "JPEG" and resized.mode == "RGBA":
+                background = Image.new("RGB", resized.size, "white")
+                background.paste(resized, mask=resized.getchannel("A"))
+                resized = background
+            output = io.BytesIO()
+            resized.save(
+                output,
+                format=variant.format,
+                quality=variant.quality,
+                optimize=variant.format == "JPEG",
+                progressive=variant.format == "JPEG",
+            )
+            rendered[variant.name] = output.getvalue()
+        return rendered
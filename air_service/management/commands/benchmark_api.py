@@ -0,0 +1,351 @@
+import itertools
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+
+from air_service.benchmarking import (
+    HttpClient,
+    HttpRequest,
+    compare_to_baseline,
+    process_tree_rss,
+    run_load,
+)
+from air_service.models import (
+    Country,
+    City,
+    Crew,
+    AirplaneType,
+    Airport,
+    Airplane,
+    Route,
+    Flight,
+    Order,
+    Ticket,
+)
+
+API_PREFIX = "/api/v1/air_services"
+BENCHMARK_USER = "benchmark@airline.test"
+DEFAULT_BASELINE = Path(settings.BASE_DIR) / "benchmarks" / "baseline.json"
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the air_service endpoints over HTTP and compare "
+        "the results with a stored baseline."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--url",
+            help="Benchmark an already running server instead of starting one.",
+        )
+        parser.add_argument(
+            "--server",
+            choices=("gunicorn", "asgi", "runserver"),
+            default="gunicorn",
+        )
+        parser.add_argument("--port", type=int, default=8765)
+        parser.add_argument("--server-workers", type=int, default=4)
+        parser.add_argument("--requests", type=int, default=200)
+        parser.add_argument("--concurrency", type=int, default=8)
+        parser.add_argument("--warmup", type=int, default=10)
+        parser.add_argument(
+            "--endpoints",
+            help="Comma-separated subset of scenario names.",
+        )
+        parser.add_argument(
+            "--generate",
+            action="store_true",
+            help="Run generate_airline_data with --seed before benchmarking.",
+        )
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--output", help="Write results as JSON to this file.")
+        parser.add_argument("--baseline", default=str(DEFAULT_BASELINE))
+        parser.add_argument(
+            "--tolerance",
+            type=float,
+            default=0.25,
+            help="Allowed latency growth against the baseline (fraction).",
+        )
+        parser.add_argument(
+            "--update-baseline",
+            action="store_true",
+            help="Overwrite the baseline with the current results.",
+        )
+        parser.add_argument(
+            "--fail-on-regression",
+            action="store_true",
+        )
+
+    def handle(self, *args, **options):
+        random.seed(options["seed"])
+        if options["generate"]:
+            call_command(
+                "generate_airline_data", seed=options["seed"], stdout=self.stdout
+            )
+        if not Flight.objects.exists():
+            raise CommandError(
+                "No flights found, load a dataset first (see --generate)."
+            )
+
+        scenarios = self.build_scenarios(options["requests"] + options["warmup"])
+        if options["endpoints"]:
+            wanted = set(options["endpoints"].split(","))
+            unknown = wanted - set(scenarios)
+            if unknown:
+                raise CommandError(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+            scenarios = {
+                name: requests for name, requests in scenarios.items() if name in wanted
+            }
+
+        server = None
+        base_url = options["url"]
+        if not base_url:
+            server = self.start_server(options)
+            base_url = f"http://127.0.0.1:{options['port']}"
+
+        user = self.benchmark_user()
+        client = HttpClient(
+            base_url,
+            headers={"Authorization": f"Bearer {AccessToken.for_user(user)}"},
+        )
+        results = {}
+        try:
+            for name, build in scenarios.items():
+                requests = build()
+                warmup, measured = (
+                    requests[:options["warmup"]],
+                    requests[options["warmup"]:],
+                )
+                run_load(client.send, warmup, options["concurrency"])
+                results[name] = run_load(
+                    client.send, measured, options["concurrency"]
+                ).as_dict()
+                self.print_result(name, results[name])
+        finally:
+            server_rss = process_tree_rss(server.pid) if server else None
+            if server:
+                server.terminate()
+                server.wait(timeout=30)
+
+        report = {
+            "environment": {
+                "database": settings.DATABASES["default"]["ENGINE"].rsplit(".", 1)[-1],
+                "server": "external" if options["url"] else options["server"],
+                "server_workers": options["server_workers"],
+                "server_rss_mb": server_rss,
+                "concurrency": options["concurrency"],
+                "requests": options["requests"],
+                "flights": Flight.objects.count(),
+                "tickets": Ticket.objects.count(),
+            },
+            "results": results,
+        }
+        if options["output"]:
+            Path(options["output"]).write_text(json.dumps(report, indent=2) + "\n")
+
+        baseline_path = Path(options["baseline"])
+        if options["update_baseline"]:
+            baseline_path.parent.mkdir(parents=True, exist_ok=True)
+            baseline_path.write_text(json.dumps(report, indent=2) + "\n")
+            self.stdout.write(self.style.SUCCESS(f"Baseline written to {baseline_path}"))
+            return
+
+        if not baseline_path.exists():
+            self.stdout.write(self.style.WARNING(f"No baseline at {baseline_path}"))
+            return
+
+        baseline = json.loads(baseline_path.read_text())["results"]
+        regressions = compare_to_baseline(results, baseline, options["tolerance"])
+        if not regressions:
+            self.stdout.write(self.style.SUCCESS("No regressions against baseline."))
+            return
+
+        for regression in regressions:
+            self.stdout.write(self.style.WARNING(regression))
+        if options["fail_on_regression"]:
+            raise CommandError(f"{len(regressions)} regression(s) against baseline.")
+
+    def print_result(self, name: str, result: dict):
+        queries = result["queries_per_request"]
+        self.stdout.write(
+            f"{name:<22} p50 {result['p50_ms']:>8.2f}ms "
+            f"p95 {result['p95_ms']:>8.2f}ms p99 {result['p99_ms']:>8.2f}ms "
+            f"{result['throughput_rps']:>8.1f} req/s "
+            f"queries {queries if queries is not None else '-':>6} "
+            f"errors {result['errors']}"
+        )
+
+    def benchmark_user(self):
+        user, created = get_user_model().objects.get_or_create(email=BENCHMARK_USER)
+        if created:
+            user.set_unusable_password()
+            user.save()
+        return user
+
+    def start_server(self, options) -> subprocess.Popen:
+        address = f"127.0.0.1:{options['port']}"
+        if options["server"] == "gunicorn":
+            command = [
+                sys.executable, "-m", "gunicorn",
+                "airport_api_service.wsgi:application",
+                "--bind", address,
+                "--workers", str(options["server_workers"]),
+                "--log-level", "warning",
+            ]
+        elif options["server"] == "asgi":
+            command = [
+                sys.executable, "-m", "uvicorn",
+                "airport_api_service.asgi:application",
+                "--host", "127.0.0.1",
+                "--port", str(options["port"]),
+                "--workers", str(options["server_workers"]),
+                "--log-level", "warning",
+            ]
+        else:
+            command = [
+                sys.executable, "manage.py", "runserver", address, "--noreload",
+            ]
+
+        server = subprocess.Popen(
+            command,
+            cwd=settings.BASE_DIR,
+            env={
+                **os.environ,
+                "QUERY_COUNT_HEADER": "true",
+                "DJANGO_DEBUG": "",
+                "THROTTLE_ENABLED": "false",
+            },
+            stdout=subprocess.DEVNULL,
+        )
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError("Benchmark server exited during startup.")
+            try:
+                socket.create_connection(("127.0.0.1", options["port"]), 1).close()
+                return server
+            except OSError:
+                time.sleep(0.2)
+        server.terminate()
+        raise CommandError("Benchmark server did not start in 30 seconds.")
+
+    def build_scenarios(self, count: int) -> dict:
+        """
+        Map scenario names to callables building their requests.
+
+        Requests are built right before a scenario runs, so ``orders-*``
+        see the orders created by ``order-create``.
+        """
+        page_size = settings.REST_FRAMEWORK["PAGE_SIZE"]
+        user = self.benchmark_user()
+        now = timezone.now()
+
+        def sample_ids(queryset, size=200):
+            ids = list(queryset.values_list("pk", flat=True)[:5000])
+            return random.sample(ids, min(size, len(ids))) or [0]
+
+        def repeat(paths: list[str]) -> list[HttpRequest]:
+            return [
+                HttpRequest("GET", path)
+                for path in itertools.islice(itertools.cycle(paths), count)
+            ]
+
+        def detail(resource: str, queryset):
+            return lambda: repeat(
+                [f"{API_PREFIX}/{resource}/{pk}/" for pk in sample_ids(queryset)]
+            )
+
+        def pages(resource: str, queryset):
+            return lambda: repeat(
+                [
+                    f"{API_PREFIX}/{resource}/?page={page}"
+                    for page in range(
+                        1, min(math.ceil(queryset.count() / page_size), 5) + 1
+                    )
+                ] or [f"{API_PREFIX}/{resource}/"]
+            )
+
+        def filtered(paths: list[str]):
+            return lambda: repeat(paths)
+
+        return {
+            "order-create": lambda: self.order_requests(count),
+            "countries-list": pages("countries", Country.objects),
+            "cities-list": pages("cities", City.objects),
+            "airports-list": pages("airports", Airport.objects),
+            "airplane-types-list": pages("airplane_types", AirplaneType.objects),
+            "airplanes-list": pages("airplanes", Airplane.objects),
+            "crew-list": pages("crew", Crew.objects),
+            "routes-list": pages("routes", Route.objects),
+            "flights-list": pages("flights", Flight.objects),
+            "tickets-list": pages("tickets", Ticket.objects.filter(order__user=user)),
+            "orders-list": pages("orders", Order.objects.filter(user=user)),
+            "countries-detail": detail("countries", Country.objects),
+            "cities-detail": detail("cities", City.objects),
+            "airports-detail": detail("airports", Airport.objects),
+            "routes-detail": detail("routes", Route.objects),
+            "flights-detail": detail("flights", Flight.objects),
+            "async-flights-list": pages("async/flights", Flight.objects),
+            "async-flights-detail": detail("async/flights", Flight.objects),
+            "async-routes-list": pages("async/routes", Route.objects),
+            "orders-detail": detail("orders", Order.objects.filter(user=user)),
+            "cities-filter": filtered(
+                [f"{API_PREFIX}/cities/?country_name={letter}" for letter in "aeiou"]
+            ),
+            "routes-filter": filtered(
+                [
+                    f"{API_PREFIX}/routes/?distance_min={distance}&source_city=a"
+                    for distance in (500, 1000, 2000, 4000)
+                ]
+            ),
+            "flights-filter": filtered(
+                [
+                    f"{API_PREFIX}/flights/?airplane_name=a"
+                    f"&departure_time_hour_after="
+                    f"{(now + timedelta(days=days)).strftime('%Y-%m-%dT%H:00')}"
+                    for days in range(0, 30, 3)
+                ]
+            ),
+        }
+
+    def order_requests(self, count: int) -> list[HttpRequest]:
+        """One single-ticket order per request, each on a seat nobody holds."""
+        requests = []
+        flights = Flight.objects.filter(
+            departure_time__gt=timezone.now()
+        ).select_related("airplane").order_by("departure_time")
+        for flight in flights.iterator():
+            taken = set(flight.tickets.values_list("row", "seat"))
+            for row in range(1, flight.airplane.rows + 1):
+                for seat in range(1, flight.airplane.seats_in_row + 1):
+                    if (row, seat) in taken:
+                        continue
+                    requests.append(
+                        HttpRequest(
+                            "POST",
+                            f"{API_PREFIX}/orders/",
+                            body={
+                                "tickets": [
+                                    {"row": row, "seat": seat, "flight": flight.pk}
+                                ]
+                            },
+                        )
+                    )
+                    if len(requests) >= count:
+                        return requests
+        return requests
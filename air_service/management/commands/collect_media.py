@@ -0,0 +1,34 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from air_service import storage_gc
+
+
+class Command(BaseCommand):
+    help = (
+        "Remove orphaned media files now, the same work as the "
+        "collect_orphaned_files and sweep_media Celery tasks."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sweep",
+            action="store_true",
+            help="Also look for unreferenced files in the upload directory.",
+        )
+        parser.add_argument(
+            "--grace",
+            type=int,
+            help="Skip files modified in the last N seconds when sweeping.",
+        )
+
+    def handle(self, *args, **options):
+        if options["sweep"]:
+            grace = options["grace"]
+            orphans = storage_gc.sweep(
+                timedelta(seconds=grace) if grace is not None else None
+            )
+            self.stdout.write(f"Found {len(orphans)} unreferenced files.")
+        deleted = storage_gc.collect()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} files."))
@@ -0,0 +1,488 @@
+import math
+import multiprocessing
+import os
+import random
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, transaction
+from django.utils import timezone
+
+from air_service import occupancy, reference_data, table_versions
+from air_service.db_pool import close_pools
+from air_service.models import (
+    Country,
+    City,
+    Crew,
+    AirplaneType,
+    Airport,
+    Airplane,
+    Route,
+    Flight,
+    Ticket,
+    Order,
+)
+
+SYLLABLES = (
+    "ka", "ro", "lin", "mar", "ta", "vel", "do", "san", "ber", "no",
+    "ri", "al", "ven", "tor", "sa", "mi", "gra", "lo", "an", "te",
+    "bur", "es", "kor", "ni", "pol", "da", "vi", "len", "ur", "sto",
+)
+COUNTRY_SUFFIXES = ("ia", "land", "stan", "ana", "ova", "ea")
+CITY_SUFFIXES = ("grad", "burg", "ville", "polis", "ford", "ton", "holm", "")
+AIRPORT_KINDS = ("International", "Regional", "City", "Central", "North", "South")
+AIRPLANE_MAKERS = ("Airbus", "Boeing", "Embraer", "Bombardier", "Antonov", "Sukhoi")
+FIRST_NAMES = (
+    "Olena", "Taras", "Anna", "John", "Maria", "Pedro", "Yuki", "Lars",
+    "Chen", "Amir", "Sofia", "Lukas", "Emma", "Ivan", "Noah", "Mia",
+)
+LAST_NAMES = (
+    "Shevchenko", "Smith", "Garcia", "Tanaka", "Nielsen", "Wang", "Cohen",
+    "Rossi", "Novak", "Muller", "Kowalski", "Silva", "Kim", "Brown",
+)
+CRUISE_SPEED_KMH = 800
+TURNAROUND_MINUTES = 30
+
+# Populated in the parent process before the worker pool is forked, so every
+# worker inherits the id lists without pickling them per task.
+_SHARED = {}
+
+
+def _random_word(rng: random.Random, min_syllables: int = 2, max_syllables: int = 3) -> str:
+    return "".join(
+        rng.choice(SYLLABLES)
+        for _ in range(rng.randint(min_syllables, max_syllables))
+    )
+
+
+def _unique_names(rng: random.Random, count: int, make, taken=()) -> list[str]:
+    taken = set(taken)
+    names = []
+    attempts = 0
+    while len(names) < count:
+        name = make(rng)
+        attempts += 1
+        if attempts > count * 50:
+            name = f"{name} {len(names) + 1}"
+        if name in taken:
+            continue
+        taken.add(name)
+        names.append(name)
+    return names
+
+
+def _haversine_km(a: tuple[float, float], b: tuple[float, float]) -> int:
+    lat1, lon1, lat2, lon2 = map(math.radians, (*a, *b))
+    h = (
+        math.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    )
+    return max(int(2 * 6371 * math.asin(math.sqrt(h))), 100)
+
+
+def _write_rows(model, fields: list[str], rows, batch_size: int) -> int:
+    """
+    Insert plain tuples into ``model``'s table.
+
+    PostgreSQL gets a single COPY stream, other backends go through
+    ``bulk_create`` in batches of ``batch_size``.
+    """
+    if connection.vendor == "postgresql":
+        quote = connection.ops.quote_name
+        columns = ", ".join(
+            quote(model._meta.get_field(field).column) for field in fields
+        )
+        count = 0
+        with connection.cursor() as cursor:
+            with cursor.copy(
+                f"COPY {quote(model._meta.db_table)} ({columns}) FROM STDIN"
+            ) as copy:
+                for row in rows:
+                    copy.write_row(row)
+                    count += 1
+        return count
+
+    count = 0
+    batch = []
+    for row in rows:
+        batch.append(model(**dict(zip(fields, row))))
+        if len(batch) >= batch_size:
+            model.objects.bulk_create(batch, batch_size=batch_size)
+            count += len(batch)
+            batch = []
+    if batch:
+        model.objects.bulk_create(batch, batch_size=batch_size)
+        count += len(batch)
+    return count
+
+
+def _flight_minutes(distance: int) -> int:
+    return int(distance / CRUISE_SPEED_KMH * 60) + TURNAROUND_MINUTES
+
+
+def _flight_rows(seed: int, chunk: int, count: int):
+    rng = random.Random(f"{seed}-flights-{chunk}")
+    routes = _SHARED["routes"]
+    airplane_ids = _SHARED["airplane_ids"]
+    start = _SHARED["start"]
+    slot_minutes = _SHARED["slot_minutes"]
+    # Airplanes take turns, each flight in its own slot of the airplane's
+    # timeline, so no airplane is booked on overlapping flights.
+    first = chunk * _SHARED["chunk_size"]
+    for number in range(first, first + count):
+        slot, airplane = divmod(number, len(airplane_ids))
+        route_id, distance = rng.choice(routes)
+        duration = _flight_minutes(distance)
+        departure_time = start + timedelta(
+            minutes=slot * slot_minutes + rng.randrange(0, slot_minutes - duration + 1)
+        )
+        yield (
+            route_id,
+            airplane_ids[airplane],
+            departure_time,
+            departure_time + timedelta(minutes=duration),
+        )
+
+
+def _ticket_rows(seed: int, chunk: int, first_id: int, last_id: int):
+    rng = random.Random(f"{seed}-tickets-{chunk}")
+    order_ids = _SHARED["order_ids"]
+    average = _SHARED["tickets_per_flight"]
+    flights = (
+        Flight.objects.filter(pk__gte=first_id, pk__lte=last_id)
+        .order_by("pk")
+        .values_list("pk", "airplane__rows", "airplane__seats_in_row")
+    )
+    for flight_id, rows, seats_in_row in flights.iterator(chunk_size=2000):
+        capacity = rows * seats_in_row
+        sold = min(capacity, rng.randint(0, max(int(average * 2), 1)))
+        seats = sorted(rng.sample(range(capacity), sold))
+        position = 0
+        while position < len(seats):
+            group = seats[position:position + rng.randint(1, 4)]
+            order_id = rng.choice(order_ids)
+            for seat_index in group:
+                row, seat = divmod(seat_index, seats_in_row)
+                yield row + 1, seat + 1, flight_id, order_id, False
+            position += len(group)
+
+
+def _insert_flights(seed: int, chunk: int, count: int, batch_size: int) -> int:
+    with transaction.atomic():
+        return _write_rows(
+            Flight,
+            ["route_id", "airplane_id", "departure_time", "arrival_time"],
+            _flight_rows(seed, chunk, count),
+            batch_size,
+        )
+
+
+def _insert_tickets(seed: int, chunk: int, first_id: int, last_id: int, batch_size: int) -> int:
+    with transaction.atomic():
+        return _write_rows(
+            Ticket,
+            ["row", "seat", "flight_id", "order_id", "notification_sent"],
+            _ticket_rows(seed, chunk, first_id, last_id),
+            batch_size,
+        )
+
+
+def _close_connections():
+    connections.close_all()
+    # Pooled sockets and pool worker threads must not be shared with forked
+    # workers.
+    close_pools()
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a seeded synthetic airline dataset "
+        "(catalogue, flights, users, orders and tickets)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--countries", type=int, default=60)
+        parser.add_argument("--cities", type=int, default=2000)
+        parser.add_argument("--airports", type=int, default=3000)
+        parser.add_argument("--airplane-types", type=int, default=25)
+        parser.add_argument("--airplanes", type=int, default=800)
+        parser.add_argument("--crew", type=int, default=2000)
+        parser.add_argument("--routes", type=int, default=10000)
+        parser.add_argument("--flights", type=int, default=200000)
+        parser.add_argument("--users", type=int, default=20000)
+        parser.add_argument("--orders", type=int, default=400000)
+        parser.add_argument(
+            "--tickets",
+            type=int,
+            default=1000000,
+            help="Approximate number of tickets, spread over the generated flights.",
+        )
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=20000,
+            help="Flights handled by one worker task.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Worker processes for flights and tickets (PostgreSQL only).",
+        )
+        parser.add_argument("--password", default="test_password")
+
+    def handle(self, *args, **options):
+        if min(
+            options["countries"],
+            options["cities"],
+            options["airports"],
+            options["airplane_types"],
+            options["airplanes"],
+        ) < 1 or options["airports"] < 2:
+            raise CommandError("Catalogue sizes must be positive (at least 2 airports).")
+
+        self.seed = options["seed"]
+        self.batch_size = options["batch_size"]
+        self.rng = random.Random(self.seed)
+        workers = options["workers"]
+        if connection.vendor != "postgresql" or connection.in_atomic_block:
+            workers = 1
+
+        email_suffix = f"-{self.seed}@airline.test"
+        if get_user_model().objects.filter(email__endswith=email_suffix).exists():
+            raise CommandError(
+                f"Dataset with seed {self.seed} already exists, use another --seed."
+            )
+
+        started = time.monotonic()
+        with transaction.atomic():
+            cities, coordinates = self._create_geography(options)
+            airports = self._create_airports(options, cities, coordinates)
+            airplane_ids = self._create_fleet(options)
+            routes = self._create_routes(options, airports)
+            users = self._create_users(options, email_suffix)
+            order_ids = self._create_orders(options, users)
+            table_versions.bump(*table_versions.TRACKED_MODELS)
+            for model in table_versions.TRACKED_MODELS:
+                reference_data.record_changes(model)
+        self._report("catalogue, users and orders", started)
+
+        chunk_size = options["chunk_size"]
+        # About 210 days of flights, longer when a slot would not fit the
+        # longest route.
+        slots = math.ceil(options["flights"] / len(airplane_ids)) or 1
+        _SHARED.update(
+            routes=routes,
+            airplane_ids=airplane_ids,
+            order_ids=order_ids,
+            start=timezone.now().replace(second=0, microsecond=0) - timedelta(days=30),
+            slot_minutes=max(
+                210 * 24 * 60 // slots,
+                max((_flight_minutes(distance) for _, distance in routes), default=0),
+            ),
+            chunk_size=chunk_size,
+            tickets_per_flight=options["tickets"] / max(options["flights"], 1),
+        )
+
+        stage = time.monotonic()
+        first_flight_id = self._last_flight_id() + 1
+        flight_tasks = [
+            (self.seed, chunk, min(chunk_size, options["flights"] - offset), self.batch_size)
+            for chunk, offset in enumerate(
+                range(0, options["flights"], chunk_size)
+            )
+        ]
+        flights = self._run(_insert_flights, flight_tasks, workers)
+        self._report(f"{flights} flights", stage)
+
+        stage = time.monotonic()
+        last_flight_id = self._last_flight_id()
+        ticket_tasks = [
+            (
+                self.seed,
+                chunk,
+                first_id,
+                min(first_id + chunk_size - 1, last_flight_id),
+                self.batch_size,
+            )
+            for chunk, first_id in enumerate(
+                range(first_flight_id, last_flight_id + 1, chunk_size)
+            )
+        ]
+        tickets = self._run(_insert_tickets, ticket_tasks, workers) if order_ids else 0
+        self._report(f"{tickets} tickets", stage)
+
+        # Bulk inserts send no signals.
+        stage = time.monotonic()
+        occupancy.rebuild()
+        self._report("occupancy totals", stage)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Generated dataset with seed {self.seed} "
+                f"in {time.monotonic() - started:.1f}s."
+            )
+        )
+
+    @staticmethod
+    def _last_flight_id() -> int:
+        return Flight.objects.order_by("-pk").values_list("pk", flat=True).first() or 0
+
+    def _report(self, what: str, started: float):
+        self.stdout.write(f"Created {what} in {time.monotonic() - started:.1f}s")
+
+    def _run(self, func, tasks: list[tuple], workers: int) -> int:
+        if workers <= 1 or len(tasks) <= 1:
+            return sum(func(*task) for task in tasks)
+
+        _close_connections()
+        context = multiprocessing.get_context("fork")
+        with context.Pool(workers, initializer=_close_connections) as pool:
+            return sum(pool.starmap(func, tasks))
+
+    def _create_geography(self, options) -> tuple[list[City], dict[int, tuple[float, float]]]:
+        rng = self.rng
+        country_names = _unique_names(
+            rng,
+            options["countries"],
+            lambda r: Country.normalize_name(
+                _random_word(r) + r.choice(COUNTRY_SUFFIXES)
+            ),
+            Country.objects.values_list("name", flat=True),
+        )
+        countries = Country.objects.bulk_create(
+            [Country(name=name) for name in country_names],
+            batch_size=self.batch_size,
+        )
+        centers = {
+            country.name: (rng.uniform(-50, 65), rng.uniform(-170, 170))
+            for country in countries
+        }
+
+        cities = []
+        for position, country in enumerate(countries):
+            names = _unique_names(
+                rng,
+                len(range(position, options["cities"], len(countries))),
+                lambda r: City.normalize_name(
+                    _random_word(r) + r.choice(CITY_SUFFIXES)
+                ),
+            )
+            cities.extend(City(name=name, country=country) for name in names)
+        cities = City.objects.bulk_create(cities, batch_size=self.batch_size)
+
+        coordinates = {}
+        for city in cities:
+            lat, lon = centers[city.country.name]
+            coordinates[city.pk] = (
+                max(min(lat + rng.gauss(0, 4), 89), -89),
+                lon + rng.gauss(0, 6),
+            )
+        return cities, coordinates
+
+    def _create_airports(self, options, cities, coordinates) -> list[tuple[int, tuple[float, float]]]:
+        rng = self.rng
+        airports = []
+        for index in range(options["airports"]):
+            city = cities[index % len(cities)] if index < len(cities) else rng.choice(cities)
+            airports.append(
+                Airport(
+                    name=f"{city.name} {rng.choice(AIRPORT_KINDS)} Airport",
+                    closest_big_city=city,
+                )
+            )
+        airports = Airport.objects.bulk_create(airports, batch_size=self.batch_size)
+        return [
+            (airport.pk, coordinates[airport.closest_big_city_id])
+            for airport in airports
+        ]
+
+    def _create_fleet(self, options) -> list[int]:
+        rng = self.rng
+        type_names = _unique_names(
+            rng,
+            options["airplane_types"],
+            lambda r: AirplaneType.normalize_name(
+                f"{r.choice(AIRPLANE_MAKERS)} {r.randint(100, 999)}"
+            ),
+            AirplaneType.objects.values_list("name", flat=True),
+        )
+        airplane_types = AirplaneType.objects.bulk_create(
+            [AirplaneType(name=name) for name in type_names]
+        )
+        crew = Crew.objects.bulk_create(
+            [
+                Crew(first_name=rng.choice(FIRST_NAMES), last_name=rng.choice(LAST_NAMES))
+                for _ in range(options["crew"])
+            ],
+            batch_size=self.batch_size,
+        )
+        airplanes = Airplane.objects.bulk_create(
+            [
+                Airplane(
+                    name=f"{_random_word(rng, 1, 2).upper()}-{rng.randint(1000, 9999)}",
+                    rows=rng.randint(15, 60),
+                    seats_in_row=rng.choice((4, 6, 6, 6, 8, 10)),
+                    airplane_type=rng.choice(airplane_types),
+                )
+                for _ in range(options["airplanes"])
+            ],
+            batch_size=self.batch_size,
+        )
+        if crew:
+            through = Airplane.crew.through
+            through.objects.bulk_create(
+                [
+                    through(airplane_id=airplane.pk, crew_id=member.pk)
+                    for airplane in airplanes
+                    for member in rng.sample(crew, min(len(crew), rng.randint(2, 6)))
+                ],
+                batch_size=self.batch_size,
+            )
+        return [airplane.pk for airplane in airplanes]
+
+    def _create_routes(self, options, airports) -> list[tuple[int, int]]:
+        rng = self.rng
+        routes = []
+        for _ in range(options["routes"]):
+            (source_id, source_at), (destination_id, destination_at) = rng.sample(airports, 2)
+            routes.append(
+                Route(
+                    source_id=source_id,
+                    destination_id=destination_id,
+                    distance=_haversine_km(source_at, destination_at),
+                )
+            )
+        routes = Route.objects.bulk_create(routes, batch_size=self.batch_size)
+        return [(route.pk, route.distance) for route in routes]
+
+    def _create_users(self, options, email_suffix: str) -> list[int]:
+        password = make_password(options["password"])
+        user_model = get_user_model()
+        users = user_model.objects.bulk_create(
+            [
+                user_model(
+                    email=f"passenger{index}{email_suffix}",
+                    first_name=self.rng.choice(FIRST_NAMES),
+                    last_name=self.rng.choice(LAST_NAMES),
+                    password=password,
+                )
+                for index in range(options["users"])
+            ],
+            batch_size=self.batch_size,
+        )
+        return [user.pk for user in users]
+
+    def _create_orders(self, options, users: list[int]) -> list[int]:
+        if not users:
+            return []
+        orders = Order.objects.bulk_create(
+            [Order(user_id=self.rng.choice(users)) for _ in range(options["orders"])],
+            batch_size=self.batch_size,
+        )
+        return [order.pk for order in orders]
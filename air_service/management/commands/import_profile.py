@@ -0,0 +1,167 @@
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from dataclasses import dataclass, asdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+ENTRY_POINTS = {
+    # What a gunicorn/uvicorn worker imports before serving its first request.
+    "web": (
+        "import airport_api_service.wsgi\n"
+        "from django.urls import get_resolver\n"
+        "get_resolver().url_patterns"
+    ),
+    # Celery worker: app, Django and the autodiscovered task modules.
+    "worker": (
+        "from airport_api_service.celery import app\n"
+        "import django\n"
+        "django.setup()\n"
+        "app.loader.import_default_modules()"
+    ),
+    # Every manage.py command, e.g. wait_for_db.
+    "manage": (
+        "import os\n"
+        "os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'airport_api_service.settings')\n"
+        "import django\n"
+        "django.setup()"
+    ),
+}
+
+
+@dataclass
+class ImportRecord:
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+@dataclass
+class StartupProfile:
+    entry: str
+    wall_seconds: float
+    records: list[ImportRecord]
+
+    @property
+    def import_seconds(self) -> float:
+        return sum(record.self_us for record in self.records) / 1_000_000
+
+    @property
+    def modules(self) -> set[str]:
+        return {record.module for record in self.records}
+
+    def by_package(self) -> dict[str, int]:
+        totals = defaultdict(int)
+        for record in self.records:
+            totals[record.module.split(".")[0]] += record.self_us
+        return dict(sorted(totals.items(), key=lambda item: item[1], reverse=True))
+
+
+def parse_importtime(output: str) -> list[ImportRecord]:
+    """Parse the ``import time: self | cumulative | package`` lines of ``-X importtime``."""
+    records = []
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        try:
+            self_us, cumulative_us, name = line[len("import time:"):].split("|")
+            self_us, cumulative_us = int(self_us), int(cumulative_us)
+        except ValueError:
+            # The header line and anything else printed to stderr.
+            continue
+        stripped = name.lstrip()
+        records.append(
+            ImportRecord(
+                module=stripped,
+                self_us=self_us,
+                cumulative_us=cumulative_us,
+                depth=(len(name) - len(stripped) - 1) // 2,
+            )
+        )
+    return records
+
+
+def profile_startup(entry: str) -> StartupProfile:
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", ENTRY_POINTS[entry]],
+        cwd=settings.BASE_DIR,
+        env={**os.environ, "PYTHONDONTWRITEBYTECODE": ""},
+        capture_output=True,
+        text=True,
+    )
+    wall_seconds = time.perf_counter() - started
+    if result.returncode:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    return StartupProfile(entry, wall_seconds, parse_importtime(result.stderr))
+
+
+class Command(BaseCommand):
+    help = (
+        "Report per-module import cost (python -X importtime) of the web, "
+        "worker and manage.py entry points."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--entry",
+            choices=sorted(ENTRY_POINTS),
+            action="append",
+            help="Entry point to profile, repeatable (default: all).",
+        )
+        parser.add_argument("--top", type=int, default=20)
+        parser.add_argument("--json", action="store_true", help="Print JSON.")
+
+    def handle(self, *args, **options):
+        profiles = []
+        for entry in options["entry"] or list(ENTRY_POINTS):
+            try:
+                profiles.append(profile_startup(entry))
+            except RuntimeError as error:
+                raise CommandError(f"{entry} failed to start: {error}")
+
+        if options["json"]:
+            self.stdout.write(
+                json.dumps(
+                    [
+                        {
+                            "entry": profile.entry,
+                            "wall_seconds": round(profile.wall_seconds, 3),
+                            "import_seconds": round(profile.import_seconds, 3),
+                            "packages_us": profile.by_package(),
+                            "modules": [asdict(record) for record in profile.records],
+                        }
+                        for profile in profiles
+                    ],
+                    indent=2,
+                )
+            )
+            return
+
+        for profile in profiles:
+            self.print_profile(profile, options["top"])
+
+    def print_profile(self, profile: StartupProfile, top: int):
+        self.stdout.write(
+            self.style.MIGRATE_HEADING(
+                f"{profile.entry}: {profile.wall_seconds:.2f}s wall, "
+                f"{profile.import_seconds:.2f}s importing "
+                f"{len(profile.records)} modules"
+            )
+        )
+        self.stdout.write("  Packages (self time):")
+        for package, self_us in list(profile.by_package().items())[:top]:
+            self.stdout.write(f"    {self_us / 1000:>9.1f}ms  {package}")
+        self.stdout.write("  Modules (self time):")
+        for record in sorted(
+            profile.records, key=lambda record: record.self_us, reverse=True
+        )[:top]:
+            self.stdout.write(
+                f"    {record.self_us / 1000:>9.1f}ms  "
+                f"(cumulative {record.cumulative_us / 1000:>8.1f}ms)  {record.module}"
+            )
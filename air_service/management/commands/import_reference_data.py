@@ -0,0 +1,324 @@
+import csv
+import json
+import time
+from itertools import groupby
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import DatabaseError, connection, transaction
+
+from air_service import reference_data, table_versions
+from air_service.models import Country, City, AirplaneType, Airport
+
+NORMALIZERS = {
+    Country: Country.normalize_name,
+    City: City.normalize_name,
+    AirplaneType: AirplaneType.normalize_name,
+}
+CSV_MODELS = {
+    "country": Country,
+    "city": City,
+    "airplane_type": AirplaneType,
+    "airport": Airport,
+}
+
+
+def iter_fixture(stream, chunk_size: int = 1 << 16):
+    """
+    Yield the objects of a top level JSON array one by one.
+
+    Only the current object and one read chunk are kept in memory, so
+    fixtures much larger than RAM can be imported.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    position = 0
+    started = False
+    eof = False
+    while True:
+        while position < len(buffer) and buffer[position] in " \t\r\n,":
+            position += 1
+        if not started and position < len(buffer):
+            if buffer[position] != "[":
+                raise ValueError("Fixture must be a JSON array.")
+            started = True
+            position += 1
+            continue
+        if position < len(buffer) and buffer[position] == "]":
+            return
+        try:
+            obj, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            if eof:
+                if buffer[position:].strip():
+                    raise ValueError("Truncated fixture.")
+                return
+            chunk = stream.read(chunk_size)
+            eof = not chunk
+            buffer = buffer[position:] + chunk
+            position = 0
+            continue
+        yield obj
+        position = end
+
+
+def normalize_names(model, names: list[str]) -> list[str]:
+    normalize = NORMALIZERS.get(model)
+    if normalize is None:
+        return names
+    return [normalize(name) for name in names]
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk upsert reference data from a loaddata-style JSON fixture "
+        "or a CSV file, without per-row save()."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument(
+            "--model",
+            choices=sorted(CSV_MODELS),
+            help="Target model for CSV input.",
+        )
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        self.batch_size = options["batch_size"]
+        self.touched_models = set()
+        started = time.monotonic()
+        try:
+            with transaction.atomic():
+                if options["path"].endswith(".csv"):
+                    if not options["model"]:
+                        raise CommandError("--model is required for CSV input.")
+                    count = self.import_csv(options["path"], CSV_MODELS[options["model"]])
+                else:
+                    count = self.import_fixture(options["path"])
+                self.reset_sequences()
+                changed = [
+                    model for model in table_versions.TRACKED_MODELS
+                    if model in self.touched_models
+                ]
+                table_versions.bump(*changed)
+                for model in changed:
+                    reference_data.record_changes(model)
+        except (ValueError, LookupError, DatabaseError) as error:
+            raise CommandError(f"Import failed: {error}")
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {count} object(s) in {time.monotonic() - started:.2f}s."
+            )
+        )
+
+    def import_fixture(self, path: str) -> int:
+        count = 0
+        with open(path, encoding="utf-8") as stream:
+            batches = groupby(iter_fixture(stream), key=lambda obj: obj["model"])
+            for label, objects in batches:
+                model = apps.get_model(label)
+                batch = []
+                for obj in objects:
+                    batch.append(obj)
+                    if len(batch) >= self.batch_size:
+                        count += self.upsert_fixture_batch(model, batch)
+                        batch = []
+                if batch:
+                    count += self.upsert_fixture_batch(model, batch)
+        return count
+
+    def upsert_fixture_batch(self, model, batch: list[dict]) -> int:
+        meta = model._meta
+        if any("pk" not in obj for obj in batch):
+            raise ValueError(f"{meta.label}: fixture objects need a pk.")
+
+        concrete = {
+            field.name: field
+            for field in meta.concrete_fields
+            if not field.primary_key
+        }
+        many_to_many = {field.name: field for field in meta.many_to_many}
+        named = [obj["fields"] for obj in batch if "name" in obj["fields"]]
+        for fields, name in zip(
+            named, normalize_names(model, [fields["name"] for fields in named])
+        ):
+            fields["name"] = name
+
+        instances = []
+        relations = {name: [] for name in many_to_many}
+        for obj in batch:
+            values = {meta.pk.attname: meta.pk.to_python(obj["pk"])}
+            for name, value in obj["fields"].items():
+                if name in many_to_many:
+                    relations[name].append((obj["pk"], value))
+                    continue
+                field = concrete[name]
+                if field.is_relation:
+                    values[field.attname] = value
+                else:
+                    values[field.attname] = field.to_python(value)
+            instances.append(model(**values))
+
+        update_fields = [
+            name for name in concrete
+            if any(name in obj["fields"] for obj in batch)
+        ]
+        # bulk_create() runs pre_save(), which would replace fixture values
+        # of auto_now/auto_now_add fields with the current time.
+        auto_fields = [
+            name for name in update_fields
+            if getattr(concrete[name], "auto_now", False)
+            or getattr(concrete[name], "auto_now_add", False)
+        ]
+        recorded = [
+            [getattr(instance, concrete[name].attname) for name in auto_fields]
+            for instance in instances
+        ]
+        if update_fields:
+            model.objects.bulk_create(
+                instances,
+                batch_size=self.batch_size,
+                update_conflicts=True,
+                unique_fields=[meta.pk.name],
+                update_fields=update_fields,
+            )
+        else:
+            model.objects.bulk_create(
+                instances, batch_size=self.batch_size, ignore_conflicts=True
+            )
+
+        if auto_fields:
+            for instance, values in zip(instances, recorded):
+                for name, value in zip(auto_fields, values):
+                    setattr(instance, concrete[name].attname, value)
+            model.objects.bulk_update(
+                instances, auto_fields, batch_size=self.batch_size
+            )
+
+        for name, pairs in relations.items():
+            self.replace_many_to_many(many_to_many[name], pairs)
+
+        self.touched_models.add(model)
+        return len(instances)
+
+    def replace_many_to_many(self, field, pairs: list[tuple]):
+        through = field.remote_field.through
+        source = field.m2m_field_name()
+        target = field.m2m_reverse_field_name()
+        through.objects.filter(
+            **{f"{source}__in": [pk for pk, _ in pairs]}
+        ).delete()
+        through.objects.bulk_create(
+            [
+                through(**{f"{source}_id": pk, f"{target}_id": related})
+                for pk, related_ids in pairs
+                for related in related_ids
+            ],
+            batch_size=self.batch_size,
+            ignore_conflicts=True,
+        )
+        self.touched_models.add(through)
+
+    def import_csv(self, path: str, model) -> int:
+        count = 0
+        with open(path, newline="", encoding="utf-8") as stream:
+            batch = []
+            for row in csv.DictReader(stream):
+                batch.append(row)
+                if len(batch) >= self.batch_size:
+                    count += self.upsert_csv_batch(model, batch)
+                    batch = []
+            if batch:
+                count += self.upsert_csv_batch(model, batch)
+        self.touched_models.add(model)
+        return count
+
+    def upsert_csv_batch(self, model, rows: list[dict]) -> int:
+        if model in (Country, AirplaneType):
+            names = normalize_names(model, [row["name"] for row in rows])
+            instances = [model(name=name) for name in dict.fromkeys(names) if name]
+            model.objects.bulk_create(instances, ignore_conflicts=True)
+            return len(instances)
+
+        if model is City:
+            countries = self.country_map(row["country"] for row in rows)
+            names = normalize_names(City, [row["name"] for row in rows])
+            keys = dict.fromkeys(
+                (name, countries[Country.normalize_name(row["country"])])
+                for name, row in zip(names, rows)
+                if name
+            )
+            City.objects.bulk_create(
+                [City(name=name, country_id=country) for name, country in keys],
+                ignore_conflicts=True,
+            )
+            return len(keys)
+
+        cities = self.city_map((row["city"], row["country"]) for row in rows)
+        keys = dict.fromkeys(
+            (
+                row["name"].strip(),
+                cities[
+                    (City.normalize_name(row["city"]), Country.normalize_name(row["country"]))
+                ],
+            )
+            for row in rows
+            if row["name"].strip()
+        )
+        # Airports have no natural key constraint, so existing (name, city)
+        # pairs are filtered out here to keep re-imports idempotent.
+        existing = set(
+            Airport.objects.filter(
+                closest_big_city_id__in={city for _, city in keys}
+            ).values_list("name", "closest_big_city_id")
+        )
+        created = Airport.objects.bulk_create(
+            [
+                Airport(name=name, closest_big_city_id=city)
+                for name, city in keys
+                if (name, city) not in existing
+            ]
+        )
+        return len(created)
+
+    def country_map(self, names) -> dict[str, int]:
+        names = set(normalize_names(Country, list(names)))
+        countries = dict(
+            Country.objects.filter(name__in=names).values_list("name", "id")
+        )
+        missing = names - countries.keys()
+        if missing:
+            raise ValueError(f"Unknown countries: {', '.join(sorted(missing))}")
+        return countries
+
+    def city_map(self, pairs) -> dict[tuple[str, str], int]:
+        pairs = {
+            (City.normalize_name(city), Country.normalize_name(country))
+            for city, country in pairs
+        }
+        cities = {
+            (name, country): pk
+            for pk, name, country in City.objects.filter(
+                name__in={city for city, _ in pairs},
+                country__name__in={country for _, country in pairs},
+            ).values_list("id", "name", "country__name")
+        }
+        missing = pairs - cities.keys()
+        if missing:
+            raise ValueError(
+                "Unknown cities: "
+                + ", ".join(f"{city} ({country})" for city, country in sorted(missing))
+            )
+        return cities
+
+    def reset_sequences(self):
+        statements = connection.ops.sequence_reset_sql(
+            no_style(), list(self.touched_models)
+        )
+        if statements:
+            with connection.cursor() as cursor:
+                for sql in statements:
+                    cursor.execute(sql)
@@ -0,0 +1,134 @@
+import json
+import random
+import statistics
+import time
+
+import psycopg
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from air_service.models import Flight, Order, Ticket
+
+
+def flight_list(rng, samples):
+    page_size = settings.REST_FRAMEWORK["PAGE_SIZE"]
+    return Flight.objects.select_related().with_tickets_available()[:page_size].query
+
+
+def flight_detail(rng, samples):
+    return (
+        Flight.objects.select_related()
+        .with_tickets_available()
+        .filter(pk=rng.choice(samples["flights"]))
+        .query
+    )
+
+
+def ticket_user_filter(rng, samples):
+    page_size = settings.REST_FRAMEWORK["PAGE_SIZE"]
+    return (
+        Ticket.objects.select_related()
+        .filter(order__user_id=rng.choice(samples["users"]))[:page_size]
+        .query
+    )
+
+
+def ticket_uniqueness(rng, samples):
+    # The check full_clean() runs for unique_ticket_seat_row_flight.
+    return (
+        Ticket.objects.filter(
+            seat=rng.randint(1, 6),
+            row=rng.randint(1, 30),
+            flight_id=rng.choice(samples["flights"]),
+        )
+        .query.exists()
+    )
+
+
+SHAPES = {
+    "flight-list": flight_list,
+    "flight-detail": flight_detail,
+    "ticket-user-filter": ticket_user_filter,
+    "ticket-uniqueness": ticket_uniqueness,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the hot flight and ticket query shapes executed with and "
+        "without server-side prepared statements (PostgreSQL only)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=500)
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--output", help="Write results as JSON to this file.")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("Prepared statements need DATABASE_ENGINE=postgresql.")
+
+        self.samples = {
+            "flights": list(Flight.objects.values_list("pk", flat=True)[:1000]),
+            "users": list(
+                Order.objects.values_list("user_id", flat=True).distinct()[:1000]
+            ),
+        }
+        if not self.samples["flights"] or not self.samples["users"]:
+            raise CommandError("Load a dataset first (generate_airline_data).")
+
+        connection.ensure_connection()
+        results = {}
+        for name, build in SHAPES.items():
+            results[name] = self.measure(build, options)
+            self.print_result(name, results[name])
+
+        if options["output"]:
+            with open(options["output"], "w") as output:
+                json.dump(results, output, indent=2)
+
+    def measure(self, build, options) -> dict:
+        result = {}
+        for mode, prepare in (("unprepared", False), ("prepared", True)):
+            rng = random.Random(options["seed"])
+            timings = []
+            # A fresh cursor with server-side binding, whatever
+            # DATABASE_PREPARED_STATEMENTS is set to.
+            with psycopg.Cursor(connection.connection) as cursor:
+                for _ in range(options["iterations"]):
+                    sql, params = self.compile(build, rng)
+                    started = time.perf_counter()
+                    cursor.execute(sql, params, prepare=prepare)
+                    cursor.fetchall()
+                    timings.append(time.perf_counter() - started)
+            result[f"{mode}_mean_ms"] = statistics.fmean(timings) * 1000
+            result[f"{mode}_p50_ms"] = statistics.median(timings) * 1000
+
+        result["planning_ms"], result["execution_ms"] = self.explain(build, options)
+        result["saved_ms"] = result["unprepared_mean_ms"] - result["prepared_mean_ms"]
+        return result
+
+    def explain(self, build, options) -> tuple[float, float]:
+        rng = random.Random(options["seed"])
+        planning, execution = [], []
+        with psycopg.Cursor(connection.connection) as cursor:
+            for _ in range(min(options["iterations"], 50)):
+                sql, params = self.compile(build, rng)
+                cursor.execute(f"EXPLAIN (ANALYZE, FORMAT JSON) {sql}", params)
+                plan = cursor.fetchone()[0][0]
+                planning.append(plan["Planning Time"])
+                execution.append(plan["Execution Time"])
+        return statistics.fmean(planning), statistics.fmean(execution)
+
+    def compile(self, build, rng) -> tuple[str, tuple]:
+        return build(rng, self.samples).get_compiler(connection.alias).as_sql()
+
+    def print_result(self, name: str, result: dict):
+        self.stdout.write(
+            f"{name:<20} unprepared {result['unprepared_mean_ms']:>7.3f}ms "
+            f"prepared {result['prepared_mean_ms']:>7.3f}ms "
+            f"saved {result['saved_ms']:>7.3f}ms/query "
+            f"(EXPLAIN planning {result['planning_ms']:.3f}ms, "
+            f"execution {result['execution_ms']:.3f}ms)"
+        )
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from air_service import occupancy
+from air_service.models import FlightOccupancy, RouteDailyOccupancy
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the occupancy totals from flights and tickets. Run once "
+        "for existing data and after loading tickets in bulk."
+    )
+
+    def handle(self, *args, **options):
+        occupancy.rebuild()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Rebuilt occupancy of {FlightOccupancy.objects.count()} flights "
+                f"and {RouteDailyOccupancy.objects.count()} route days."
+            )
+        )
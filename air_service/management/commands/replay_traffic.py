@@ -0,0 +1,104 @@
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.tokens import AccessToken
+
+from air_service.benchmarking import HttpClient, HttpRequest, Summary
+from air_service.traffic import endpoint_name, load_traffic, schedule
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay recorded traffic against a test instance and report "
+        "the latency distribution."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--file", default=settings.TRAFFIC_RECORDING_PATH)
+        parser.add_argument("--url", default="http://127.0.0.1:8000")
+        parser.add_argument(
+            "--speed",
+            type=float,
+            default=1.0,
+            help="1 keeps the recorded pace, 4 replays 4x faster, 0 as fast as possible.",
+        )
+        parser.add_argument("--concurrency", type=int, default=32)
+        parser.add_argument("--limit", type=int)
+        parser.add_argument(
+            "--no-auth",
+            action="store_true",
+            help="Do not mint tokens for the recorded users.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            entries = load_traffic(options["file"], options["limit"])
+        except FileNotFoundError:
+            raise CommandError(f"No traffic recording at {options['file']}")
+
+        # Request bodies are not recorded, so only reads can be replayed.
+        skipped = sum(1 for entry in entries if entry["method"] not in SAFE_METHODS)
+        entries = [entry for entry in entries if entry["method"] in SAFE_METHODS]
+        if not entries:
+            raise CommandError("Nothing to replay.")
+
+        tokens = {} if options["no_auth"] else self.tokens_for(entries)
+        client = HttpClient(options["url"])
+        plan = schedule(entries, options["speed"])
+
+        samples = defaultdict(list)
+        lock = threading.Lock()
+        lag = []
+
+        def send(offset: float, entry: dict):
+            lag.append(time.perf_counter() - started - offset)
+            headers = {}
+            if entry.get("user") in tokens:
+                headers["Authorization"] = f"Bearer {tokens[entry['user']]}"
+            path = entry["path"] + (f"?{entry['query']}" if entry.get("query") else "")
+            sample = client.send(HttpRequest(entry["method"], path, headers=headers))
+            with lock:
+                samples[endpoint_name(entry["method"], entry["path"])].append(sample)
+
+        self.stdout.write(
+            f"Replaying {len(plan)} requests ({skipped} writes skipped) "
+            f"at speed {options['speed'] or 'max'}"
+        )
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options["concurrency"]) as executor:
+            for offset, entry in plan:
+                delay = offset - (time.perf_counter() - started)
+                if delay > 0:
+                    time.sleep(delay)
+                executor.submit(send, offset, entry)
+        elapsed = time.perf_counter() - started
+
+        everything = [sample for group in samples.values() for sample in group]
+        self.print_summary("TOTAL", Summary.from_samples(everything, elapsed))
+        for name, group in sorted(
+            samples.items(), key=lambda item: len(item[1]), reverse=True
+        ):
+            self.print_summary(name, Summary.from_samples(group, elapsed))
+        if lag:
+            self.stdout.write(f"Max scheduling lag: {max(lag) * 1000:.1f}ms")
+
+    def tokens_for(self, entries: list[dict]) -> dict:
+        user_ids = {entry["user"] for entry in entries if entry.get("user")}
+        return {
+            user.pk: str(AccessToken.for_user(user))
+            for user in get_user_model().objects.filter(pk__in=user_ids)
+        }
+
+    def print_summary(self, name: str, summary: Summary):
+        self.stdout.write(
+            f"{name:<45} n={summary.requests:<6} "
+            f"p50 {summary.p50_ms:>8.2f}ms p95 {summary.p95_ms:>8.2f}ms "
+            f"p99 {summary.p99_ms:>8.2f}ms max {summary.max_ms:>8.2f}ms "
+            f"errors {summary.errors}"
+        )
@@ -0,0 +1,166 @@
+"""
+Authorized delivery of files under ``MEDIA_ROOT``.
+
+The view only checks the request and the file. With ``MEDIA_ACCEL=nginx``
+(``X-Accel-Redirect``) or ``MEDIA_ACCEL=sendfile`` (``X-Sendfile``) the
+transfer itself, including ranges and conditional requests, is left to the
+front proxy. Otherwise Django answers conditional and single-range requests
+itself and returns whole files as a ``FileResponse``, which WSGI servers send
+with ``sendfile()``.
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import (
+    FileResponse,
+    Http404,
+    HttpResponse,
+    StreamingHttpResponse,
+)
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.views import APIView
+
+# Uploads under these prefixes get content-hashed names (see
+# models.airplane_image_path), so a URL always refers to the same bytes.
+IMMUTABLE_PREFIXES = ("upload/airplanes/",)
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+CHUNK_SIZE = 64 * 1024
+
+
+def file_etag(stat: os.stat_result) -> str:
+    return f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+
+
+def cache_control(path: str) -> str:
+    if path.startswith(IMMUTABLE_PREFIXES):
+        return "private, max-age=31536000, immutable"
+    return "private, no-cache"
+
+
+def parse_range(header: str, size: int) -> tuple[int, int] | None:
+    """
+    ``(start, end)`` of a single ``bytes=`` range, end inclusive, or None when
+    the whole file should be sent. Raises ValueError for unsatisfiable ones.
+    """
+    match = RANGE_RE.match(header.strip())
+    if not match or match.groups() == ("", ""):
+        # Multiple or malformed ranges may be ignored (RFC 9110, 14.2).
+        return None
+    first, last = match.groups()
+    if not first:
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start > end or start >= size:
+        raise ValueError(header)
+    return start, end
+
+
+def read_range(file, start: int, length: int):
+    with file:
+        file.seek(start)
+        while length > 0:
+            chunk = file.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+class MediaView(APIView):
+    permission_classes = [IsAuthenticated]
+    # One page of thumbnails is dozens of requests, they must not use up
+    # the API rate limits.
+    throttle_classes = []
+    schema = None
+
+    def get(self, request, path):
+        try:
+            full_path = safe_join(settings.MEDIA_ROOT, path)
+            stat = os.stat(full_path)
+        except (SuspiciousFileOperation, OSError):
+            raise Http404
+        if not os.path.isfile(full_path):
+            raise Http404
+
+        etag = file_etag(stat)
+        headers = {
+            "ETag": etag,
+            "Last-Modified": http_date(stat.st_mtime),
+            "Cache-Control": cache_control(path),
+            "Accept-Ranges": "bytes",
+        }
+
+        if settings.MEDIA_ACCEL:
+            content_type = mimetypes.guess_type(full_path)[0]
+            response = HttpResponse(
+                content_type=content_type or "application/octet-stream"
+            )
+            if settings.MEDIA_ACCEL == "nginx":
+                response["X-Accel-Redirect"] = (
+                    settings.MEDIA_ACCEL_PREFIX.rstrip("/") + "/" + quote(path)
+                )
+            else:
+                response["X-Sendfile"] = full_path
+            # nginx and Apache compute these themselves.
+            response["Cache-Control"] = headers["Cache-Control"]
+            return response
+
+        conditional = get_conditional_response(
+            request, etag=etag, last_modified=int(stat.st_mtime)
+        )
+        if conditional is not None:
+            for header, value in headers.items():
+                conditional[header] = value
+            return conditional
+
+        requested = self.requested_range(request, etag, stat)
+        if requested is not None:
+            try:
+                byte_range = parse_range(requested, stat.st_size)
+            except ValueError:
+                response = HttpResponse(status=416)
+                response["Content-Range"] = f"bytes */{stat.st_size}"
+                return response
+            if byte_range is not None:
+                start, end = byte_range
+                response = StreamingHttpResponse(
+                    read_range(open(full_path, "rb"), start, end - start + 1),
+                    status=206,
+                    content_type=mimetypes.guess_type(full_path)[0]
+                    or "application/octet-stream",
+                )
+                response["Content-Length"] = end - start + 1
+                response["Content-Range"] = f"bytes {start}-{end}/{stat.st_size}"
+                for header, value in headers.items():
+                    response[header] = value
+                return response
+
+        response = FileResponse(open(full_path, "rb"))
+        for header, value in headers.items():
+            response[header] = value
+        return response
+
+    @staticmethod
+    def requested_range(request, etag: str, stat: os.stat_result) -> str | None:
+        requested = request.headers.get("Range")
+        if requested is None:
+            return None
+        # A stale If-Range means the client's partial copy is outdated.
+        if_range = request.headers.get("If-Range")
+        if if_range is not None:
+            if if_range.startswith(('"', 'W/"')):
+                if etag not in parse_etags(if_range):
+                    return None
+            elif parse_http_date_safe(if_range) != int(stat.st_mtime):
+                return None
+        return requested
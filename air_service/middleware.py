@@ -0,0 +1,138 @@
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from rest_framework.permissions import SAFE_METHODS
+
+from air_service import db_router
+from air_service.benchmarking import QUERY_COUNT_HEADER
+from air_service.traffic import TrafficRecorder
+
+
+class QueryCountMiddleware:
+    """
+    Report the number of SQL queries a request ran in ``X-Query-Count``.
+
+    Only installed when ``QUERY_COUNT_HEADER`` is enabled in settings, the
+    benchmark harness reads the header to track queries per request.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        queries = 0
+
+        def count(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(count))
+            response = self.get_response(request)
+
+        response[QUERY_COUNT_HEADER] = str(queries)
+        return response
+
+
+class TrafficRecorderMiddleware:
+    """
+    Sample API requests into ``TRAFFIC_RECORDING_PATH`` for later replay.
+
+    Records method, path, query string, authenticated user id, status and
+    duration. Writing happens on a background thread, see ``TrafficRecorder``.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.prefix = settings.TRAFFIC_RECORDING_PREFIX
+        self.recorder = TrafficRecorder(
+            settings.TRAFFIC_RECORDING_PATH,
+            sample_rate=settings.TRAFFIC_RECORDING_SAMPLE_RATE,
+            queue_size=settings.TRAFFIC_RECORDING_QUEUE_SIZE,
+        )
+
+    def __call__(self, request):
+        if not request.path.startswith(self.prefix) or not self.recorder.should_sample():
+            return self.get_response(request)
+
+        timestamp = time.time()
+        started = time.perf_counter()
+        response = self.get_response(request)
+        duration = time.perf_counter() - started
+
+        user = getattr(request, "user", None)
+        self.recorder.record(
+            {
+                "ts": round(timestamp, 6),
+                "method": request.method,
+                "path": request.path,
+                "query": request.META.get("QUERY_STRING", ""),
+                "user": user.pk if user is not None and user.is_authenticated else None,
+                "status": response.status_code,
+                "duration_ms": round(duration * 1000, 3),
+            }
+        )
+        return response
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Tell ``ReplicaRouter`` which requests may read from a replica.
+
+    Safe requests to the air-service API are marked read only. A successful
+    unsafe request pins its caller to the primary for
+    ``REPLICA_PIN_SECONDS`` so the next reads see the write.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state = db_router.RoutingState(client=db_router.client_key(request))
+        token = db_router._state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            db_router._state.reset(token)
+        if self.should_pin(request, state, response):
+            db_router.pin_to_primary(state.client)
+        return response
+
+    async def __acall__(self, request):
+        state = db_router.RoutingState(client=db_router.client_key(request))
+        token = db_router._state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            db_router._state.reset(token)
+        if self.should_pin(request, state, response):
+            await sync_to_async(db_router.pin_to_primary)(state.client)
+        return response
+
+    @staticmethod
+    def should_pin(request, state, response) -> bool:
+        return (
+            request.method not in SAFE_METHODS
+            and state.client is not None
+            and response.status_code < 400
+        )
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        state = db_router._state.get()
+        if state is not None:
+            state.read_only = (
+                request.method in SAFE_METHODS
+                and request.resolver_match.app_name == "air-service"
+            )
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.1 on 2026-10-19 10:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("air_service", "0007_alter_city_unique_together_alter_order_user_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="airplane",
+            name="image_variants",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
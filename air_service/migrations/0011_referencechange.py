@@ -0,0 +1,22 @@
+# Generated by Django 5.1.1 on 2026-10-19 11:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("air_service", "0010_tableversion"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ReferenceChange",
+            fields=[
+                ("id", models.BigAutoField(primary_key=True, serialize=False)),
+                ("table", models.CharField(max_length=50)),
+                ("object_id", models.BigIntegerField(null=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+    ]
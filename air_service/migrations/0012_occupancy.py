@@ -0,0 +1,93 @@
+# Generated by Django 5.1.1 on 2026-10-19 11:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("air_service", "0011_referencechange"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="OccupancyChange",
+            fields=[
+                ("id", models.BigAutoField(primary_key=True, serialize=False)),
+                ("flight_id", models.BigIntegerField()),
+                ("sold", models.SmallIntegerField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name="FlightOccupancy",
+            fields=[
+                (
+                    "flight",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="occupancy",
+                        serialize=False,
+                        to="air_service.flight",
+                    ),
+                ),
+                ("day", models.DateField()),
+                ("seats", models.PositiveIntegerField()),
+                ("sold", models.IntegerField(default=0)),
+                (
+                    "route",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="air_service.route",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["day", "flight"],
+                "indexes": [
+                    models.Index(
+                        fields=["route", "day"], name="air_service_route_i_e7d5b0_idx"
+                    )
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="RouteDailyOccupancy",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField()),
+                ("flights", models.PositiveIntegerField()),
+                ("seats", models.PositiveIntegerField()),
+                ("sold", models.IntegerField()),
+                (
+                    "route",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="air_service.route",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["day", "route"],
+                "indexes": [
+                    models.Index(fields=["day"], name="air_service_day_c32d1a_idx")
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("route", "day"), name="unique_route_day"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,80 @@
+# Generated by Django 5.1.1 on 2026-10-19 11:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("air_service", "0012_occupancy"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="FlightSchedule",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "days_of_week",
+                    models.CharField(
+                        help_text="ISO weekdays the flight operates on, e.g. 135 for Monday, Wednesday and Friday.",
+                        max_length=7,
+                    ),
+                ),
+                (
+                    "departure_time",
+                    models.TimeField(help_text="Local time in ``timezone``."),
+                ),
+                ("duration", models.DurationField()),
+                ("timezone", models.CharField(default="Europe/Kiev", max_length=64)),
+                ("valid_from", models.DateField()),
+                ("valid_until", models.DateField()),
+                ("expanded_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "airplane",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="schedules",
+                        to="air_service.airplane",
+                    ),
+                ),
+                (
+                    "route",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="schedules",
+                        to="air_service.route",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["valid_from", "departure_time"],
+            },
+        ),
+        migrations.AddField(
+            model_name="flight",
+            name="schedule",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="flights",
+                to="air_service.flightschedule",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="flight",
+            constraint=models.UniqueConstraint(
+                fields=("schedule", "departure_time"), name="unique_schedule_departure"
+            ),
+        ),
+    ]
@@ -0,0 +1,91 @@
+# Generated by Django 5.1.1 on 2026-10-19 11:33
+
+from django.contrib.postgres.constraints import ExclusionConstraint
+from django.contrib.postgres.fields import RangeBoundary, RangeOperators
+from django.contrib.postgres.operations import BtreeGistExtension
+from django.core.management.base import CommandError
+from django.db import migrations, models
+from django.db.models import F, Func, OuterRef, Subquery
+
+
+class TsTzRange(Func):
+    function = "TSTZRANGE"
+    output_field = models.DateTimeField()
+
+
+# PostgreSQL only, so it is added here rather than in Flight.Meta.
+NO_OVERLAP = ExclusionConstraint(
+    name="flight_airplane_no_overlap",
+    expressions=[
+        ("airplane", RangeOperators.EQUAL),
+        (
+            TsTzRange("departure_time", "arrival_time", RangeBoundary()),
+            RangeOperators.OVERLAPS,
+        ),
+    ],
+)
+
+
+def check_no_overlaps(flight_model):
+    """Refuse to add the constraint while stored flights would violate it."""
+    later = flight_model.objects.filter(
+        airplane=OuterRef("airplane"),
+        pk__gt=OuterRef("pk"),
+        departure_time__lt=OuterRef("arrival_time"),
+        arrival_time__gt=OuterRef("departure_time"),
+    )
+    overlapping = list(
+        flight_model.objects.annotate(other=Subquery(later.values("pk")[:1]))
+        .filter(other__isnull=False)
+        .order_by("pk")
+        .values_list("airplane_id", "pk", "other")[:20]
+    )
+    backwards = list(
+        flight_model.objects.filter(arrival_time__lt=F("departure_time"))
+        .order_by("pk")
+        .values_list("pk", flat=True)[:20]
+    )
+    if not overlapping and not backwards:
+        return
+    lines = [
+        f"airplane {airplane_id}: flights {pk} and {other} overlap"
+        for airplane_id, pk, other in overlapping
+    ] + [f"flight {pk} arrives before it departs" for pk in backwards]
+    raise CommandError(
+        "Cannot add the flight_airplane_no_overlap constraint, fix these "
+        "flights first (at most 20 of each kind are listed):\n"
+        + "\n".join(f"  {line}" for line in lines)
+    )
+
+
+def add_no_overlap(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        flight_model = apps.get_model("air_service", "Flight")
+        check_no_overlaps(flight_model)
+        schema_editor.add_constraint(flight_model, NO_OVERLAP)
+
+
+def remove_no_overlap(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.remove_constraint(
+            apps.get_model("air_service", "Flight"), NO_OVERLAP
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("air_service", "0013_flightschedule"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="flight",
+            index=models.Index(
+                fields=["airplane", "departure_time"], name="flight_airplane_departure"
+            ),
+        ),
+        # Does nothing on other databases.
+        BtreeGistExtension(),
+        migrations.RunPython(add_no_overlap, remove_no_overlap),
+    ]
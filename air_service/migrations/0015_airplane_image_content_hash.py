@@ -0,0 +1,21 @@
+# Generated by Django 5.1.1 on 2026-10-19 11:52
+
+import air_service.models
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("air_service", "0014_flight_overlaps"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="airplane",
+            name="image",
+            field=air_service.models.ContentHashedImageField(
+                blank=True, null=True, upload_to=air_service.models.airplane_image_path
+            ),
+        ),
+    ]
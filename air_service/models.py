@@ -1,10 +1,12 @@
+import hashlib
 import pathlib
-import uuid
 from datetime import datetime
 
 from django.conf import settings
 from django.db import models
 from django.db.models import CASCADE, UniqueConstraint
+from django.db.models.fields.files import ImageFieldFile
+from django.utils import timezone
 from django.utils.text import slugify
 
 
@@ -15,8 +17,12 @@ class Country(models.Model):
         ordering = ["name"]
         verbose_name_plural = "countries"
 
+    @staticmethod
+    def normalize_name(name: str) -> str:
+        return " ".join([word.capitalize() for word in name.split()])
+
     def save(self, *args, **kwargs):
-        self.name = " ".join([word.capitalize() for word in self.name.split()])
+        self.name = self.normalize_name(self.name)
         self.full_clean()
         return super().save(*args, **kwargs)
 
@@ -35,8 +41,12 @@ class City(models.Model):
             models.UniqueConstraint(fields=["name", "country"], name="unique_city_country")
         ]
 
+    @staticmethod
+    def normalize_name(name: str) -> str:
+        return name.capitalize()
+
     def save(self, *args, **kwargs):
-        self.name = self.name.capitalize()
+        self.name = self.normalize_name(self.name)
         self.full_clean()
         return super().save(*args, **kwargs)
 
@@ -59,8 +69,12 @@ class Crew(models.Model):
 class AirplaneType(models.Model):
     name = models.CharField(max_length=255, unique=True)
 
+    @staticmethod
+    def normalize_name(name: str) -> str:
+        return name.capitalize()
+
     def save(self, *args, **kwargs, ):
-        self.name = self.name.capitalize()
+        self.name = self.normalize_name(self.name)
         self.full_clean()
         return super().save(*args, **kwargs)
 
@@ -79,18 +93,50 @@ class Airport(models.Model):
         return f"{self.name} (closest city - {self.closest_big_city})"
 
 
+def content_hash(file) -> str:
+    digest = hashlib.sha256()
+    file.seek(0)
+    for chunk in file.chunks():
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()[:16]
+
+
 def airplane_image_path(instance: "Airplane", filename: str) -> pathlib.Path:
-    filename = f"{slugify(instance.name)}-{uuid.uuid4()}" + pathlib.Path(filename).suffix
+    """
+    Name uploads after their content, so an image URL never changes meaning
+    and can be cached as immutable (see media_views).
+    """
+    filename = (
+        f"{slugify(instance.name)}-{instance.image.content_hash}"
+        + pathlib.Path(filename).suffix.lower()
+    )
     return pathlib.Path("upload/airplanes/") / pathlib.Path(filename)
 
 
+class ContentHashedImageFieldFile(ImageFieldFile):
+    def save(self, name, content, save=True):
+        # upload_to only gets the name, it reads the hash of the file being
+        # saved from here.
+        self.content_hash = content_hash(content)
+        super().save(name, content, save)
+
+
+class ContentHashedImageField(models.ImageField):
+    attr_class = ContentHashedImageFieldFile
+
+
 class Airplane(models.Model):
     name = models.CharField(max_length=255)
     rows = models.PositiveIntegerField()
     seats_in_row = models.PositiveIntegerField()
     airplane_type = models.ForeignKey(AirplaneType, on_delete=CASCADE, related_name="airplanes")
     crew = models.ManyToManyField(Crew, related_name="airplanes", blank=True)
-    image = models.ImageField(null=True, blank=True, upload_to=airplane_image_path)
+    image = ContentHashedImageField(
+        null=True, blank=True, upload_to=airplane_image_path
+    )
+    # Variant name -> storage path, filled by tasks.process_airplane_image.
+    image_variants = models.JSONField(default=dict, blank=True)
 
     def __str__(self) -> str:
         return (
@@ -102,6 +148,49 @@ class Airplane(models.Model):
     def capacity(self):
         return int(self.rows * self.seats_in_row)
 
+    @property
+    def media_paths(self) -> list[str]:
+        """Storage paths of the image and its variants."""
+        if not self.image:
+            return []
+        return [self.image.name, *self.image_variants.values()]
+
+
+class TableVersion(models.Model):
+    """Change counter of one table, see table_versions."""
+
+    table = models.CharField(max_length=100, primary_key=True)
+    version = models.BigIntegerField(default=0)
+    changed_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self) -> str:
+        return f"{self.table} v{self.version}"
+
+
+class ReferenceChange(models.Model):
+    """
+    Change log of the reference tables, see reference_data. ``object_id`` is
+    empty when the whole table changed, e.g. after a bulk import.
+    """
+
+    id = models.BigAutoField(primary_key=True)
+    table = models.CharField(max_length=50)
+    object_id = models.BigIntegerField(null=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self) -> str:
+        return f"{self.pk}: {self.table} {self.object_id or '*'}"
+
+
+class OrphanedFile(models.Model):
+    """A stored file no row refers to any more, removed by storage_gc."""
+
+    path = models.CharField(max_length=500, unique=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self) -> str:
+        return self.path
+
 
 class Route(models.Model):
     source = models.ForeignKey(Airport, on_delete=CASCADE, related_name="source_routes")
@@ -126,14 +215,75 @@ class Route(models.Model):
         return round(self.distance / 1.852)
 
 
+class FlightSchedule(models.Model):
+    """A recurring flight, expanded into Flight rows by schedules.expand."""
+
+    route = models.ForeignKey(Route, on_delete=CASCADE, related_name="schedules")
+    airplane = models.ForeignKey(
+        Airplane, on_delete=CASCADE, related_name="schedules"
+    )
+    days_of_week = models.CharField(
+        max_length=7,
+        help_text="ISO weekdays the flight operates on, e.g. 135 for "
+        "Monday, Wednesday and Friday.",
+    )
+    departure_time = models.TimeField(help_text="Local time in ``timezone``.")
+    duration = models.DurationField()
+    timezone = models.CharField(max_length=64, default=settings.TIME_ZONE)
+    valid_from = models.DateField()
+    valid_until = models.DateField()
+    expanded_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["valid_from", "departure_time"]
+
+    def __str__(self) -> str:
+        return (
+            f"{self.route} on {self.days_of_week} at {self.departure_time}, "
+            f"{self.valid_from} - {self.valid_until}"
+        )
+
+
+class FlightQuerySet(models.QuerySet):
+    def with_tickets_available(self):
+        return self.annotate(
+            tickets_available=(
+                models.F("airplane__rows") * models.F("airplane__seats_in_row")
+                - models.Count("tickets")
+            )
+        )
+
+
 class Flight(models.Model):
     route = models.ForeignKey(Route, on_delete=CASCADE, related_name="flights")
     airplane = models.ForeignKey(Airplane, on_delete=CASCADE, related_name="flights")
     departure_time = models.DateTimeField()
     arrival_time = models.DateTimeField()
+    schedule = models.ForeignKey(
+        FlightSchedule,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="flights",
+    )
+
+    objects = FlightQuerySet.as_manager()
 
     class Meta:
         ordering = ["-departure_time"]
+        constraints = [
+            UniqueConstraint(
+                fields=["schedule", "departure_time"],
+                name="unique_schedule_departure",
+            )
+        ]
+        indexes = [
+            # Overlap checks, see air_service.overlaps.
+            models.Index(
+                fields=["airplane", "departure_time"],
+                name="flight_airplane_departure",
+            )
+        ]
 
     @property
     def flight_time(self) -> str:
@@ -229,3 +379,53 @@ class Order(models.Model):
 
     def __str__(self) -> str:
         return str(self.created_at)
+
+
+class FlightOccupancy(models.Model):
+    """Seats and sold tickets of one flight, maintained by occupancy."""
+
+    flight = models.OneToOneField(
+        Flight, on_delete=CASCADE, primary_key=True, related_name="occupancy"
+    )
+    route = models.ForeignKey(Route, on_delete=CASCADE, related_name="+")
+    day = models.DateField()
+    seats = models.PositiveIntegerField()
+    sold = models.IntegerField(default=0)
+
+    class Meta:
+        indexes = [models.Index(fields=["route", "day"])]
+        ordering = ["day", "flight"]
+
+    def __str__(self) -> str:
+        return f"Flight {self.flight_id}: {self.sold}/{self.seats}"
+
+
+class RouteDailyOccupancy(models.Model):
+    """Flights, seats and sold tickets of a route on one day."""
+
+    route = models.ForeignKey(Route, on_delete=CASCADE, related_name="+")
+    day = models.DateField()
+    flights = models.PositiveIntegerField()
+    seats = models.PositiveIntegerField()
+    sold = models.IntegerField()
+
+    class Meta:
+        constraints = [
+            UniqueConstraint(fields=["route", "day"], name="unique_route_day")
+        ]
+        indexes = [models.Index(fields=["day"])]
+        ordering = ["day", "route"]
+
+    def __str__(self) -> str:
+        return f"Route {self.route_id} on {self.day}: {self.sold}/{self.seats}"
+
+
+class OccupancyChange(models.Model):
+    """A booking (+1) or cancellation (-1) not yet compacted into the totals."""
+
+    id = models.BigAutoField(primary_key=True)
+    flight_id = models.BigIntegerField()
+    sold = models.SmallIntegerField()
+
+    def __str__(self) -> str:
+        return f"Flight {self.flight_id}: {self.sold:+d}"
@@ -0,0 +1,239 @@
+"""
+Occupancy totals per flight and per route and day, for load-factor reports.
+
+Booking a ticket or deleting one appends an ``OccupancyChange`` in the same
+transaction, an insert that never contends with other bookings of the
+flight. ``compact`` (the ``compact_occupancy`` Celery task) folds the
+changes into ``FlightOccupancy`` and recomputes the affected
+``RouteDailyOccupancy`` rows from it, so reports read small pre-aggregated
+tables and never the tickets. They lag bookings by at most one compaction.
+Without Redis there is no beat, so the booking's transaction compacts once
+it commits.
+
+Saving or deleting a flight, or changing an airplane's seats, updates the
+totals right away. ``rebuild`` computes everything from the tickets, once
+for existing data and after bulk loads that send no signals.
+"""
+from collections import Counter
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Case, Count, F, Q, Sum, Value, When
+from django.utils import timezone
+
+from air_service.models import (
+    Flight,
+    FlightOccupancy,
+    OccupancyChange,
+    RouteDailyOccupancy,
+)
+
+
+def flight_day(flight):
+    return timezone.localdate(flight.departure_time)
+
+
+def record_booking(flight_id: int, sold: int):
+    OccupancyChange.objects.create(flight_id=flight_id, sold=sold)
+    if settings.USE_REDIS:
+        return
+    # Once per transaction, however many tickets it books.
+    connection = transaction.get_connection(DEFAULT_DB_ALIAS)
+    if not any(func is compact_all for _, func, _ in connection.run_on_commit):
+        # The booking is committed by then, a failure only delays the totals.
+        transaction.on_commit(compact_all, robust=True)
+
+
+def flight_saved(flight: Flight):
+    old = (
+        FlightOccupancy.objects.filter(flight=flight)
+        .values_list("route_id", "day")
+        .first()
+    )
+    occupancy, _ = FlightOccupancy.objects.update_or_create(
+        flight=flight,
+        defaults={
+            "route_id": flight.route_id,
+            "day": flight_day(flight),
+            "seats": flight.airplane.rows * flight.airplane.seats_in_row,
+        },
+    )
+    refresh_route_days({old, (occupancy.route_id, occupancy.day)} - {None})
+
+
+def flight_deleted(flight: Flight):
+    # The FlightOccupancy row is gone with the flight by now.
+    refresh_route_days({(flight.route_id, flight_day(flight))})
+
+
+def airplane_saved(airplane):
+    seats = airplane.rows * airplane.seats_in_row
+    changed = FlightOccupancy.objects.filter(flight__airplane=airplane).exclude(
+        seats=seats
+    )
+    pairs = set(changed.values_list("route_id", "day"))
+    if pairs:
+        changed.update(seats=seats)
+        refresh_route_days(pairs)
+
+
+def flights_changed(flight_ids, batch_size: int = 1000):
+    """Update the totals of flights created or changed in bulk."""
+    pairs = set(
+        FlightOccupancy.objects.filter(pk__in=flight_ids).values_list(
+            "route_id", "day"
+        )
+    )
+    rows = [
+        FlightOccupancy(
+            flight_id=flight_id,
+            route_id=route_id,
+            day=timezone.localdate(departure_time),
+            seats=seats,
+        )
+        for flight_id, route_id, departure_time, seats in Flight.objects.filter(
+            pk__in=flight_ids
+        )
+        .annotate(seats=F("airplane__rows") * F("airplane__seats_in_row"))
+        .values_list("pk", "route_id", "departure_time", "seats")
+    ]
+    FlightOccupancy.objects.bulk_create(
+        rows,
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=["flight"],
+        update_fields=["route", "day", "seats"],
+    )
+    refresh_route_days(pairs | {(row.route_id, row.day) for row in rows})
+
+
+def refresh_route_days(pairs: set):
+    """Recompute the ``(route_id, day)`` totals from the flight totals."""
+    if not pairs:
+        return
+    totals = {}
+    for route_id, day, flights, seats, sold in (
+        FlightOccupancy.objects.filter(
+            route_id__in={route_id for route_id, _ in pairs},
+            day__in={day for _, day in pairs},
+        )
+        .order_by()
+        .values("route_id", "day")
+        .annotate(flights=Count("pk"), seats=Sum("seats"), sold=Sum("sold"))
+        .values_list("route_id", "day", "flights", "seats", "sold")
+    ):
+        if (route_id, day) in pairs:
+            totals[route_id, day] = (flights, seats, sold)
+
+    RouteDailyOccupancy.objects.bulk_create(
+        [
+            RouteDailyOccupancy(
+                route_id=route_id, day=day, flights=flights, seats=seats, sold=sold
+            )
+            for (route_id, day), (flights, seats, sold) in totals.items()
+        ],
+        update_conflicts=True,
+        unique_fields=["route", "day"],
+        update_fields=["flights", "seats", "sold"],
+    )
+    empty = pairs - totals.keys()
+    if empty:
+        condition = Q()
+        for route_id, day in empty:
+            condition |= Q(route_id=route_id, day=day)
+        RouteDailyOccupancy.objects.filter(condition).delete()
+
+
+def compact(batch_size: int | None = None) -> int:
+    """Fold up to ``batch_size`` changes into the totals, returns how many."""
+    batch_size = batch_size or settings.OCCUPANCY_COMPACT_BATCH_SIZE
+    with transaction.atomic():
+        # Concurrent runs take disjoint batches.
+        changes = list(
+            OccupancyChange.objects.select_for_update(skip_locked=True)
+            .order_by("pk")
+            .values_list("pk", "flight_id", "sold")[:batch_size]
+        )
+        if not changes:
+            return 0
+
+        sold = Counter()
+        for _, flight_id, delta in changes:
+            sold[flight_id] += delta
+        sold = {flight_id: delta for flight_id, delta in sold.items() if delta}
+        if sold:
+            # Flights saved without signals, e.g. loaded in bulk, have no
+            # totals yet. Changes of deleted flights have nothing to update.
+            missing = sold.keys() - set(
+                FlightOccupancy.objects.filter(pk__in=sold).values_list(
+                    "pk", flat=True
+                )
+            )
+            if missing:
+                flights_changed(missing)
+            flights = FlightOccupancy.objects.filter(pk__in=sold)
+            flights.update(
+                sold=F("sold")
+                + Case(
+                    *(
+                        When(pk=flight_id, then=Value(delta))
+                        for flight_id, delta in sold.items()
+                    ),
+                    default=Value(0),
+                )
+            )
+            refresh_route_days(set(flights.values_list("route_id", "day")))
+        OccupancyChange.objects.filter(pk__in=[pk for pk, _, _ in changes]).delete()
+    return len(changes)
+
+
+def compact_all() -> int:
+    """Fold all pending changes into the totals, returns how many."""
+    total = 0
+    while True:
+        compacted = compact()
+        total += compacted
+        if compacted < settings.OCCUPANCY_COMPACT_BATCH_SIZE:
+            return total
+
+
+def rebuild(batch_size: int = 1000):
+    """Recompute all totals from flights and tickets."""
+    with transaction.atomic():
+        OccupancyChange.objects.all().delete()
+        RouteDailyOccupancy.objects.all().delete()
+        FlightOccupancy.objects.all().delete()
+
+        flights = (
+            Flight.objects.order_by()
+            .annotate(
+                seats=F("airplane__rows") * F("airplane__seats_in_row"),
+                sold=Count("tickets"),
+            )
+            .values_list("pk", "route_id", "departure_time", "seats", "sold")
+        )
+        rows = []
+        for flight_id, route_id, departure_time, seats, sold in flights.iterator():
+            rows.append(
+                FlightOccupancy(
+                    flight_id=flight_id,
+                    route_id=route_id,
+                    day=timezone.localdate(departure_time),
+                    seats=seats,
+                    sold=sold,
+                )
+            )
+            if len(rows) == batch_size:
+                FlightOccupancy.objects.bulk_create(rows)
+                rows = []
+        FlightOccupancy.objects.bulk_create(rows)
+
+        RouteDailyOccupancy.objects.bulk_create(
+            [
+                RouteDailyOccupancy(**totals)
+                for totals in FlightOccupancy.objects.order_by()
+                .values("route_id", "day")
+                .annotate(flights=Count("pk"), seats=Sum("seats"), sold=Sum("sold"))
+            ],
+            batch_size=batch_size,
+        )
@@ -0,0 +1,110 @@
+"""
+Detection of airplanes booked on overlapping flights.
+
+A flight occupies its airplane from departure to arrival, as the half-open
+interval ``[departure_time, arrival_time)``: an airplane may depart at the
+minute it arrived. On PostgreSQL the ``flight_airplane_no_overlap``
+exclusion constraint (migration 0014) enforces this in the database, using a
+GiST index on ``(airplane, tstzrange(departure_time, arrival_time))``, and
+also settles concurrent writes. ``conflicts`` gives the same answer before
+writing, so clients get a validation error on every database:
+
+* one query loads the flights of the candidates' airplanes within the time
+  span of the candidates, using the ``(airplane, departure_time)`` index,
+* an ``IntervalIndex`` per airplane answers each candidate in O(log n),
+* candidates are checked against each other in one sorted pass.
+"""
+from bisect import bisect_left
+from collections import defaultdict
+from datetime import datetime
+
+from django.db.models import Q
+
+from air_service.models import Flight
+
+
+class IntervalIndex:
+    """Intervals sorted by start, for overlap queries in O(log n)."""
+
+    def __init__(self, intervals):
+        self.intervals = sorted(intervals, key=lambda interval: interval[0])
+        self.starts = [start for start, _, _ in self.intervals]
+        # reach[i] is the interval ending last among intervals[:i + 1].
+        self.reach = []
+        for position, (_, end, _) in enumerate(self.intervals):
+            if not self.reach or end > self.intervals[self.reach[-1]][1]:
+                self.reach.append(position)
+            else:
+                self.reach.append(self.reach[-1])
+
+    def overlapping(self, start, end):
+        """Key of an interval overlapping ``[start, end)``, or None."""
+        if start >= end:
+            return None
+        # Only intervals starting before ``end`` can overlap, the one of them
+        # ending last does if any does.
+        position = bisect_left(self.starts, end)
+        if not position:
+            return None
+        _, other_end, key = self.intervals[self.reach[position - 1]]
+        return key if other_end > start else None
+
+
+def conflicts(
+    flights: dict[int, tuple[int, datetime, datetime]], exclude: Q | None = None
+) -> dict[int, str]:
+    """
+    Check ``{row: (airplane_id, departure_time, arrival_time)}`` candidates
+    against the stored flights, except ``exclude``, and against each other.
+
+    Returns ``{row: reason}`` for the overlapping ones.
+    """
+    found = {}
+    candidates = [
+        (row, airplane_id, departure, arrival)
+        for row, (airplane_id, departure, arrival) in flights.items()
+        if departure < arrival
+    ]
+    if not candidates:
+        return found
+
+    stored = Flight.objects.filter(
+        airplane_id__in={airplane_id for _, airplane_id, _, _ in candidates},
+        departure_time__lt=max(arrival for _, _, _, arrival in candidates),
+        arrival_time__gt=min(departure for _, _, departure, _ in candidates),
+    )
+    if exclude is not None:
+        stored = stored.exclude(exclude)
+    by_airplane = defaultdict(list)
+    for pk, airplane_id, departure, arrival in stored.order_by().values_list(
+        "pk", "airplane_id", "departure_time", "arrival_time"
+    ):
+        by_airplane[airplane_id].append((departure, arrival, pk))
+    indexes = {
+        airplane_id: IntervalIndex(intervals)
+        for airplane_id, intervals in by_airplane.items()
+    }
+
+    for row, airplane_id, departure, arrival in candidates:
+        index = indexes.get(airplane_id)
+        pk = index.overlapping(departure, arrival) if index else None
+        if pk is not None:
+            found[row] = f"The airplane is booked on flight {pk} at that time."
+
+    # Sorted by departure, a candidate overlaps an earlier one exactly when
+    # it departs before the latest arrival so far.
+    latest = {}
+    for row, airplane_id, departure, arrival in sorted(
+        candidates, key=lambda candidate: (candidate[1], candidate[2])
+    ):
+        previous = latest.get(airplane_id)
+        if previous is not None and departure < previous[1]:
+            found.setdefault(
+                row, f"The airplane is booked on row {previous[0]} at that time."
+            )
+            found.setdefault(
+                previous[0], f"The airplane is booked on row {row} at that time."
+            )
+        if previous is None or arrival > previous[1]:
+            latest[airplane_id] = (row, arrival)
+    return found
@@ -0,0 +1,172 @@
+"""
+Versioned bundle of the reference tables for offline clients.
+
+Every change of a country, city, airport, airplane type or route is logged as
+a ``ReferenceChange``; the id of the newest entry is the bundle version. The
+full bundle is rendered and gzipped once per version and kept in the cache,
+so a cold sync is one request served from memory. Clients that pass the
+version they hold as ``?since_version=`` get only the rows changed since.
+
+Tables are column-oriented (``fields`` plus ``rows`` of values) and refer to
+each other by ids only.
+"""
+import gzip
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Max, Min
+from django.utils import timezone
+
+from air_service.models import (
+    AirplaneType,
+    Airport,
+    City,
+    Country,
+    ReferenceChange,
+    Route,
+    TableVersion,
+)
+
+TABLES = {
+    "countries": (Country, ("id", "name")),
+    "cities": (City, ("id", "name", "country_id")),
+    "airports": (Airport, ("id", "name", "closest_big_city_id")),
+    "airplane_types": (AirplaneType, ("id", "name")),
+    "routes": (Route, ("id", "source_id", "destination_id", "distance")),
+}
+TABLE_NAMES = {model: name for name, (model, _) in TABLES.items()}
+
+CACHE_KEY = "reference-bundle"
+LOCK_ROW = "reference-changes"
+PENDING_KEY = "reference-bundle:pending"
+
+
+class Bundle:
+    def __init__(self, version: int, body: bytes):
+        self.version = version
+        self.body = body
+        self.gzipped = gzip.compress(body, compresslevel=9)
+
+
+def record_changes(model, object_ids=None):
+    """
+    Log changed rows of a reference table, or the whole table when
+    ``object_ids`` is None (bulk operations).
+    """
+    table = TABLE_NAMES.get(model)
+    if table is None:
+        return
+    # Row lock held until commit: entries get their ids in commit order, so
+    # a delta never misses a change that commits after a newer one.
+    TableVersion.objects.bulk_create(
+        [TableVersion(table=LOCK_ROW)], ignore_conflicts=True
+    )
+    TableVersion.objects.filter(table=LOCK_ROW).update(version=F("version") + 1)
+    ReferenceChange.objects.bulk_create(
+        [
+            ReferenceChange(table=table, object_id=object_id)
+            for object_id in (object_ids if object_ids is not None else [None])
+        ]
+    )
+    transaction.on_commit(schedule_build)
+
+
+def schedule_build():
+    cache.delete(CACHE_KEY)
+    # Without a shared cache there is nothing to pre-render into.
+    if settings.USE_REDIS and cache.add(PENDING_KEY, True, 60):
+        from air_service.tasks import build_reference_bundle
+
+        build_reference_bundle.delay()
+
+
+def current_version() -> int:
+    return ReferenceChange.objects.aggregate(version=Max("id"))["version"] or 0
+
+
+def render(payload: dict) -> bytes:
+    return json.dumps(payload, separators=(",", ":")).encode()
+
+
+def table_rows(name: str, ids=None) -> list[list]:
+    model, fields = TABLES[name]
+    queryset = model.objects.order_by("pk")
+    if ids is not None:
+        queryset = queryset.filter(pk__in=ids)
+    return [list(row) for row in queryset.values_list(*fields)]
+
+
+def build_bundle() -> Bundle:
+    """Render the full bundle and store it in the cache."""
+    # The version is read first, so the rows are at least that new; changes
+    # committed in between are sent again by the next delta.
+    version = current_version()
+    payload = {
+        "version": version,
+        "full": True,
+        "tables": {
+            name: {"fields": list(fields), "rows": table_rows(name)}
+            for name, (_, fields) in TABLES.items()
+        },
+    }
+    bundle = Bundle(version, render(payload))
+    cache.set(CACHE_KEY, bundle, None)
+    return bundle
+
+
+def get_bundle() -> Bundle:
+    bundle = cache.get(CACHE_KEY)
+    if bundle is None or bundle.version != current_version():
+        bundle = build_bundle()
+    return bundle
+
+
+def delta_floor() -> int:
+    """Oldest ``since_version`` deltas can still be computed from."""
+    oldest = ReferenceChange.objects.aggregate(oldest=Min("id"))["oldest"]
+    return oldest - 1 if oldest is not None else current_version()
+
+
+def build_delta(since_version: int) -> bytes | None:
+    """Rows changed after ``since_version``, None when a full sync is needed."""
+    version = current_version()
+    if since_version > version or since_version < delta_floor():
+        return None
+
+    changed: dict[str, set | None] = {}
+    for table, object_id in ReferenceChange.objects.filter(
+        id__gt=since_version, id__lte=version
+    ).values_list("table", "object_id"):
+        if object_id is None:
+            changed[table] = None
+        elif changed.get(table, set()) is not None:
+            changed.setdefault(table, set()).add(object_id)
+
+    tables = {}
+    for name, ids in changed.items():
+        fields = TABLES[name][1]
+        if ids is None:
+            tables[name] = {
+                "fields": list(fields), "rows": table_rows(name), "replace": True
+            }
+            continue
+        rows = table_rows(name, ids)
+        tables[name] = {
+            "fields": list(fields),
+            "rows": rows,
+            "deleted": sorted(ids - {row[0] for row in rows}),
+        }
+    return render({"version": version, "full": False, "tables": tables})
+
+
+def prune(older_than=None):
+    """Drop log entries older than REFERENCE_CHANGES_RETENTION days."""
+    older_than = older_than or timezone.now() - timedelta(
+        days=settings.REFERENCE_CHANGES_RETENTION
+    )
+    # Keep the newest entry, it carries the current version.
+    newest = current_version()
+    ReferenceChange.objects.filter(created_at__lt=older_than, id__lt=newest).delete()
@@ -0,0 +1,184 @@
+"""
+Response cache for list endpoints that keeps bodies compressed.
+
+Replaces ``cache_page``: an entry holds the body gzipped (and brotli
+compressed when the ``brotli`` package is installed) and is sent as stored
+to clients that accept the encoding, so hits cost neither compression nor
+Redis memory for a second, identity copy. The rare client without gzip
+support gets the body decompressed. Bodies under ``MIN_COMPRESS_SIZE``
+bytes are stored as they are.
+
+Entries are keyed on the full path and the ``Accept`` header, and on the
+user for endpoints that show only the user's own rows (``per_user``). Views
+whose data carries a version set ``request.cache_variant`` before the cached
+method runs (``ConditionalGetMixin`` sets it to the ETag), so that a new
+version misses the entries stored for the old one.
+"""
+import gzip
+import hashlib
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.template.response import SimpleTemplateResponse
+from django.utils.cache import get_max_age, patch_vary_headers
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+MIN_COMPRESS_SIZE = 200
+
+# Sent with the stored body, everything else is set again per response.
+STORED_HEADERS = (
+    "Content-Type",
+    "ETag",
+    "Last-Modified",
+    "Cache-Control",
+    "Vary",
+    "Allow",
+)
+
+
+def compress(body: bytes) -> dict[str, bytes]:
+    if len(body) < MIN_COMPRESS_SIZE:
+        return {"identity": body}
+    bodies = {"gzip": gzip.compress(body, compresslevel=6)}
+    if brotli is not None:
+        bodies["br"] = brotli.compress(body, quality=5)
+    return bodies
+
+
+def accepted_encodings(header: str) -> set[str]:
+    encodings = set()
+    for item in header.split(","):
+        name, _, params = item.strip().partition(";")
+        quality = params.strip().removeprefix("q=")
+        if name and quality not in ("0", "0.0", "0.00", "0.000"):
+            encodings.add(name.strip().lower())
+    return encodings
+
+
+def choose_body(bodies: dict[str, bytes], header: str) -> tuple[str, bytes]:
+    """Encoding and body to send for the request's ``Accept-Encoding``."""
+    if "identity" in bodies:
+        return "identity", bodies["identity"]
+    accepted = accepted_encodings(header)
+    for encoding in ("br", "gzip"):
+        if encoding in bodies and (encoding in accepted or "*" in accepted):
+            return encoding, bodies[encoding]
+    return "identity", gzip.decompress(bodies["gzip"])
+
+
+def cache_key(request, per_user: bool) -> str:
+    state = [
+        request.get_full_path(),
+        request.headers.get("Accept", ""),
+        getattr(request, "cache_variant", None),
+    ]
+    if per_user:
+        state.append(request.user.pk)
+    digest = hashlib.blake2b(repr(state).encode(), digest_size=16).hexdigest()
+    return f"response:{digest}"
+
+
+def send_body(response, bodies: dict[str, bytes], request):
+    encoding, body = choose_body(
+        bodies, request.headers.get("Accept-Encoding", "")
+    )
+    response.content = body
+    if encoding != "identity":
+        response["Content-Encoding"] = encoding
+    response["Content-Length"] = len(body)
+    patch_vary_headers(response, ["Accept-Encoding"])
+    return response
+
+
+def build_response(entry: dict, request) -> HttpResponse:
+    response = HttpResponse(status=entry["status"])
+    for header, value in entry["headers"].items():
+        response[header] = value
+    return send_body(response, entry["bodies"], request)
+
+
+def make_entry(response, per_user: bool) -> dict:
+    if per_user:
+        patch_vary_headers(response, ["Authorization"])
+    return {
+        "status": response.status_code,
+        "headers": {
+            header: response[header]
+            for header in STORED_HEADERS
+            if header in response
+        },
+        "bodies": compress(response.content),
+    }
+
+
+def entry_timeout(response, timeout: int) -> int:
+    # Like cache_page, never keep a response past its max-age.
+    max_age = get_max_age(response)
+    return timeout if max_age is None else min(timeout, max_age)
+
+
+def cache_response(timeout: int, per_user: bool = False):
+    """
+    Cache successful GET responses of a view for ``timeout`` seconds, or
+    the response's ``max-age`` when that is shorter.
+
+    Use with ``method_decorator`` on viewset actions, like ``cache_page``.
+    Async views are decorated directly.
+    """
+
+    def decorator(view):
+        if iscoroutinefunction(view):
+
+            @wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                if request.method not in ("GET", "HEAD"):
+                    return await view(request, *args, **kwargs)
+
+                key = cache_key(request, per_user)
+                entry = await cache.aget(key)
+                if entry is not None:
+                    return build_response(entry, request)
+
+                response = await view(request, *args, **kwargs)
+                if response.status_code != 200 or response.streaming:
+                    return response
+                entry = make_entry(response, per_user)
+                await cache.aset(key, entry, entry_timeout(response, timeout))
+                return send_body(response, entry["bodies"], request)
+
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ("GET", "HEAD"):
+                return view(request, *args, **kwargs)
+
+            key = cache_key(request, per_user)
+            entry = cache.get(key)
+            if entry is not None:
+                return build_response(entry, request)
+
+            response = view(request, *args, **kwargs)
+            if response.status_code != 200 or response.streaming:
+                return response
+
+            def store(response):
+                entry = make_entry(response, per_user)
+                cache.set(key, entry, entry_timeout(response, timeout))
+                return send_body(response, entry["bodies"], request)
+
+            # DRF responses are rendered after the view returns.
+            if isinstance(response, SimpleTemplateResponse):
+                response.add_post_render_callback(store)
+                return response
+            return store(response)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,182 @@
+"""
+Expansion of recurring flight schedules into flights.
+
+``expand`` makes the future flights of a schedule match it: missing
+departures are inserted with chunked ``bulk_create``, flights whose route,
+airplane or duration changed are updated with one ``UPDATE``, and
+departures the schedule no longer has are deleted unless tickets were sold
+for them. Flights are keyed on ``(schedule, departure_time)``, so running it
+again, or twice at once, creates nothing twice. Flights that already
+departed are never touched.
+
+Validation works on the whole set of departures at once instead of one
+flight at a time, see ``check_occurrences`` and ``air_service.overlaps``.
+Departures for which the airplane is booked on another flight by the time
+the schedule expands are skipped and counted in ``Expansion.conflicts``.
+"""
+import zoneinfo
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q, Value
+from django.utils import timezone
+
+from air_service import occupancy, overlaps
+from air_service.models import Flight, FlightSchedule
+
+
+@dataclass
+class Expansion:
+    created: int = 0
+    updated: int = 0
+    deleted: int = 0
+    kept: int = 0
+    # Departures skipped because the airplane is booked on another flight.
+    conflicts: int = 0
+
+
+def parse_days_of_week(value: str) -> set[int]:
+    days = {int(day) for day in value if day.isdigit()}
+    if not value or len(days) != len(value) or not days <= set(range(1, 8)):
+        raise ValueError("Use distinct ISO weekdays 1 (Monday) to 7 (Sunday).")
+    return days
+
+
+def occurrences(
+    days_of_week: str,
+    departure_time,
+    duration: timedelta,
+    tz_name: str,
+    valid_from: date,
+    valid_until: date,
+) -> list[tuple[datetime, datetime]]:
+    """``(departure, arrival)`` of every flight of a schedule, in order."""
+    days = parse_days_of_week(days_of_week)
+    tz = zoneinfo.ZoneInfo(tz_name)
+    flights = []
+    day = valid_from
+    while day <= valid_until:
+        if day.isoweekday() in days:
+            # In UTC, so adding the duration ignores DST changes in flight.
+            departure = datetime.combine(
+                day, departure_time, tzinfo=tz
+            ).astimezone(dt_timezone.utc)
+            flights.append((departure, departure + duration))
+        day += timedelta(days=1)
+    return flights
+
+
+def schedule_occurrences(schedule: FlightSchedule) -> list[tuple[datetime, datetime]]:
+    return occurrences(
+        schedule.days_of_week,
+        schedule.departure_time,
+        schedule.duration,
+        schedule.timezone,
+        schedule.valid_from,
+        schedule.valid_until,
+    )
+
+
+def check_occurrences(flights: list[tuple[datetime, datetime]], error_to_raise):
+    """Validate a schedule's departures as a set, in one pass."""
+    if not flights:
+        raise error_to_raise({"days_of_week": "The schedule has no flights."})
+    # All flights share the duration, the first one stands for the others.
+    first_departure, first_arrival = flights[0]
+    Flight.validate_time(first_departure, first_arrival, error_to_raise)
+    if first_arrival == first_departure:
+        raise error_to_raise({"duration": "Must be positive."})
+    # Sorted by departure: the airplane is back before its next departure.
+    for (_, arrival), (next_departure, _) in zip(flights, flights[1:]):
+        if next_departure < arrival:
+            raise error_to_raise(
+                {"duration": "Flights of the schedule would overlap."}
+            )
+
+
+def expand(schedule: FlightSchedule, batch_size: int | None = None) -> Expansion:
+    batch_size = batch_size or settings.SCHEDULE_EXPANSION_BATCH_SIZE
+    now = timezone.now()
+    desired = {
+        departure: arrival
+        for departure, arrival in schedule_occurrences(schedule)
+        if departure > now
+    }
+    result = Expansion()
+    with transaction.atomic():
+        upcoming = Flight.objects.filter(schedule=schedule, departure_time__gt=now)
+        existing = dict(upcoming.values_list("departure_time", "pk"))
+
+        obsolete = [pk for departure, pk in existing.items() if departure not in desired]
+        if obsolete:
+            # Flights with sold tickets stay, they need to be handled by hand.
+            _, deleted = Flight.objects.filter(
+                pk__in=obsolete, tickets__isnull=True
+            ).delete()
+            result.deleted = deleted.get(Flight._meta.label, 0)
+            result.kept = len(obsolete) - result.deleted
+
+        departures = list(desired)
+        # The schedule's flights at these departures are rewritten below.
+        rewritten = [
+            existing[departure] for departure in departures if departure in existing
+        ]
+        found = overlaps.conflicts(
+            {
+                position: (schedule.airplane_id, departure, desired[departure])
+                for position, departure in enumerate(departures)
+            },
+            exclude=Q(pk__in=rewritten),
+        )
+        for position in found:
+            del desired[departures[position]]
+        result.conflicts = len(found)
+
+        current = [pk for departure, pk in existing.items() if departure in desired]
+
+        new = [
+            Flight(
+                schedule=schedule,
+                route_id=schedule.route_id,
+                airplane_id=schedule.airplane_id,
+                departure_time=departure,
+                arrival_time=arrival,
+            )
+            for departure, arrival in desired.items()
+            if departure not in existing
+        ]
+        # A concurrent run may have inserted some of them already, and on
+        # PostgreSQL flight_airplane_no_overlap may reject some: both are
+        # skipped, so the inserted rows are read back below.
+        Flight.objects.bulk_create(new, batch_size=batch_size, ignore_conflicts=True)
+        created = list(
+            upcoming.filter(
+                departure_time__in=[flight.departure_time for flight in new]
+            )
+            .exclude(pk__in=existing.values())
+            .values_list("pk", flat=True)
+        )
+        result.created = len(created)
+
+        changed = list(
+            upcoming.filter(pk__in=current)
+            .exclude(
+                route_id=schedule.route_id,
+                airplane_id=schedule.airplane_id,
+                arrival_time=F("departure_time") + Value(schedule.duration),
+            )
+            .values_list("pk", flat=True)
+        )
+        result.updated = Flight.objects.filter(pk__in=changed).update(
+            route_id=schedule.route_id,
+            airplane_id=schedule.airplane_id,
+            arrival_time=F("departure_time") + Value(schedule.duration),
+        )
+
+        # bulk_create and update() send no signals.
+        if created or changed:
+            occupancy.flights_changed([*created, *changed])
+        FlightSchedule.objects.filter(pk=schedule.pk).update(expanded_at=now)
+    return result
@@ -1,6 +1,11 @@
+import zoneinfo
 from typing import Any
 
+from django.conf import settings
+from django.core.files.storage import default_storage
 from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
 from rest_framework import serializers
 from rest_framework.relations import SlugRelatedField
 
@@ -14,8 +19,47 @@ from air_service.models import (
     Route,
     Flight,
     Ticket,
-    Order
+    Order,
+    FlightOccupancy,
+    RouteDailyOccupancy,
+    FlightSchedule,
 )
+from air_service.overlaps import conflicts
+from air_service.schedules import check_occurrences, occurrences, parse_days_of_week
+from air_service.storage_gc import record_orphans
+from air_service.tasks import process_airplane_image
+
+
+def storage_url(path: str, context: dict) -> str:
+    url = default_storage.url(path)
+    request = context.get("request")
+    return request.build_absolute_uri(url) if request else url
+
+
+class MemoizedRepresentationMixin:
+    """
+    Render each object once per serializer tree, e.g. once per request.
+
+    The tickets of an order often share flights and routes: later
+    occurrences reuse the first representation, stored in the root
+    serializer's context. That also makes them one shared object in the
+    output, which must not be modified.
+    """
+
+    def to_representation(self, instance):
+        if instance.pk is None:
+            return super().to_representation(instance)
+        representations = self.context.setdefault("representations", {})
+        key = (type(self), instance._meta.label, instance.pk)
+        if key not in representations:
+            representations[key] = super().to_representation(instance)
+        return representations[key]
+
+
+class MemoizedStringRelatedField(
+    MemoizedRepresentationMixin, serializers.StringRelatedField
+):
+    pass
 
 
 class CountrySerializer(serializers.ModelSerializer):
@@ -207,12 +251,28 @@ class AirplaneImageSerializer(serializers.ModelSerializer):
             "image"
         ]
 
+    def update(self, instance, validated_data):
+        record_orphans(instance.media_paths)
+        # Variants of the previous image no longer apply.
+        instance.image_variants = {}
+        airplane = super().update(instance, validated_data)
+        if airplane.image:
+            pk, name = airplane.pk, airplane.image.name
+            transaction.on_commit(lambda: process_airplane_image.delay(pk, name))
+        return airplane
+
 
 class AirplaneListSerializer(AirplaneSerializer):
     airplane_type = serializers.SlugRelatedField(
         slug_field="name",
         read_only=True,
     )
+    image = serializers.SerializerMethodField()
+
+    def get_image(self, airplane) -> str | None:
+        """The thumbnail, or the original until it has been generated."""
+        path = airplane.image_variants.get("thumbnail") or airplane.image.name
+        return storage_url(path, self.context) if path else None
 
     class Meta:
         model = Airplane
@@ -233,6 +293,14 @@ class AirplaneRetrieveSerializer(AirplaneListSerializer):
         read_only=True,
         many=True
     )
+    image = serializers.ImageField(read_only=True)
+    image_variants = serializers.SerializerMethodField()
+
+    def get_image_variants(self, airplane) -> dict[str, str]:
+        return {
+            name: storage_url(path, self.context)
+            for name, path in airplane.image_variants.items()
+        }
 
     class Meta:
         model = Airplane
@@ -244,6 +312,7 @@ class AirplaneRetrieveSerializer(AirplaneListSerializer):
             "capacity",
             "airplane_type",
             "image",
+            "image_variants",
             "crew"
         ]
 
@@ -296,6 +365,9 @@ class RouteRetrieveSerializer(RouteListSerializer):
 
 
 class FlightSerializer(serializers.ModelSerializer):
+    # air_service.bulk checks a whole payload at once instead.
+    check_overlaps = True
+
     class Meta:
         model = Flight
         fields = [
@@ -312,13 +384,110 @@ class FlightSerializer(serializers.ModelSerializer):
             attrs["arrival_time"],
             serializers.ValidationError
         )
+        if not self.check_overlaps:
+            return attrs
+        airplane = attrs.get("airplane") or self.instance.airplane
+        overlap = conflicts(
+            {0: (airplane.pk, attrs["departure_time"], attrs["arrival_time"])},
+            exclude=Q(pk=self.instance.pk) if self.instance else None,
+        )
+        if overlap:
+            raise serializers.ValidationError({"airplane": overlap[0]})
+        return attrs
+
+
+class FlightScheduleSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = FlightSchedule
+        fields = [
+            "id",
+            "route",
+            "airplane",
+            "days_of_week",
+            "departure_time",
+            "duration",
+            "timezone",
+            "valid_from",
+            "valid_until",
+            "expanded_at",
+        ]
+        read_only_fields = ["expanded_at"]
+
+    def validate_days_of_week(self, value):
+        try:
+            parse_days_of_week(value)
+        except ValueError as error:
+            raise serializers.ValidationError(str(error))
+        return value
+
+    def validate_timezone(self, value):
+        try:
+            zoneinfo.ZoneInfo(value)
+        except (zoneinfo.ZoneInfoNotFoundError, ValueError):
+            raise serializers.ValidationError("Unknown time zone.")
+        return value
+
+    def validate(self, attrs):
+        schedule = {
+            field: attrs[field] if field in attrs else getattr(self.instance, field)
+            for field in (
+                "airplane",
+                "days_of_week",
+                "departure_time",
+                "duration",
+                "timezone",
+                "valid_from",
+                "valid_until",
+            )
+        }
+        days = (schedule["valid_until"] - schedule["valid_from"]).days
+        if days < 0:
+            raise serializers.ValidationError(
+                {"valid_until": "Must not be before valid_from"}
+            )
+        if days >= settings.SCHEDULE_MAX_DAYS:
+            raise serializers.ValidationError(
+                {"valid_until": f"At most {settings.SCHEDULE_MAX_DAYS} days."}
+            )
+        flights = occurrences(
+            schedule["days_of_week"],
+            schedule["departure_time"],
+            schedule["duration"],
+            schedule["timezone"],
+            schedule["valid_from"],
+            schedule["valid_until"],
+        )
+        check_occurrences(flights, serializers.ValidationError)
+
+        now = timezone.now()
+        overlap = conflicts(
+            {
+                position: (schedule["airplane"].pk, departure, arrival)
+                for position, (departure, arrival) in enumerate(flights)
+                if departure > now
+            },
+            # Its own upcoming flights are rewritten by the expansion.
+            exclude=(
+                Q(schedule=self.instance, departure_time__gt=now)
+                if self.instance
+                else None
+            ),
+        )
+        if overlap:
+            departure = flights[min(overlap)][0]
+            raise serializers.ValidationError(
+                {
+                    "airplane": "The airplane is booked on other flights at "
+                    f"{len(overlap)} departures, the first at {departure}."
+                }
+            )
         return attrs
 
 
-class FlightListSerializer(FlightSerializer):
+class FlightListSerializer(MemoizedRepresentationMixin, FlightSerializer):
     departure_time = serializers.SerializerMethodField()
     arrival_time = serializers.SerializerMethodField()
-    route = serializers.StringRelatedField(
+    route = MemoizedStringRelatedField(
         read_only=True,
     )
     airplane = serializers.CharField(
@@ -445,3 +614,40 @@ class OrderListSerializer(OrderSerializer):
 
 class OrderRetrieveSerializer(OrderListSerializer):
     tickets = TicketRetrieveSerializer(many=True, read_only=True)
+
+
+def load_factor(sold: int, seats: int) -> float | None:
+    return round(sold / seats, 4) if seats else None
+
+
+class FlightOccupancySerializer(serializers.ModelSerializer):
+    load_factor = serializers.SerializerMethodField()
+
+    class Meta:
+        model = FlightOccupancy
+        fields = ["flight", "route", "day", "seats", "sold", "load_factor"]
+
+    def get_load_factor(self, obj) -> float | None:
+        return load_factor(obj.sold, obj.seats)
+
+
+class RouteDailyOccupancySerializer(serializers.ModelSerializer):
+    load_factor = serializers.SerializerMethodField()
+
+    class Meta:
+        model = RouteDailyOccupancy
+        fields = ["route", "day", "flights", "seats", "sold", "load_factor"]
+
+    def get_load_factor(self, obj) -> float | None:
+        return load_factor(obj.sold, obj.seats)
+
+
+class RouteOccupancySummarySerializer(serializers.Serializer):
+    route = serializers.IntegerField()
+    flights = serializers.IntegerField()
+    seats = serializers.IntegerField()
+    sold = serializers.IntegerField()
+    load_factor = serializers.SerializerMethodField()
+
+    def get_load_factor(self, obj) -> float | None:
+        return load_factor(obj["sold"], obj["seats"])
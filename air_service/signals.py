@@ -1,12 +1,81 @@
-import os
-from django.db.models.signals import pre_delete
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.db import transaction
 from django.dispatch import receiver
-from air_service.models import Airplane
+from air_service import availability, occupancy, reference_data, table_versions
+from air_service.db_router import query_metrics
+from air_service.models import Airplane, Flight, Ticket
+from air_service.storage_gc import record_orphans
 
 
-@receiver(pre_delete, sender=Airplane)
+@receiver(post_delete, sender=Airplane)
 def delete_avatar(sender, instance, **kwargs):
-    image = instance.image
-    if image and hasattr(image, "path"):
-        if os.path.isfile(image.path):
-            os.remove(image.path)
+    # Deleting an AirplaneType cascades here once per airplane, so files are
+    # only recorded and removed later by tasks.collect_orphaned_files.
+    record_orphans(instance.media_paths)
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def bump_table_version(sender, instance, **kwargs):
+    if sender in table_versions.TRACKED_MODELS:
+        table_versions.bump(sender)
+        reference_data.record_changes(sender, [instance.pk])
+
+
+@receiver(post_save, sender=Ticket)
+@receiver(post_delete, sender=Ticket)
+def publish_availability(sender, instance, signal, created=False, **kwargs):
+    sold = signal is post_save
+    # Changing the seat of a ticket is not published.
+    if sold and not created:
+        return
+    flight_id, seat, row = instance.flight_id, instance.seat, instance.row
+    # The booking is committed by then: a failed publish is only logged.
+    transaction.on_commit(
+        lambda: availability.publish(flight_id, seat, row, sold=sold), robust=True
+    )
+
+
+@receiver(post_save, sender=Ticket)
+@receiver(post_delete, sender=Ticket)
+def record_occupancy_change(sender, instance, signal, created=False, **kwargs):
+    if signal is post_delete:
+        occupancy.record_booking(instance.flight_id, -1)
+    elif created:
+        occupancy.record_booking(instance.flight_id, 1)
+
+
+@receiver(post_save, sender=Flight)
+def update_flight_occupancy(sender, instance, **kwargs):
+    occupancy.flight_saved(instance)
+
+
+@receiver(post_delete, sender=Flight)
+def remove_flight_occupancy(sender, instance, **kwargs):
+    occupancy.flight_deleted(instance)
+
+
+@receiver(post_save, sender=Airplane)
+def update_airplane_occupancy(sender, instance, created, **kwargs):
+    if not created:
+        occupancy.airplane_saved(instance)
+
+
+@receiver(connection_created)
+def install_query_metrics(sender, connection, **kwargs):
+    # Fires again on every reconnect of the same wrapper, possibly in a
+    # request that already pushed execute_wrapper()s, which pop from the end:
+    # the metrics go first, outside of them.
+    if not any(
+        getattr(wrapper, "query_metrics", False)
+        for wrapper in connection.execute_wrappers
+    ):
+        connection.execute_wrappers.insert(0, query_metrics(connection.alias))
+
+
+@receiver(connection_created)
+def configure_prepared_statements(sender, connection, **kwargs):
+    if connection.vendor == "postgresql":
+        connection.connection.prepared_max = settings.DATABASE_PREPARED_MAX
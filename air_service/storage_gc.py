@@ -0,0 +1,93 @@
+"""
+Deferred removal of stored files.
+
+Requests only record paths that lost their last reference (an ``OrphanedFile``
+row, in the request's transaction), and ``collect`` removes them later in
+batches from a Celery task. ``sweep`` reconciles the upload directory with the
+database and catches files nothing recorded, e.g. replaced in the admin.
+Files still referenced when a job runs are kept, so recording a path
+too eagerly is harmless.
+"""
+import os
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+
+from air_service.models import Airplane, OrphanedFile
+
+AIRPLANE_MEDIA_DIR = "upload/airplanes"
+
+
+def record_orphans(paths):
+    paths = [path for path in paths if path]
+    if paths:
+        OrphanedFile.objects.bulk_create(
+            [OrphanedFile(path=path) for path in paths], ignore_conflicts=True
+        )
+
+
+def referenced_paths() -> set[str]:
+    referenced = set()
+    for image, variants in Airplane.objects.exclude(image="").exclude(
+        image__isnull=True
+    ).values_list("image", "image_variants"):
+        referenced.add(image)
+        referenced.update(variants.values())
+    return referenced
+
+
+def collect(batch_size: int | None = None) -> int:
+    """Remove recorded orphans; returns the number of files deleted."""
+    batch_size = batch_size or settings.STORAGE_GC_BATCH_SIZE
+    deleted = 0
+    last_pk = 0
+    referenced = None
+    while True:
+        batch = list(
+            OrphanedFile.objects.filter(pk__gt=last_pk)
+            .order_by("pk")
+            .values_list("pk", "path")[:batch_size]
+        )
+        if not batch:
+            return deleted
+        if referenced is None:
+            referenced = referenced_paths()
+        for _, path in batch:
+            if path not in referenced and default_storage.exists(path):
+                default_storage.delete(path)
+                deleted += 1
+        last_pk = batch[-1][0]
+        OrphanedFile.objects.filter(pk__in=[pk for pk, _ in batch]).delete()
+
+
+def sweep(grace: timedelta | None = None) -> list[str]:
+    """
+    Record files under the airplane upload directory that no airplane refers
+    to. Files younger than ``grace`` are skipped, their row may not be
+    committed yet.
+    """
+    grace = grace if grace is not None else timedelta(
+        seconds=settings.STORAGE_GC_SWEEP_GRACE
+    )
+    root = os.path.join(settings.MEDIA_ROOT, AIRPLANE_MEDIA_DIR)
+    cutoff = time.time() - grace.total_seconds()
+    referenced = referenced_paths()
+
+    orphans = []
+    for directory, _, filenames in os.walk(root):
+        for filename in filenames:
+            full_path = os.path.join(directory, filename)
+            path = os.path.relpath(full_path, settings.MEDIA_ROOT).replace(os.sep, "/")
+            if path in referenced:
+                continue
+            try:
+                if os.path.getmtime(full_path) > cutoff:
+                    continue
+            except OSError:
+                continue
+            orphans.append(path)
+
+    record_orphans(orphans)
+    return orphans
@@ -0,0 +1,185 @@
+"""
+Per-table change versions and the HTTP validators derived from them.
+
+Every save or delete of a tracked model bumps its table's ``TableVersion``
+row. Catalogue views build their ``ETag`` and ``Last-Modified`` from the
+versions of the tables they render, which are one cached lookup away, so a
+conditional request is answered with 304 before any queryset runs.
+
+Bulk operations (``bulk_create``, ``QuerySet.update``) send no signals and
+must call ``bump`` themselves.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.cache import (
+    get_conditional_response,
+    patch_cache_control,
+    patch_vary_headers,
+)
+from django.utils.http import http_date
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.response import Response
+
+from air_service.models import (
+    Airplane,
+    AirplaneType,
+    Airport,
+    City,
+    Country,
+    Route,
+    TableVersion,
+)
+
+TRACKED_MODELS = (Country, City, Airport, AirplaneType, Airplane, Route)
+
+CACHE_KEY = "table-versions:%s"
+# Part of CACHE_KEY, incremented after every commit that bumps a table. A
+# reader that loaded the versions before the commit stores them under the
+# previous generation, where nobody looks any more.
+GENERATION_KEY = "table-versions-generation"
+
+# Bump when a catalogue serializer changes, so clients holding a validator
+# for the old representation do not get a 304 after a deploy.
+REPRESENTATION_VERSION = 1
+
+
+def table_name(model) -> str:
+    return model._meta.db_table
+
+
+def bump(*models):
+    tables = [table_name(model) for model in models]
+    TableVersion.objects.bulk_create(
+        [TableVersion(table=table) for table in tables], ignore_conflicts=True
+    )
+    TableVersion.objects.filter(table__in=tables).update(
+        version=F("version") + 1, changed_at=timezone.now()
+    )
+    transaction.on_commit(next_generation)
+
+
+def next_generation():
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        # Never set or evicted: a value no earlier generation had.
+        cache.add(GENERATION_KEY, time.time_ns(), None)
+
+
+def current_generation() -> int:
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        cache.add(GENERATION_KEY, time.time_ns(), None)
+        generation = cache.get(GENERATION_KEY)
+    return generation
+
+
+def load_versions() -> dict:
+    return {
+        table: (version, changed_at)
+        for table, version, changed_at in TableVersion.objects.values_list(
+            "table", "version", "changed_at"
+        )
+    }
+
+
+def get_versions() -> dict:
+    """``{table: (version, changed_at)}`` of every table changed so far."""
+    key = CACHE_KEY % current_generation()
+    versions = cache.get(key)
+    if versions is None:
+        versions = load_versions()
+        cache.set(key, versions, settings.TABLE_VERSIONS_CACHE_TTL)
+    return versions
+
+
+def validators(models, variant: str = "") -> tuple[str, int | None]:
+    """Strong ``ETag`` and ``Last-Modified`` timestamp for data of ``models``."""
+    versions = get_versions()
+    state = [REPRESENTATION_VERSION, variant]
+    changed = []
+    for model in models:
+        version, changed_at = versions.get(table_name(model), (0, None))
+        state.append(f"{table_name(model)}:{version}")
+        if changed_at is not None:
+            changed.append(changed_at)
+    digest = hashlib.blake2b(repr(state).encode(), digest_size=12).hexdigest()
+    last_modified = int(max(changed).timestamp()) if changed else None
+    return f'"{digest}"', last_modified
+
+
+def add_validators(response, etag: str, last_modified: int | None):
+    if response.status_code not in (200, 304):
+        return response
+    response["ETag"] = etag
+    if last_modified is not None:
+        response["Last-Modified"] = http_date(last_modified)
+    # Reads require authentication: private, so that shared caches do not
+    # hand responses to other clients. cache_response also keeps a response
+    # no longer than its max-age.
+    patch_cache_control(
+        response, private=True, max_age=settings.CATALOGUE_CACHE_MAX_AGE
+    )
+    patch_vary_headers(response, ["Accept", "Authorization"])
+    return response
+
+
+class NotModified(APIException):
+    status_code = status.HTTP_304_NOT_MODIFIED
+
+
+class ConditionalGetMixin:
+    """
+    ETag/Last-Modified validation for viewsets over tracked tables.
+
+    ``version_models`` lists every model the list and retrieve responses
+    are rendered from, including related names shown by the serializers.
+    """
+
+    version_models: tuple = ()
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.etag = self.last_modified = None
+        if request.method not in ("GET", "HEAD") or self.action not in (
+            "list",
+            "retrieve",
+        ):
+            return
+
+        self.etag, self.last_modified = validators(
+            self.version_models, request.accepted_renderer.format
+        )
+        # The ETag covers the versions of the rendered tables: cache_response
+        # keys on it, so a change also bypasses the stored body.
+        request.cache_variant = self.etag
+        conditional = get_conditional_response(
+            request, etag=self.etag, last_modified=self.last_modified
+        )
+        if conditional is not None and conditional.status_code == 304:
+            raise NotModified
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NotModified):
+            return self.add_validators(Response(status=status.HTTP_304_NOT_MODIFIED))
+        return super().handle_exception(exc)
+
+    def list(self, request, *args, **kwargs):
+        # Inside cache_response: a cached body keeps the validators it was
+        # rendered with, and is keyed on them.
+        return self.add_validators(super().list(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.add_validators(super().retrieve(request, *args, **kwargs))
+
+    def add_validators(self, response):
+        if self.etag is None:
+            return response
+        return add_validators(response, self.etag, self.last_modified)
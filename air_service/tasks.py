@@ -1,12 +1,18 @@
 import logging
+from dataclasses import asdict
 from datetime import timedelta
 
 from celery import shared_task
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
 from django.db import transaction
 from django.utils import timezone
 
+from air_service import occupancy, reference_data, schedules, storage_gc
 from air_service.email_utils import send_email
-from air_service.models import Ticket
+from air_service.images import VARIANTS, render_variants, variant_path
+from air_service.models import Airplane, FlightSchedule, Ticket
 
 logger = logging.getLogger(__name__)
 
@@ -53,3 +59,60 @@ def send_ticket_reminders():
         logger.info(f"Sent reminders for tickets: {[ticket.id for ticket in updated_tickets]}")
 
     return sent_count
+
+
+@shared_task
+def process_airplane_image(airplane_id, image_name):
+    """Store the resized, metadata-free variants of an uploaded image."""
+    with default_storage.open(image_name) as source:
+        rendered = render_variants(source)
+
+    variants = {}
+    for variant in VARIANTS:
+        variants[variant.name] = default_storage.save(
+            variant_path(image_name, variant), ContentFile(rendered[variant.name])
+        )
+
+    # The image may have been replaced while this job was queued.
+    updated = Airplane.objects.filter(pk=airplane_id, image=image_name).update(
+        image_variants=variants
+    )
+    if not updated:
+        for path in variants.values():
+            default_storage.delete(path)
+    return variants
+
+
+@shared_task
+def collect_orphaned_files():
+    return storage_gc.collect()
+
+
+@shared_task
+def sweep_media():
+    """Record untracked files in the upload directory, then remove orphans."""
+    orphans = storage_gc.sweep()
+    if orphans:
+        logger.info(f"Found {len(orphans)} unreferenced media files")
+    return storage_gc.collect()
+
+
+@shared_task
+def build_reference_bundle():
+    cache.delete(reference_data.PENDING_KEY)
+    reference_data.prune()
+    return reference_data.build_bundle().version
+
+
+@shared_task
+def compact_occupancy():
+    """Fold all pending booking changes into the occupancy totals."""
+    return occupancy.compact_all()
+
+
+@shared_task
+def expand_flight_schedule(schedule_id):
+    schedule = FlightSchedule.objects.filter(pk=schedule_id).first()
+    if schedule is None:
+        return None
+    return asdict(schedules.expand(schedule))
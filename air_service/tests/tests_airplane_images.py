@@ -0,0 +1,157 @@
+import io
+import shutil
+import tempfile
+
+from PIL import Image
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from air_service.images import VARIANTS, render_variants
+from air_service.models import Airplane, AirplaneType, content_hash
+from air_service.tasks import process_airplane_image
+
+AIRPLANE_URL = reverse("air-service:airplane-list")
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def sample_jpeg(size=(2000, 1000)) -> bytes:
+    exif = Image.Exif()
+    exif[0x010F] = "Camera maker"
+    exif[0x0112] = 6  # Rotated 90 degrees.
+    output = io.BytesIO()
+    Image.new("RGB", size, "red").save(output, format="JPEG", exif=exif)
+    return output.getvalue()
+
+
+class RenderVariantsTests(TestCase):
+    def test_variants_are_resized_and_stripped(self):
+        rendered = render_variants(io.BytesIO(sample_jpeg()))
+
+        self.assertEqual(set(rendered), {variant.name for variant in VARIANTS})
+        for variant in VARIANTS:
+            with Image.open(io.BytesIO(rendered[variant.name])) as image:
+                self.assertEqual(image.format, variant.format)
+                self.assertEqual(max(image.size), variant.max_size)
+                # The orientation tag was applied: the image is now portrait.
+                self.assertGreater(image.height, image.width)
+                self.assertFalse(image.getexif())
+
+    def test_small_images_are_not_upscaled(self):
+        rendered = render_variants(io.BytesIO(sample_jpeg(size=(100, 50))))
+
+        with Image.open(io.BytesIO(rendered["medium"])) as image:
+            self.assertEqual(image.size, (50, 100))
+
+    def test_transparent_png(self):
+        output = io.BytesIO()
+        Image.new("RGBA", (400, 400), (0, 0, 0, 0)).save(output, format="PNG")
+
+        rendered = render_variants(output)
+
+        with Image.open(io.BytesIO(rendered["thumbnail"])) as image:
+            self.assertEqual(image.mode, "RGB")
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ProcessAirplaneImageTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(
+            get_user_model().objects.create_user(
+                email="admin@admin.test", password="testpassword", is_staff=True
+            )
+        )
+        self.airplane = Airplane.objects.create(
+            name="Boeing",
+            airplane_type=AirplaneType.objects.create(name="Jet"),
+            rows=10,
+            seats_in_row=4,
+        )
+
+    def upload(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.client.post(
+                reverse("air-service:airplane-upload-image", args=[self.airplane.pk]),
+                {"image": ContentFile(sample_jpeg(), name="plane.jpg")},
+                format="multipart",
+            )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.airplane.refresh_from_db()
+
+    def test_upload_generates_variants(self):
+        self.upload()
+
+        self.assertEqual(
+            set(self.airplane.image_variants), {variant.name for variant in VARIANTS}
+        )
+        for path in self.airplane.image_variants.values():
+            self.assertTrue(default_storage.exists(path))
+
+    def test_list_references_thumbnail_and_retrieve_all_variants(self):
+        self.upload()
+        variants = self.airplane.image_variants
+
+        listed = self.client.get(AIRPLANE_URL).data["results"][0]
+        self.assertTrue(listed["image"].endswith(variants["thumbnail"]))
+
+        detail = self.client.get(
+            reverse("air-service:airplane-detail", args=[self.airplane.pk])
+        ).data
+        self.assertTrue(detail["image"].endswith(self.airplane.image.name))
+        self.assertEqual(set(detail["image_variants"]), set(variants))
+        self.assertTrue(
+            detail["image_variants"]["medium_webp"].endswith(variants["medium_webp"])
+        )
+
+    def test_list_falls_back_to_original_before_processing(self):
+        self.airplane.image = default_storage.save(
+            "upload/airplanes/plane.jpg", ContentFile(sample_jpeg())
+        )
+        self.airplane.save()
+
+        listed = self.client.get(AIRPLANE_URL).data["results"][0]
+
+        self.assertTrue(listed["image"].endswith(self.airplane.image.name))
+
+    def test_stale_job_discards_its_variants(self):
+        self.upload()
+        old_name = self.airplane.image.name
+        self.upload()
+
+        variants = process_airplane_image(self.airplane.pk, old_name)
+
+        self.airplane.refresh_from_db()
+        self.assertNotEqual(self.airplane.image_variants, variants)
+        for path in variants.values():
+            self.assertFalse(default_storage.exists(path))
+
+    def test_file_named_after_saved_content(self):
+        airplane = Airplane(name="Airbus")
+        airplane.image.save("a.JPG", ContentFile(b"abc"), save=False)
+
+        self.assertEqual(
+            airplane.image.name,
+            f"upload/airplanes/airbus-{content_hash(ContentFile(b'abc'))}.jpg",
+        )
+
+    def test_replaced_image_gets_new_name(self):
+        self.upload()
+        old_name = self.airplane.image.name
+
+        self.airplane.image.save("plane.jpg", ContentFile(sample_jpeg((10, 10))))
+
+        self.assertNotEqual(self.airplane.image.name, old_name)
+        self.assertIn(
+            content_hash(ContentFile(sample_jpeg((10, 10)))), self.airplane.image.name
+        )
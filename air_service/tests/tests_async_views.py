@@ -0,0 +1,204 @@
+import threading
+from datetime import timedelta
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from air_service.async_views import gather_queries
+from air_service.models import (
+    Airport,
+    Country,
+    City,
+    Route,
+    AirplaneType,
+    Airplane,
+    Flight,
+    Order,
+    Ticket,
+)
+
+ASYNC_FLIGHT_URL = reverse("air-service:async-flight-list")
+ASYNC_ROUTE_URL = reverse("air-service:async-route-list")
+FLIGHT_URL = reverse("air-service:flight-list")
+ROUTE_URL = reverse("air-service:route-list")
+
+
+def async_detail_url(flight_id):
+    return reverse("air-service:async-flight-detail", args=(flight_id,))
+
+
+def detail_url(flight_id):
+    return reverse("air-service:flight-detail", args=(str(flight_id),))
+
+
+class UnauthenticatedAsyncApiTests(TransactionTestCase):
+    def test_auth_required(self):
+        res = APIClient().get(ASYNC_FLIGHT_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_invalid_token(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION="Bearer invalid")
+        res = client.get(ASYNC_ROUTE_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class AsyncFlightApiTests(TransactionTestCase):
+    """
+    With a pool, sub-queries of the async views run on their own connections,
+    so the data has to be committed: TransactionTestCase instead of TestCase.
+    """
+
+    def setUp(self):
+        country = Country.objects.create(name="America")
+        city = City.objects.create(name="Smaller America", country=country)
+        self.source = Airport.objects.create(name="Source", closest_big_city=city)
+        self.destination = Airport.objects.create(
+            name="Destination", closest_big_city=city
+        )
+        self.route = Route.objects.create(
+            source=self.source, destination=self.destination, distance=1000
+        )
+        self.airplane = Airplane.objects.create(
+            name="ordinary_name",
+            rows=10,
+            seats_in_row=4,
+            airplane_type=AirplaneType.objects.create(name="some_test_name"),
+        )
+        self.user = get_user_model().objects.create_user(
+            email="test@test.test", password="testpassword"
+        )
+        self.client = APIClient()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.user)}"
+        )
+
+    def sample_flight(self, hours: int = 0) -> Flight:
+        departure = timezone.now() + timedelta(hours=hours)
+        return Flight.objects.create(
+            route=self.route,
+            airplane=self.airplane,
+            departure_time=departure,
+            arrival_time=departure + timedelta(hours=3),
+        )
+
+    def test_list_matches_sync_list(self):
+        flights = [self.sample_flight(hours) for hours in range(3)]
+        order = Order.objects.create(user=self.user)
+        Ticket.objects.create(row=1, seat=1, flight=flights[0], order=order)
+        Ticket.objects.create(row=1, seat=2, flight=flights[0], order=order)
+
+        for query in ("", "?ordering=-departure_time", f"?route_ids={self.route.id}"):
+            with self.subTest(query):
+                res = self.client.get(ASYNC_FLIGHT_URL + query)
+                self.assertEqual(res.status_code, status.HTTP_200_OK)
+                self.assertEqual(res.json(), self.client.get(FLIGHT_URL + query).json())
+
+        results = self.client.get(ASYNC_FLIGHT_URL).json()["results"]
+        self.assertEqual(results[0]["tickets_available"], 38)
+
+    def test_list_pagination(self):
+        for hours in range(35):
+            self.sample_flight(hours)
+
+        res = self.client.get(ASYNC_FLIGHT_URL + "?page=2").json()
+        expected = self.client.get(FLIGHT_URL + "?page=2").json()
+        self.assertEqual(res["results"], expected["results"])
+        self.assertEqual(res["count"], 35)
+        self.assertEqual(len(res["results"]), 5)
+        self.assertIsNone(res["next"])
+        self.assertEqual(res["previous"], f"http://testserver{ASYNC_FLIGHT_URL}")
+
+        for page in ("3", "0", "abc"):
+            with self.subTest(page):
+                res = self.client.get(ASYNC_FLIGHT_URL + f"?page={page}")
+                self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_invalid_filter(self):
+        res = self.client.get(ASYNC_FLIGHT_URL + "?departure_time_hour=never")
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_detail_matches_sync_detail(self):
+        flight = self.sample_flight()
+        order = Order.objects.create(user=self.user)
+        Ticket.objects.create(row=2, seat=3, flight=flight, order=order)
+
+        res = self.client.get(async_detail_url(flight.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json(), self.client.get(detail_url(flight.id)).json())
+        self.assertEqual(res.json()["tickets"], [[3, 2]])
+
+    def test_detail_not_found(self):
+        res = self.client.get(async_detail_url(404))
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_route_list_matches_sync_list(self):
+        Route.objects.create(
+            source=self.destination, destination=self.source, distance=500
+        )
+        for query in ("", "?ordering=-distance"):
+            with self.subTest(query):
+                res = self.client.get(ASYNC_ROUTE_URL + query)
+                self.assertEqual(res.status_code, status.HTTP_200_OK)
+                self.assertEqual(res.json(), self.client.get(ROUTE_URL + query).json())
+
+    @override_settings(
+        CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+    )
+    def test_route_list_conditional_get_matches_sync_list(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+        res = self.client.get(ASYNC_ROUTE_URL)
+
+        self.assertEqual(res["ETag"], self.client.get(ROUTE_URL)["ETag"])
+        self.assertIn("private", res["Cache-Control"])
+        res = self.client.get(ASYNC_ROUTE_URL, HTTP_IF_NONE_MATCH=res["ETag"])
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    @override_settings(
+        CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+    )
+    def test_flight_list_is_cached_compressed(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        for hours in range(3):
+            self.sample_flight(hours)
+        first = self.client.get(ASYNC_FLIGHT_URL, HTTP_ACCEPT_ENCODING="gzip")
+
+        res = self.client.get(ASYNC_FLIGHT_URL, HTTP_ACCEPT_ENCODING="gzip")
+
+        self.assertEqual(res["Content-Encoding"], "gzip")
+        self.assertEqual(res.content, first.content)
+
+
+@mock.patch("air_service.async_views.pooled", lambda: True)
+class PooledAsyncFlightApiTests(AsyncFlightApiTests):
+    """The same requests with the sub-queries running concurrently."""
+
+
+class GatherQueriesTests(TransactionTestCase):
+    def test_runs_in_turn_without_pool(self):
+        threads = async_to_sync(gather_queries)(
+            threading.get_ident, threading.get_ident
+        )
+
+        self.assertEqual(len(set(threads)), 1)
+
+    @mock.patch("air_service.async_views.pooled", lambda: True)
+    def test_runs_concurrently_with_pool(self):
+        # Both have to wait at the barrier at the same time.
+        barrier = threading.Barrier(2, timeout=5)
+
+        results = async_to_sync(gather_queries)(barrier.wait, barrier.wait)
+
+        self.assertEqual(sorted(results), [0, 1])
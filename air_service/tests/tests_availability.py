@@ -0,0 +1,132 @@
+import asyncio
+import json
+from datetime import timedelta
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.test import TransactionTestCase
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from air_service.models import (
+    Airplane,
+    AirplaneType,
+    Airport,
+    City,
+    Country,
+    Flight,
+    Order,
+    Route,
+    Ticket,
+)
+
+AVAILABILITY_URL = reverse("air-service:async-flight-availability")
+
+
+def parse_event(chunk: bytes) -> dict:
+    event, data = chunk.decode().strip().split("\n")
+    assert event == "event: availability"
+    return json.loads(data.removeprefix("data: "))
+
+
+class AvailabilityStreamTests(TransactionTestCase):
+    """Tickets are published on commit: TransactionTestCase."""
+
+    def setUp(self):
+        city = City.objects.create(
+            name="Kyiv", country=Country.objects.create(name="Ukraine")
+        )
+        route = Route.objects.create(
+            source=Airport.objects.create(name="Source", closest_big_city=city),
+            destination=Airport.objects.create(
+                name="Destination", closest_big_city=city
+            ),
+            distance=1000,
+        )
+        departure = timezone.now() + timedelta(days=1)
+        self.flight = Flight.objects.create(
+            route=route,
+            airplane=Airplane.objects.create(
+                name="Boeing",
+                rows=10,
+                seats_in_row=4,
+                airplane_type=AirplaneType.objects.create(name="Jet"),
+            ),
+            departure_time=departure,
+            arrival_time=departure + timedelta(hours=2),
+        )
+        self.user = get_user_model().objects.create_user(
+            email="test@test.test", password="testpassword"
+        )
+        self.order = Order.objects.create(user=self.user)
+        self.ticket = Ticket.objects.create(
+            row=1, seat=1, flight=self.flight, order=self.order
+        )
+        self.headers = {"Authorization": f"Bearer {AccessToken.for_user(self.user)}"}
+
+    async def test_snapshot_then_changes(self):
+        res = await self.async_client.get(
+            AVAILABILITY_URL, {"flights": f"{self.flight.pk},404"}, headers=self.headers
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res["Content-Type"], "text/event-stream")
+        stream = aiter(res.streaming_content)
+
+        self.assertEqual(
+            parse_event(await anext(stream)),
+            {"flight": self.flight.pk, "tickets_available": 39, "taken": [[1, 1]]},
+        )
+
+        await sync_to_async(Ticket.objects.create)(
+            row=2, seat=3, flight=self.flight, order=self.order
+        )
+        self.assertEqual(
+            parse_event(await asyncio.wait_for(anext(stream), 5)),
+            {"flight": self.flight.pk, "tickets_available": 38, "taken": [[3, 2]]},
+        )
+
+        await sync_to_async(self.ticket.delete)()
+        self.assertEqual(
+            parse_event(await asyncio.wait_for(anext(stream), 5)),
+            {"flight": self.flight.pk, "tickets_available": 39, "released": [[1, 1]]},
+        )
+        await stream.aclose()
+
+    async def test_unknown_flights(self):
+        res = await self.async_client.get(
+            AVAILABILITY_URL, {"flights": "404"}, headers=self.headers
+        )
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    async def test_invalid_flights(self):
+        for flights in ("", "abc", ",".join(map(str, range(21)))):
+            with self.subTest(flights):
+                res = await self.async_client.get(
+                    AVAILABILITY_URL, {"flights": flights}, headers=self.headers
+                )
+                self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    async def test_auth_required(self):
+        res = await self.async_client.get(AVAILABILITY_URL, {"flights": "1"})
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_failed_publish_does_not_fail_the_booking(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        with mock.patch(
+            "air_service.availability.publish", side_effect=ConnectionError
+        ) as publish, self.assertLogs("django.db.backends.base", "ERROR"):
+            res = client.post(
+                reverse("air-service:order-list"),
+                {"tickets": [{"row": 2, "seat": 2, "flight": self.flight.pk}]},
+                format="json",
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        publish.assert_called_once()
+        self.assertTrue(Ticket.objects.filter(row=2, seat=2).exists())
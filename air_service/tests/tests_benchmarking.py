@@ -0,0 +1,77 @@
+from django.test import SimpleTestCase
+
+from air_service.benchmarking import (
+    Sample,
+    Summary,
+    compare_to_baseline,
+    percentile,
+)
+
+
+class PercentileTests(SimpleTestCase):
+    def test_nearest_rank(self):
+        values = list(range(1, 101))
+
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 95), 95)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile(values, 100), 100)
+
+    def test_empty(self):
+        self.assertEqual(percentile([], 95), 0.0)
+
+
+class SummaryTests(SimpleTestCase):
+    def test_from_samples(self):
+        samples = [Sample(0.010, 200, 3), Sample(0.030, 200, 5), Sample(0.020, 404, 4)]
+
+        summary = Summary.from_samples(samples, elapsed=0.5)
+
+        self.assertEqual(summary.requests, 3)
+        self.assertEqual(summary.errors, 1)
+        self.assertEqual(summary.p50_ms, 20.0)
+        self.assertEqual(summary.max_ms, 30.0)
+        self.assertEqual(summary.throughput_rps, 6.0)
+        self.assertEqual(summary.queries_per_request, 4.0)
+
+
+class CompareToBaselineTests(SimpleTestCase):
+    baseline = {
+        "flights-list": {
+            "p50_ms": 10, "p95_ms": 20, "p99_ms": 30,
+            "queries_per_request": 3, "errors": 0,
+        }
+    }
+
+    def result(self, **params):
+        result = dict(self.baseline["flights-list"])
+        result.update(params)
+        return {"flights-list": result}
+
+    def test_within_tolerance(self):
+        self.assertEqual(
+            compare_to_baseline(self.result(p95_ms=24), self.baseline, 0.25),
+            []
+        )
+
+    def test_latency_regression(self):
+        regressions = compare_to_baseline(
+            self.result(p95_ms=26), self.baseline, 0.25
+        )
+
+        self.assertEqual(regressions, ["flights-list: p95_ms 20 -> 26"])
+
+    def test_query_count_regression(self):
+        regressions = compare_to_baseline(
+            self.result(queries_per_request=4), self.baseline, 0.25
+        )
+
+        self.assertEqual(
+            regressions, ["flights-list: queries_per_request 3 -> 4"]
+        )
+
+    def test_new_scenario_is_ignored(self):
+        self.assertEqual(
+            compare_to_baseline({"new": {"p50_ms": 1}}, self.baseline, 0.25),
+            []
+        )
@@ -0,0 +1,155 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from air_service.models import (
+    Airplane,
+    AirplaneType,
+    Airport,
+    City,
+    Country,
+    Flight,
+    FlightOccupancy,
+    Route,
+)
+
+COUNTRY_BULK_URL = reverse("air-service:country-bulk")
+CITY_BULK_URL = reverse("air-service:city-bulk")
+FLIGHT_BULK_URL = reverse("air-service:flight-bulk")
+
+
+class BulkWriteTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(
+            get_user_model().objects.create_user(
+                email="admin@test.test", password="testpassword", is_staff=True
+            )
+        )
+        self.ukraine = Country.objects.create(name="Ukraine")
+
+    def test_create(self):
+        res = self.client.post(
+            COUNTRY_BULK_URL, [{"name": "spain"}, {"name": "Poland"}], format="json"
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([result["status"] for result in res.data], [201, 201])
+        self.assertEqual(
+            Country.objects.get(pk=res.data[0]["id"]).name, "Spain"
+        )
+
+    def test_per_row_errors(self):
+        res = self.client.post(
+            CITY_BULK_URL,
+            [
+                {"name": "Lviv", "country": self.ukraine.pk},
+                {"name": "Paris", "country": 404},
+                {"name": "lviv", "country": self.ukraine.pk},
+                {"country": self.ukraine.pk},
+                "Odesa",
+            ],
+            format="json",
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual(res.data[0]["status"], 201)
+        self.assertIn("country", res.data[1]["errors"])
+        self.assertIn("non_field_errors", res.data[2]["errors"])
+        self.assertIn("name", res.data[3]["errors"])
+        self.assertIn("non_field_errors", res.data[4]["errors"])
+        self.assertEqual(City.objects.count(), 1)
+
+    def test_unique_against_existing_rows(self):
+        res = self.client.post(COUNTRY_BULK_URL, [{"name": "ukraine"}], format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("name", res.data[0]["errors"])
+
+    def test_upsert(self):
+        res = self.client.put(
+            COUNTRY_BULK_URL,
+            [
+                {"id": self.ukraine.pk, "name": "Ukraine renamed"},
+                {"name": "Spain"},
+                {"id": 404, "name": "Nowhere"},
+                {"id": self.ukraine.pk + 100, "name": "Ukraine"},
+            ],
+            format="json",
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual(
+            [result["status"] for result in res.data], [200, 201, 400, 400]
+        )
+        self.ukraine.refresh_from_db()
+        self.assertEqual(self.ukraine.name, "Ukraine Renamed")
+
+    def test_query_count_does_not_depend_on_rows(self):
+        for count in (10, 100):
+            rows = [
+                {"name": f"City {count}-{number}", "country": self.ukraine.pk}
+                for number in range(count)
+            ]
+            # Relations, uniqueness, savepoint, insert, table version and
+            # reference change queries, release.
+            with self.assertNumQueries(10):
+                res = self.client.post(CITY_BULK_URL, rows, format="json")
+            self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+    def test_flights_get_occupancy(self):
+        city = City.objects.create(name="Kyiv", country=self.ukraine)
+        airport = Airport.objects.create(name="Boryspil", closest_big_city=city)
+        route = Route.objects.create(source=airport, destination=airport, distance=1)
+        airplane = Airplane.objects.create(
+            name="Boeing",
+            rows=10,
+            seats_in_row=4,
+            airplane_type=AirplaneType.objects.create(name="Jet"),
+        )
+        departure = timezone.now() + timedelta(days=1)
+
+        res = self.client.post(
+            FLIGHT_BULK_URL,
+            [
+                {
+                    "route": route.pk,
+                    "airplane": airplane.pk,
+                    "departure_time": departure + timedelta(days=day),
+                    "arrival_time": departure + timedelta(days=day, hours=2),
+                }
+                for day in range(3)
+            ]
+            + [
+                {
+                    "route": route.pk,
+                    "airplane": airplane.pk,
+                    "departure_time": departure,
+                    "arrival_time": departure - timedelta(hours=1),
+                }
+            ],
+            format="json",
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertIn("arrival_time", res.data[3]["errors"])
+        self.assertEqual(Flight.objects.count(), 3)
+        self.assertEqual(FlightOccupancy.objects.count(), 3)
+
+    def test_payload_must_be_a_list(self):
+        res = self.client.post(COUNTRY_BULK_URL, {"name": "Spain"}, format="json")
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_staff_only(self):
+        self.client.force_authenticate(
+            get_user_model().objects.create_user(
+                email="user@test.test", password="testpassword"
+            )
+        )
+        res = self.client.post(COUNTRY_BULK_URL, [], format="json")
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
@@ -0,0 +1,45 @@
+from unittest import mock
+
+from django.test import SimpleTestCase
+from prometheus_client import CollectorRegistry
+
+from air_service import db_pool
+
+
+class FakePool:
+    def get_stats(self):
+        return {
+            "pool_max": 10,
+            "pool_size": 4,
+            "pool_available": 1,
+            "requests_waiting": 2,
+            "requests_num": 50,
+            "requests_wait_ms": 1500,
+        }
+
+
+class ConnectionPoolCollectorTests(SimpleTestCase):
+    def setUp(self):
+        self.registry = CollectorRegistry()
+        db_pool.register_pool_metrics(self.registry)
+
+    def sample(self, name):
+        return self.registry.get_sample_value(name, {"alias": "default"})
+
+    def test_pool_stats_are_exported(self):
+        with mock.patch.object(
+            db_pool, "existing_pools", return_value=[("default", FakePool())]
+        ):
+            self.assertEqual(self.sample("air_service_db_pool_connections_in_use"), 3)
+            self.assertEqual(self.sample("air_service_db_pool_max_connections"), 10)
+            self.assertEqual(self.sample("air_service_db_pool_waiters"), 2)
+            self.assertEqual(self.sample("air_service_db_pool_requests_total"), 50)
+            self.assertEqual(self.sample("air_service_db_pool_wait_seconds_total"), 1.5)
+            self.assertEqual(self.sample("air_service_db_pool_errors_total"), 0)
+
+    def test_sqlite_has_no_pools(self):
+        self.assertEqual(list(db_pool.existing_pools()), [])
+        self.assertIsNone(self.sample("air_service_db_pool_connections_in_use"))
+
+    def test_registering_twice_is_harmless(self):
+        db_pool.register_pool_metrics(self.registry)
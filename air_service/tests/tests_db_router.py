@@ -0,0 +1,151 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS, connection
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from air_service import db_router
+from air_service.benchmarking import QUERY_COUNT_HEADER
+from air_service.db_router import ReplicaRouter, RoutingState, client_key
+from air_service.middleware import QueryCountMiddleware
+from air_service.models import Country
+
+COUNTRY_URL = reverse("air-service:country-list")
+
+
+class ReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.router = ReplicaRouter()
+        db_router._local_pins.clear()
+        replicas = mock.patch.object(
+            db_router, "replica_aliases", return_value=["replica_1"]
+        )
+        replicas.start()
+        self.addCleanup(replicas.stop)
+        self.healthy = mock.patch.object(
+            db_router.health, "is_healthy", return_value=True
+        ).start()
+        self.addCleanup(mock.patch.stopall)
+
+    def read_with(self, state):
+        token = db_router._state.set(state)
+        try:
+            return self.router.db_for_read(None)
+        finally:
+            db_router._state.reset(token)
+
+    def test_no_request_reads_primary(self):
+        self.assertIsNone(self.router.db_for_read(None))
+
+    def test_unsafe_request_reads_primary(self):
+        self.assertIsNone(self.read_with(RoutingState(client="user:1")))
+
+    def test_safe_request_reads_replica(self):
+        state = RoutingState(client="user:1", read_only=True)
+        self.assertEqual(self.read_with(state), "replica_1")
+
+    def test_decision_is_made_once_per_request(self):
+        state = RoutingState(client=None, read_only=True)
+        self.read_with(state)
+        self.read_with(state)
+        self.assertEqual(self.healthy.call_count, 1)
+
+    def test_pinned_client_reads_primary(self):
+        db_router.pin_to_primary("user:1")
+        state = RoutingState(client="user:1", read_only=True)
+        self.assertEqual(self.read_with(state), DEFAULT_DB_ALIAS)
+        other = RoutingState(client="user:2", read_only=True)
+        self.assertEqual(self.read_with(other), "replica_1")
+
+    def test_lagging_replica_falls_back_to_primary(self):
+        self.healthy.return_value = False
+        state = RoutingState(client=None, read_only=True)
+        self.assertEqual(self.read_with(state), DEFAULT_DB_ALIAS)
+
+    def test_writes_and_migrations_use_primary(self):
+        self.assertEqual(self.router.db_for_write(None), DEFAULT_DB_ALIAS)
+        self.assertFalse(self.router.allow_migrate("replica_1", "air_service"))
+
+    def test_client_key_from_bearer_token(self):
+        payload = 'eyJ1c2VyX2lkIjogN30'  # {"user_id": 7}
+        request = RequestFactory().get(
+            "/", HTTP_AUTHORIZATION=f"Bearer header.{payload}.signature"
+        )
+        self.assertEqual(client_key(request), "user:7")
+        request = RequestFactory().get("/", HTTP_AUTHORIZATION="Bearer garbage")
+        self.assertIsNone(client_key(request))
+
+
+class ReplicaRoutingMiddlewareTests(TestCase):
+    def setUp(self):
+        db_router._local_pins.clear()
+        self.user = get_user_model().objects.create_superuser(
+            email="admin@test.com", password="testpass"
+        )
+        self.client = APIClient()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.user)}"
+        )
+        self.states = []
+
+        def choose(router, state):
+            self.states.append(
+                (state.read_only, db_router.is_pinned(state.client))
+            )
+            return DEFAULT_DB_ALIAS
+
+        patcher = mock.patch.object(ReplicaRouter, "choose", autospec=True)
+        patcher.start().side_effect = choose
+        self.addCleanup(patcher.stop)
+
+    def test_safe_api_request_is_read_only(self):
+        self.client.get(COUNTRY_URL)
+        self.assertEqual(self.states, [(True, False)])
+
+    def test_write_pins_user_to_primary(self):
+        res = self.client.post(COUNTRY_URL, {"name": "Ukraine"})
+        self.assertEqual(res.status_code, 201)
+        self.assertEqual(self.states, [])
+        self.client.get(COUNTRY_URL)
+        self.assertEqual(self.states, [(True, True)])
+
+    def test_failed_write_does_not_pin(self):
+        self.client.post(COUNTRY_URL, {})
+        self.assertFalse(db_router.is_pinned(f"user:{self.user.pk}"))
+
+    def test_query_metrics_are_installed(self):
+        self.assertTrue(
+            any(
+                getattr(wrapper, "query_metrics", False)
+                for wrapper in connection.execute_wrappers
+            )
+        )
+
+
+class QueryMetricsWrapperTests(TestCase):
+    def test_connecting_during_counted_request(self):
+        # As if the connection was closed: the first query of the request
+        # connects again, after QueryCountMiddleware pushed its counter.
+        connection.execute_wrappers[:] = [
+            wrapper
+            for wrapper in connection.execute_wrappers
+            if not getattr(wrapper, "query_metrics", False)
+        ]
+        before = list(connection.execute_wrappers)
+
+        def view(request):
+            connection_created.send(sender=type(connection), connection=connection)
+            Country.objects.count()
+            return HttpResponse()
+
+        for _ in range(2):
+            response = QueryCountMiddleware(view)(RequestFactory().get("/"))
+
+            self.assertEqual(response[QUERY_COUNT_HEADER], "1")
+            self.assertEqual(len(connection.execute_wrappers), len(before) + 1)
+            self.assertTrue(connection.execute_wrappers[0].query_metrics)
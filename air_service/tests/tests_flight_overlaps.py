@@ -0,0 +1,217 @@
+from datetime import datetime, timedelta
+from importlib import import_module
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import CommandError
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from air_service import schedules
+from air_service.models import (
+    Airplane,
+    AirplaneType,
+    Airport,
+    City,
+    Country,
+    Flight,
+    FlightSchedule,
+    Route,
+)
+from air_service.overlaps import IntervalIndex
+
+FLIGHT_URL = reverse("air-service:flight-list")
+FLIGHT_BULK_URL = reverse("air-service:flight-bulk")
+SCHEDULE_URL = reverse("air-service:flightschedule-list")
+
+
+class IntervalIndexTests(SimpleTestCase):
+    def test_overlapping(self):
+        index = IntervalIndex([(10, 20, "b"), (0, 100, "a"), (30, 40, "c")])
+
+        self.assertEqual(index.overlapping(50, 60), "a")
+        self.assertEqual(index.overlapping(-10, 1), "a")
+        self.assertIsNone(index.overlapping(100, 110))
+        self.assertIsNone(index.overlapping(-10, 0))
+        self.assertIsNone(index.overlapping(50, 50))
+
+    def test_touching_intervals_do_not_overlap(self):
+        index = IntervalIndex([(0, 10, "a"), (20, 30, "b")])
+
+        self.assertIsNone(index.overlapping(10, 20))
+        self.assertEqual(index.overlapping(9, 20), "a")
+        self.assertEqual(index.overlapping(10, 21), "b")
+
+
+class FlightOverlapTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        city = City.objects.create(
+            name="Kyiv", country=Country.objects.create(name="Ukraine")
+        )
+        airport = Airport.objects.create(name="Boryspil", closest_big_city=city)
+        cls.route = Route.objects.create(
+            source=airport, destination=airport, distance=1000
+        )
+        airplane_type = AirplaneType.objects.create(name="Jet")
+        cls.airplane = Airplane.objects.create(
+            name="Boeing", rows=10, seats_in_row=4, airplane_type=airplane_type
+        )
+        cls.other_airplane = Airplane.objects.create(
+            name="Airbus", rows=10, seats_in_row=4, airplane_type=airplane_type
+        )
+        cls.departure = timezone.now().replace(microsecond=0) + timedelta(days=2)
+        cls.flight = Flight.objects.create(
+            route=cls.route,
+            airplane=cls.airplane,
+            departure_time=cls.departure,
+            arrival_time=cls.departure + timedelta(hours=3),
+        )
+        cls.admin = get_user_model().objects.create_user(
+            email="admin@test.test", password="testpassword", is_staff=True
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def payload(self, departure: datetime, hours: int = 2, **fields) -> dict:
+        return {
+            "route": self.route.pk,
+            "airplane": self.airplane.pk,
+            "departure_time": departure,
+            "arrival_time": departure + timedelta(hours=hours),
+            **fields,
+        }
+
+    def test_overlapping_flight_rejected(self):
+        res = self.client.post(
+            FLIGHT_URL, self.payload(self.departure + timedelta(hours=1))
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn(str(self.flight.pk), res.data["airplane"][0])
+
+    def test_back_to_back_and_other_airplane_allowed(self):
+        res = self.client.post(
+            FLIGHT_URL, self.payload(self.departure + timedelta(hours=3))
+        )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        res = self.client.post(
+            FLIGHT_URL,
+            self.payload(self.departure, airplane=self.other_airplane.pk),
+        )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+    def test_update_ignores_the_flight_itself(self):
+        res = self.client.put(
+            reverse("air-service:flight-detail", args=(self.flight.pk,)),
+            self.payload(self.departure + timedelta(hours=1), hours=3),
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_bulk_checks_stored_flights_and_rows(self):
+        later = self.departure + timedelta(days=1)
+
+        res = self.client.post(
+            FLIGHT_BULK_URL,
+            [
+                self.payload(self.departure),
+                self.payload(later),
+                self.payload(later + timedelta(hours=1)),
+                self.payload(later + timedelta(hours=3)),
+            ],
+            format="json",
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertIn(str(self.flight.pk), res.data[0]["errors"]["airplane"][0])
+        self.assertIn("row 2", res.data[1]["errors"]["airplane"][0])
+        self.assertIn("row 1", res.data[2]["errors"]["airplane"][0])
+        self.assertEqual(res.data[3]["status"], status.HTTP_201_CREATED)
+
+    def test_schedule_overlapping_flights_rejected(self):
+        day = timezone.localdate(self.departure)
+        res = self.client.post(
+            SCHEDULE_URL,
+            {
+                "route": self.route.pk,
+                "airplane": self.airplane.pk,
+                "days_of_week": "1234567",
+                "departure_time": timezone.localtime(self.departure).time(),
+                "duration": "01:00:00",
+                "timezone": timezone.get_current_timezone_name(),
+                "valid_from": day,
+                "valid_until": day + timedelta(days=6),
+            },
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("1 departures", res.data["airplane"][0])
+
+    def test_expansion_skips_conflicting_departures(self):
+        day = timezone.localdate(self.departure)
+        schedule = FlightSchedule.objects.create(
+            route=self.route,
+            airplane=self.airplane,
+            days_of_week="1234567",
+            departure_time=timezone.localtime(self.departure).time(),
+            duration=timedelta(hours=1),
+            timezone=timezone.get_current_timezone_name(),
+            valid_from=day,
+            valid_until=day + timedelta(days=6),
+        )
+
+        result = schedules.expand(schedule)
+
+        self.assertEqual(result.created, 6)
+        self.assertEqual(result.conflicts, 1)
+        self.assertFalse(
+            Flight.objects.filter(
+                schedule=schedule, departure_time=self.departure
+            ).exists()
+        )
+        self.assertEqual(schedules.expand(schedule), schedules.Expansion(conflicts=1))
+
+
+class NoOverlapMigrationTests(TestCase):
+    def test_existing_overlaps_are_listed(self):
+        migration = import_module("air_service.migrations.0014_flight_overlaps")
+        route = Route.objects.create(
+            source=Airport.objects.create(
+                name="Boryspil",
+                closest_big_city=City.objects.create(
+                    name="Kyiv", country=Country.objects.create(name="Ukraine")
+                ),
+            ),
+            destination=Airport.objects.first(),
+            distance=1000,
+        )
+        airplane = Airplane.objects.create(
+            name="Boeing",
+            rows=10,
+            seats_in_row=4,
+            airplane_type=AirplaneType.objects.create(name="Jet"),
+        )
+        departure = timezone.now()
+        first, second = [
+            Flight.objects.create(
+                route=route,
+                airplane=airplane,
+                departure_time=departure + timedelta(hours=hours),
+                arrival_time=departure + timedelta(hours=hours + 2),
+            )
+            for hours in (0, 2)
+        ]
+        migration.check_no_overlaps(Flight)
+
+        second.departure_time -= timedelta(hours=1)
+        second.save()
+        with self.assertRaisesMessage(
+            CommandError, f"flights {first.pk} and {second.pk} overlap"
+        ):
+            migration.check_no_overlaps(Flight)
@@ -0,0 +1,214 @@
+from datetime import date, time, timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from air_service import schedules
+from air_service.models import (
+    Airplane,
+    AirplaneType,
+    Airport,
+    City,
+    Country,
+    Flight,
+    FlightOccupancy,
+    FlightSchedule,
+    Order,
+    Route,
+    Ticket,
+)
+
+SCHEDULE_URL = reverse("air-service:flightschedule-list")
+
+
+def detail_url(schedule_id):
+    return reverse("air-service:flightschedule-detail", args=(schedule_id,))
+
+
+class FlightScheduleTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        city = City.objects.create(
+            name="Kyiv", country=Country.objects.create(name="Ukraine")
+        )
+        airport = Airport.objects.create(name="Boryspil", closest_big_city=city)
+        cls.route = Route.objects.create(
+            source=airport, destination=airport, distance=1000
+        )
+        cls.airplane = Airplane.objects.create(
+            name="Boeing",
+            rows=10,
+            seats_in_row=4,
+            airplane_type=AirplaneType.objects.create(name="Jet"),
+        )
+        cls.admin = get_user_model().objects.create_user(
+            email="admin@test.test", password="testpassword", is_staff=True
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        # Four full weeks starting next Monday.
+        today = timezone.localdate()
+        self.valid_from = today + timedelta(days=7 - today.weekday())
+        self.valid_until = self.valid_from + timedelta(days=27)
+
+    def payload(self, **fields) -> dict:
+        return {
+            "route": self.route.pk,
+            "airplane": self.airplane.pk,
+            "days_of_week": "135",
+            "departure_time": "08:30",
+            "duration": "02:15:00",
+            "timezone": "Europe/Kiev",
+            "valid_from": self.valid_from.isoformat(),
+            "valid_until": self.valid_until.isoformat(),
+            **fields,
+        }
+
+    def create_schedule(self, **fields) -> FlightSchedule:
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.client.post(SCHEDULE_URL, self.payload(**fields))
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED, res.data)
+        return FlightSchedule.objects.get(pk=res.data["id"])
+
+    def test_create_expands_flights(self):
+        schedule = self.create_schedule()
+
+        flights = Flight.objects.filter(schedule=schedule).order_by("departure_time")
+        self.assertEqual(flights.count(), 12)
+        first = flights.first()
+        self.assertEqual(
+            timezone.localtime(first.departure_time).time(), time(8, 30)
+        )
+        self.assertEqual(timezone.localdate(first.departure_time), self.valid_from)
+        self.assertEqual(
+            first.arrival_time - first.departure_time, timedelta(hours=2, minutes=15)
+        )
+        self.assertEqual(
+            FlightOccupancy.objects.filter(flight__schedule=schedule).count(), 12
+        )
+        schedule.refresh_from_db()
+        self.assertIsNotNone(schedule.expanded_at)
+
+    def test_skipped_inserts_are_not_counted(self):
+        schedule = FlightSchedule.objects.create(
+            route=self.route,
+            airplane=self.airplane,
+            days_of_week="135",
+            departure_time=time(8, 30),
+            duration=timedelta(hours=2),
+            timezone="Europe/Kiev",
+            valid_from=self.valid_from,
+            valid_until=self.valid_until,
+        )
+        bulk_create = Flight.objects.bulk_create
+
+        def drop_first(flights, **kwargs):
+            # Like a row rejected by ignore_conflicts.
+            return bulk_create(flights[1:], **kwargs)
+
+        with mock.patch.object(Flight.objects, "bulk_create", drop_first):
+            result = schedules.expand(schedule)
+
+        self.assertEqual(result.created, 11)
+        self.assertEqual(Flight.objects.filter(schedule=schedule).count(), 11)
+        self.assertEqual(
+            FlightOccupancy.objects.filter(flight__schedule=schedule).count(), 11
+        )
+
+    def test_reexpansion_is_idempotent(self):
+        schedule = self.create_schedule()
+        ids = set(Flight.objects.values_list("pk", flat=True))
+
+        result = schedules.expand(schedule)
+
+        self.assertEqual(result, schedules.Expansion())
+        self.assertEqual(set(Flight.objects.values_list("pk", flat=True)), ids)
+
+    def test_edit_updates_and_removes_flights(self):
+        schedule = self.create_schedule()
+        sold = Flight.objects.filter(schedule=schedule).latest("departure_time")
+        Ticket.objects.create(
+            row=1,
+            seat=1,
+            flight=sold,
+            order=Order.objects.create(user=self.admin),
+        )
+        airbus = Airplane.objects.create(
+            name="Airbus",
+            rows=20,
+            seats_in_row=6,
+            airplane_type=self.airplane.airplane_type,
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.client.patch(
+                detail_url(schedule.pk),
+                {
+                    "days_of_week": "1",
+                    "airplane": airbus.pk,
+                    "duration": "03:00:00",
+                },
+            )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        flights = Flight.objects.filter(schedule=schedule)
+        # Four Mondays, and the sold Friday flight that is kept.
+        self.assertEqual(flights.count(), 5)
+        self.assertTrue(flights.filter(pk=sold.pk).exists())
+        mondays = flights.exclude(pk=sold.pk)
+        self.assertFalse(mondays.exclude(airplane=airbus).exists())
+        self.assertEqual(
+            {flight.arrival_time - flight.departure_time for flight in mondays},
+            {timedelta(hours=3)},
+        )
+        self.assertEqual(
+            set(
+                FlightOccupancy.objects.filter(flight__in=mondays).values_list(
+                    "seats", flat=True
+                )
+            ),
+            {120},
+        )
+
+    def test_past_flights_are_left_alone(self):
+        schedule = self.create_schedule()
+        past = Flight.objects.filter(schedule=schedule).earliest("departure_time")
+        Flight.objects.filter(pk=past.pk).update(
+            departure_time=timezone.now() - timedelta(days=1),
+            arrival_time=timezone.now() - timedelta(days=1),
+        )
+
+        schedules.expand(schedule)
+
+        past.refresh_from_db()
+        self.assertLess(past.departure_time, timezone.now())
+        self.assertEqual(Flight.objects.filter(schedule=schedule).count(), 13)
+
+    def test_validation(self):
+        cases = {
+            "days_of_week": {"days_of_week": "118"},
+            "timezone": {"timezone": "Mars/Olympus"},
+            "valid_until": {"valid_until": self.valid_from - timedelta(days=1)},
+            "duration": {"days_of_week": "1234567", "duration": "1 00:00:01"},
+        }
+        for field, fields in cases.items():
+            with self.subTest(field):
+                res = self.client.post(SCHEDULE_URL, self.payload(**fields))
+                self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+                self.assertIn(field, res.data)
+
+    def test_staff_only(self):
+        self.client.force_authenticate(
+            get_user_model().objects.create_user(
+                email="user@test.test", password="testpassword"
+            )
+        )
+        res = self.client.get(SCHEDULE_URL)
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
@@ -0,0 +1,107 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command, CommandError
+from django.db.models import Count, F
+from django.test import TestCase
+
+from air_service.models import (
+    Airplane,
+    Airport,
+    City,
+    Country,
+    Flight,
+    Order,
+    Route,
+    Ticket,
+)
+
+SMALL_DATASET = {
+    "countries": 3,
+    "cities": 6,
+    "airports": 8,
+    "airplane_types": 2,
+    "airplanes": 4,
+    "crew": 6,
+    "routes": 10,
+    "flights": 25,
+    "users": 5,
+    "orders": 12,
+    "tickets": 100,
+    "chunk_size": 10,
+    "batch_size": 7,
+}
+
+
+def generate(**params):
+    options = {**SMALL_DATASET, **params}
+    call_command("generate_airline_data", stdout=StringIO(), **options)
+
+
+class GenerateAirlineDataTests(TestCase):
+    def test_creates_requested_catalogue(self):
+        generate(seed=1)
+
+        self.assertEqual(Country.objects.count(), 3)
+        self.assertEqual(City.objects.count(), 6)
+        self.assertEqual(Airport.objects.count(), 8)
+        self.assertEqual(Airplane.objects.count(), 4)
+        self.assertEqual(Route.objects.count(), 10)
+        self.assertEqual(Flight.objects.count(), 25)
+        self.assertEqual(Order.objects.count(), 12)
+        self.assertEqual(
+            get_user_model().objects.filter(email__endswith="-1@airline.test").count(),
+            5
+        )
+
+    def test_generated_data_respects_model_rules(self):
+        generate(seed=2)
+
+        self.assertTrue(Ticket.objects.exists())
+        for ticket in Ticket.objects.select_related("flight__airplane"):
+            airplane = ticket.flight.airplane
+            self.assertTrue(1 <= ticket.row <= airplane.rows)
+            self.assertTrue(1 <= ticket.seat <= airplane.seats_in_row)
+        for flight in Flight.objects.all():
+            self.assertGreater(flight.arrival_time, flight.departure_time)
+            self.assertFalse(
+                Flight.objects.filter(
+                    airplane=flight.airplane_id,
+                    departure_time__lt=flight.arrival_time,
+                    arrival_time__gt=flight.departure_time,
+                )
+                .exclude(pk=flight.pk)
+                .exists()
+            )
+        for country in Country.objects.all():
+            self.assertEqual(
+                country.name,
+                " ".join(word.capitalize() for word in country.name.split())
+            )
+        self.assertFalse(
+            Route.objects.filter(source_id=F("destination_id")).exists()
+        )
+        overbooked = Flight.objects.annotate(sold=Count("tickets")).filter(
+            sold__gt=F("airplane__rows") * F("airplane__seats_in_row")
+        )
+        self.assertFalse(overbooked.exists())
+
+    def test_same_seed_produces_same_names(self):
+        generate(seed=3, flights=0, tickets=0)
+        names = list(Country.objects.order_by("pk").values_list("name", flat=True))
+        Country.objects.all().delete()
+        get_user_model().objects.all().delete()
+
+        generate(seed=3, flights=0, tickets=0)
+
+        self.assertEqual(
+            names,
+            list(Country.objects.order_by("pk").values_list("name", flat=True))
+        )
+
+    def test_same_seed_twice_is_rejected(self):
+        generate(seed=4, flights=0)
+
+        with self.assertRaises(CommandError):
+            generate(seed=4, flights=0)
+
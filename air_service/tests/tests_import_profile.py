@@ -0,0 +1,62 @@
+import subprocess
+import sys
+
+from django.conf import settings
+from django.test import SimpleTestCase
+
+from air_service.management.commands.import_profile import (
+    ENTRY_POINTS,
+    parse_importtime,
+    profile_startup,
+)
+
+# Generous budgets: they catch a heavy import sneaking into startup, not
+# machine-to-machine noise.
+STARTUP_BUDGET_SECONDS = {"web": 4.0, "worker": 4.0}
+
+IMPORTTIME_OUTPUT = """\
+import time: self [us] | cumulative | imported package
+import time:       120 |        120 |   sendgrid.helpers
+import time:       300 |        420 | sendgrid
+some warning printed by a module
+import time:        50 |         50 | air_service.tasks
+"""
+
+
+class ParseImportTimeTests(SimpleTestCase):
+    def test_parse(self):
+        records = parse_importtime(IMPORTTIME_OUTPUT)
+
+        self.assertEqual(
+            [(record.module, record.self_us, record.depth) for record in records],
+            [
+                ("sendgrid.helpers", 120, 1),
+                ("sendgrid", 300, 0),
+                ("air_service.tasks", 50, 0),
+            ],
+        )
+
+
+class StartupTests(SimpleTestCase):
+    def test_startup_time_within_budget(self):
+        for entry, budget in STARTUP_BUDGET_SECONDS.items():
+            with self.subTest(entry):
+                profile = profile_startup(entry)
+                self.assertLess(profile.wall_seconds, budget)
+
+    def test_sendgrid_is_not_imported_at_startup(self):
+        for entry in ("web", "worker", "manage"):
+            with self.subTest(entry):
+                result = subprocess.run(
+                    [
+                        sys.executable,
+                        "-c",
+                        ENTRY_POINTS[entry]
+                        + "\nimport sys\nprint('sendgrid' in sys.modules)",
+                    ],
+                    cwd=settings.BASE_DIR,
+                    capture_output=True,
+                    text=True,
+                    check=True,
+                )
+                self.assertEqual(result.stdout.strip().splitlines()[-1], "False")
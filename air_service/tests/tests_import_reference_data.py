@@ -0,0 +1,159 @@
+import io
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command, CommandError
+from django.test import SimpleTestCase, TestCase
+
+from air_service.management.commands.import_reference_data import iter_fixture
+from air_service.models import (
+    Airplane,
+    AirplaneType,
+    Airport,
+    City,
+    Country,
+    Order,
+    Route,
+)
+
+FIXTURE = os.path.join(settings.BASE_DIR, "data.json")
+
+
+def run_import(path, **options):
+    call_command("import_reference_data", path, stdout=StringIO(), **options)
+
+
+class IterFixtureTests(SimpleTestCase):
+    def test_streams_objects_across_chunks(self):
+        objects = [{"model": "air_service.country", "pk": i, "fields": {"name": f"c{i}"}}
+                   for i in range(50)]
+        stream = io.StringIO(json.dumps(objects, indent=2))
+
+        self.assertEqual(list(iter_fixture(stream, chunk_size=7)), objects)
+
+    def test_empty_array(self):
+        self.assertEqual(list(iter_fixture(io.StringIO("[ ]"))), [])
+
+    def test_rejects_non_array(self):
+        with self.assertRaises(ValueError):
+            list(iter_fixture(io.StringIO('{"model": "x"}')))
+
+
+class ImportFixtureTests(TestCase):
+    def test_matches_loaddata(self):
+        call_command("loaddata", FIXTURE, verbosity=0)
+        expected = {
+            model: list(model.objects.order_by("pk").values())
+            for model in (Country, City, AirplaneType, Airport, Route, Order)
+        }
+        expected_crew = list(
+            Airplane.crew.through.objects.order_by("pk").values_list(
+                "airplane_id", "crew_id"
+            )
+        )
+        for model in (Order, Route, Airport, Airplane, City, Country, AirplaneType):
+            model.objects.all().delete()
+        get_user_model().objects.all().delete()
+
+        run_import(FIXTURE)
+
+        for model, rows in expected.items():
+            self.assertEqual(list(model.objects.order_by("pk").values()), rows)
+        self.assertEqual(
+            sorted(
+                Airplane.crew.through.objects.values_list("airplane_id", "crew_id")
+            ),
+            sorted(expected_crew)
+        )
+
+    def test_import_is_idempotent(self):
+        run_import(FIXTURE)
+        counts = [Country.objects.count(), City.objects.count(), Airport.objects.count()]
+
+        run_import(FIXTURE)
+
+        self.assertEqual(
+            [Country.objects.count(), City.objects.count(), Airport.objects.count()],
+            counts
+        )
+
+    def test_query_count_does_not_depend_on_rows(self):
+        objects = [
+            {"model": "air_service.country", "pk": pk, "fields": {"name": f"country {pk}"}}
+            for pk in range(1, 301)
+        ]
+        handle, path = tempfile.mkstemp(suffix=".json")
+        with os.fdopen(handle, "w") as fixture:
+            json.dump(objects, fixture)
+        self.addCleanup(os.remove, path)
+
+        # Savepoint, one upsert, two table version queries, three queries
+        # logging the reference change, release.
+        with self.assertNumQueries(8):
+            run_import(path)
+
+        self.assertEqual(Country.objects.count(), 300)
+        self.assertEqual(Country.objects.get(pk=7).name, "Country 7")
+
+
+class ImportCsvTests(TestCase):
+    def write_csv(self, content: str) -> str:
+        handle, path = tempfile.mkstemp(suffix=".csv")
+        with os.fdopen(handle, "w") as csv_file:
+            csv_file.write(content)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def test_countries_are_normalized_and_deduplicated(self):
+        path = self.write_csv("name\nthe united kingdom\nThe United Kingdom\njapan\n")
+
+        run_import(path, model="country")
+        run_import(path, model="country")
+
+        self.assertEqual(
+            list(Country.objects.values_list("name", flat=True)),
+            ["Japan", "The United Kingdom"]
+        )
+
+    def test_cities_resolve_countries_by_name(self):
+        country = Country.objects.create(name="Japan")
+        path = self.write_csv("name,country\ntokyo,japan\nOSAKA,Japan\n")
+
+        run_import(path, model="city")
+        run_import(path, model="city")
+
+        self.assertEqual(
+            sorted(City.objects.values_list("name", "country_id")),
+            [("Osaka", country.id), ("Tokyo", country.id)]
+        )
+
+    def test_airports_are_not_duplicated(self):
+        country = Country.objects.create(name="Japan")
+        city = City.objects.create(name="Tokyo", country=country)
+        path = self.write_csv("name,city,country\nHaneda,tokyo,japan\nNarita,Tokyo,Japan\n")
+
+        run_import(path, model="airport")
+        run_import(path, model="airport")
+
+        self.assertEqual(
+            sorted(Airport.objects.values_list("name", "closest_big_city_id")),
+            [("Haneda", city.id), ("Narita", city.id)]
+        )
+
+    def test_unknown_country_fails(self):
+        path = self.write_csv("name,country\nTokyo,Atlantis\n")
+
+        with self.assertRaises(CommandError):
+            run_import(path, model="city")
+
+        self.assertFalse(City.objects.exists())
+
+    def test_csv_requires_model(self):
+        path = self.write_csv("name\nJapan\n")
+
+        with self.assertRaises(CommandError):
+            run_import(path)
@@ -0,0 +1,26 @@
+import random
+
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase
+
+from air_service.management.commands.measure_prepared_statements import (
+    SHAPES,
+    Command,
+)
+
+
+class MeasurePreparedStatementsTests(TestCase):
+    def test_requires_postgresql(self):
+        with self.assertRaisesMessage(CommandError, "postgresql"):
+            call_command("measure_prepared_statements")
+
+    def test_shapes_compile_with_placeholders(self):
+        command = Command()
+        command.samples = {"flights": [1, 2], "users": [3]}
+        for name, build in SHAPES.items():
+            with self.subTest(name):
+                sql, params = command.compile(build, random.Random(0))
+                self.assertEqual(sql.count("%s"), len(params))
+                with connection.cursor() as cursor:
+                    cursor.execute(sql, params)
@@ -0,0 +1,150 @@
+import io
+import os
+import shutil
+import tempfile
+
+from PIL import Image
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from air_service.media_views import parse_range
+from air_service.models import Airplane, AirplaneType
+
+MEDIA_ROOT = tempfile.mkdtemp()
+CONTENT = bytes(range(256)) * 40
+
+
+def media_url(path):
+    return reverse("media", args=[path])
+
+
+class ParseRangeTests(TestCase):
+    def test_ranges(self):
+        self.assertEqual(parse_range("bytes=0-99", 1000), (0, 99))
+        self.assertEqual(parse_range("bytes=900-", 1000), (900, 999))
+        self.assertEqual(parse_range("bytes=-100", 1000), (900, 999))
+        self.assertEqual(parse_range("bytes=990-2000", 1000), (990, 999))
+
+    def test_ignored_ranges(self):
+        self.assertIsNone(parse_range("bytes=0-1,5-9", 1000))
+        self.assertIsNone(parse_range("items=0-1", 1000))
+
+    def test_unsatisfiable_range(self):
+        with self.assertRaises(ValueError):
+            parse_range("bytes=1000-", 1000)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, MEDIA_ACCEL="")
+class MediaViewTests(TestCase):
+    path = "upload/airplanes/plane-0123456789abcdef.jpg"
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        full_path = os.path.join(MEDIA_ROOT, cls.path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        with open(full_path, "wb") as file:
+            file.write(CONTENT)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(
+            get_user_model().objects.create_user(
+                email="test@test.com", password="testpass"
+            )
+        )
+
+    def test_auth_required(self):
+        res = APIClient().get(media_url(self.path))
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_whole_file(self):
+        res = self.client.get(media_url(self.path))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(b"".join(res.streaming_content), CONTENT)
+        self.assertEqual(res["Content-Type"], "image/jpeg")
+        self.assertEqual(res["Content-Length"], str(len(CONTENT)))
+        self.assertEqual(res["Accept-Ranges"], "bytes")
+        self.assertIn("immutable", res["Cache-Control"])
+        self.assertTrue(res["ETag"])
+
+    def test_if_none_match(self):
+        etag = self.client.get(media_url(self.path))["ETag"]
+
+        res = self.client.get(media_url(self.path), HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res["ETag"], etag)
+
+    def test_range(self):
+        res = self.client.get(media_url(self.path), HTTP_RANGE="bytes=100-199")
+
+        self.assertEqual(res.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(b"".join(res.streaming_content), CONTENT[100:200])
+        self.assertEqual(res["Content-Range"], f"bytes 100-199/{len(CONTENT)}")
+        self.assertEqual(res["Content-Length"], "100")
+
+    def test_unsatisfiable_range(self):
+        res = self.client.get(media_url(self.path), HTTP_RANGE="bytes=99999-")
+
+        self.assertEqual(
+            res.status_code, status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE
+        )
+        self.assertEqual(res["Content-Range"], f"bytes */{len(CONTENT)}")
+
+    def test_stale_if_range_returns_whole_file(self):
+        res = self.client.get(
+            media_url(self.path), HTTP_RANGE="bytes=0-9", HTTP_IF_RANGE='"stale"'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_missing_file_and_traversal(self):
+        for path in ("upload/airplanes/missing.jpg", "../settings.py", "upload"):
+            res = self.client.get(media_url(path))
+            self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND, path)
+
+    @override_settings(MEDIA_ACCEL="nginx", MEDIA_ACCEL_PREFIX="/protected-media/")
+    def test_x_accel_redirect(self):
+        res = self.client.get(media_url(self.path))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res["X-Accel-Redirect"], f"/protected-media/{self.path}")
+        self.assertEqual(res.content, b"")
+
+    @override_settings(MEDIA_ACCEL="sendfile")
+    def test_x_sendfile(self):
+        res = self.client.get(media_url(self.path))
+
+        self.assertEqual(res["X-Sendfile"], os.path.join(MEDIA_ROOT, self.path))
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ContentHashedImagePathTests(TestCase):
+    def test_same_content_same_name(self):
+        output = io.BytesIO()
+        Image.new("RGB", (10, 10)).save(output, format="JPEG")
+        airplane_type = AirplaneType.objects.create(name="Jet")
+        names = []
+        for name in ("upload.JPG", "other.JPG"):
+            airplane = Airplane.objects.create(
+                name="Boeing", airplane_type=airplane_type, rows=1, seats_in_row=1
+            )
+            airplane.image = ContentFile(output.getvalue(), name=name)
+            airplane.save()
+            names.append(airplane.image.name)
+            airplane.image.delete(save=False)
+
+        self.assertEqual(names[0], names[1])
+        self.assertRegex(names[0], r"^upload/airplanes/boeing-[0-9a-f]{16}\.jpg$")
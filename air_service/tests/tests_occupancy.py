@@ -0,0 +1,198 @@
+import io
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from air_service import occupancy
+from air_service.models import (
+    Airplane,
+    AirplaneType,
+    Airport,
+    City,
+    Country,
+    Flight,
+    FlightOccupancy,
+    OccupancyChange,
+    Order,
+    Route,
+    RouteDailyOccupancy,
+    Ticket,
+)
+
+ROUTE_OCCUPANCY_URL = reverse("air-service:route-occupancy-list")
+ROUTE_SUMMARY_URL = reverse("air-service:route-occupancy-summary")
+FLIGHT_OCCUPANCY_URL = reverse("air-service:flight-occupancy-list")
+
+
+class OccupancyTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        city = City.objects.create(
+            name="Kyiv", country=Country.objects.create(name="Ukraine")
+        )
+        airport = Airport.objects.create(name="Boryspil", closest_big_city=city)
+        cls.route = Route.objects.create(
+            source=airport, destination=airport, distance=1000
+        )
+        cls.airplane = Airplane.objects.create(
+            name="Boeing",
+            rows=10,
+            seats_in_row=4,
+            airplane_type=AirplaneType.objects.create(name="Jet"),
+        )
+        cls.departure = timezone.now().replace(hour=12) + timedelta(days=1)
+        cls.user = get_user_model().objects.create_user(
+            email="test@test.test", password="testpassword"
+        )
+
+    def sample_flight(self, days: int = 0) -> Flight:
+        departure = self.departure + timedelta(days=days)
+        return Flight.objects.create(
+            route=self.route,
+            airplane=self.airplane,
+            departure_time=departure,
+            arrival_time=departure + timedelta(hours=2),
+        )
+
+    def book(self, flight: Flight, *seats: int) -> list[Ticket]:
+        order = Order.objects.create(user=self.user)
+        return [
+            Ticket.objects.create(row=1, seat=seat, flight=flight, order=order)
+            for seat in seats
+        ]
+
+    def route_day(self, flight: Flight) -> tuple:
+        return RouteDailyOccupancy.objects.values_list(
+            "flights", "seats", "sold"
+        ).get(route=self.route, day=occupancy.flight_day(flight))
+
+    def test_bookings_are_compacted(self):
+        first, second = self.sample_flight(), self.sample_flight()
+        self.assertEqual(self.route_day(first), (2, 80, 0))
+
+        tickets = self.book(first, 1, 2, 3)
+        self.book(second, 1)
+        tickets[0].delete()
+
+        self.assertEqual(OccupancyChange.objects.count(), 5)
+        self.assertEqual(self.route_day(first), (2, 80, 0))
+
+        self.assertEqual(occupancy.compact(batch_size=2), 2)
+        self.assertEqual(occupancy.compact(), 3)
+
+        self.assertFalse(OccupancyChange.objects.exists())
+        self.assertEqual(FlightOccupancy.objects.get(flight=first).sold, 2)
+        self.assertEqual(self.route_day(first), (2, 80, 3))
+
+    def test_compacted_on_commit_without_redis(self):
+        flight = self.sample_flight()
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.book(flight, 1, 2)
+
+        self.assertEqual(callbacks.count(occupancy.compact_all), 1)
+        self.assertFalse(OccupancyChange.objects.exists())
+        self.assertEqual(self.route_day(flight), (1, 40, 2))
+
+    def test_compaction_creates_missing_totals(self):
+        flight = self.sample_flight()
+        FlightOccupancy.objects.all().delete()
+        RouteDailyOccupancy.objects.all().delete()
+        self.book(flight, 1)
+        OccupancyChange.objects.create(flight_id=flight.pk + 1000, sold=1)
+
+        occupancy.compact()
+
+        self.assertFalse(OccupancyChange.objects.exists())
+        self.assertEqual(FlightOccupancy.objects.get(flight=flight).sold, 1)
+        self.assertEqual(self.route_day(flight), (1, 40, 1))
+
+    def test_flight_and_airplane_changes(self):
+        flight = self.sample_flight()
+        self.book(flight, 1)
+        occupancy.compact()
+
+        flight.departure_time += timedelta(days=2)
+        flight.arrival_time += timedelta(days=2)
+        flight.save()
+        self.airplane.rows = 20
+        self.airplane.save()
+
+        self.assertEqual(RouteDailyOccupancy.objects.count(), 1)
+        self.assertEqual(self.route_day(flight), (1, 80, 1))
+
+        flight.delete()
+        occupancy.compact()
+        self.assertFalse(RouteDailyOccupancy.objects.exists())
+
+    def test_rebuild(self):
+        flight = self.sample_flight()
+        self.book(flight, 1, 2)
+        RouteDailyOccupancy.objects.all().delete()
+        FlightOccupancy.objects.all().delete()
+
+        call_command("rebuild_occupancy", stdout=io.StringIO())
+
+        self.assertFalse(OccupancyChange.objects.exists())
+        self.assertEqual(self.route_day(flight), (1, 40, 2))
+
+    def test_staff_endpoints(self):
+        self.book(self.sample_flight(), 1, 2)
+        self.book(self.sample_flight(days=3), 1)
+        occupancy.compact()
+        client = APIClient()
+        client.force_authenticate(self.user)
+        self.assertEqual(
+            client.get(ROUTE_OCCUPANCY_URL).status_code, status.HTTP_403_FORBIDDEN
+        )
+        client.force_authenticate(
+            get_user_model().objects.create_user(
+                email="admin@test.test", password="testpassword", is_staff=True
+            )
+        )
+        day = timezone.localdate(self.departure)
+
+        with self.assertNumQueries(2):
+            res = client.get(
+                ROUTE_OCCUPANCY_URL,
+                {"date_from": day.isoformat(), "date_to": day.isoformat()},
+            )
+        self.assertEqual(
+            res.data["results"],
+            [
+                {
+                    "route": self.route.pk,
+                    "day": day.isoformat(),
+                    "flights": 1,
+                    "seats": 40,
+                    "sold": 2,
+                    "load_factor": 0.05,
+                }
+            ],
+        )
+
+        res = client.get(ROUTE_SUMMARY_URL, {"route_ids": str(self.route.pk)})
+        self.assertEqual(
+            res.data["results"],
+            [
+                {
+                    "route": self.route.pk,
+                    "flights": 2,
+                    "seats": 80,
+                    "sold": 3,
+                    "load_factor": 0.0375,
+                }
+            ],
+        )
+
+        res = client.get(FLIGHT_OCCUPANCY_URL, {"date_from": day.isoformat()})
+        self.assertEqual(res.data["count"], 2)
+
+        res = client.get(ROUTE_SUMMARY_URL, {"route_ids": "a"})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
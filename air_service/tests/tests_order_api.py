@@ -1,6 +1,7 @@
 from datetime import timedelta
 
 from django.contrib.auth import get_user_model
+from django.db.models import Prefetch
 from django.test import TestCase
 from django.utils import timezone
 from rest_framework import status
@@ -102,10 +103,49 @@ class AuthenticatedOrderApiTests(TestCase):
         order.tickets.add(ticket)
 
         res = self.client.get(ORDER_URL)
-        orders = Order.objects.all().order_by("pk")
+        orders = Order.objects.all().order_by("pk").prefetch_related(
+            Prefetch(
+                "tickets__flight", queryset=Flight.objects.with_tickets_available()
+            )
+        )
         serializer = OrderListSerializer(orders, many=True)
         self.assertEqual(res.data["results"], serializer.data)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data["results"][-1]["tickets"][0]["flight"]["tickets_available"],
+            30 * 30 - 1,
+        )
+
+    def test_order_list_and_detail_queries_do_not_depend_on_tickets(self):
+        order = self.sample_order()
+        for number in range(20):
+            flight = Flight.objects.create(
+                route=Route.objects.create(
+                    source=Airport.objects.create(
+                        name=f"Source {number}", closest_big_city=self.city
+                    ),
+                    destination=self.airport,
+                    distance=1000,
+                ),
+                airplane=self.airplane,
+                departure_time=timezone.now() + timedelta(days=2 * number),
+                arrival_time=timezone.now() + timedelta(days=2 * number + 1),
+            )
+            for seat in range(1, 3):
+                Ticket.objects.create(row=1, seat=seat, flight=flight, order=order)
+
+        # Page count, orders, tickets, flights.
+        with self.assertNumQueries(4):
+            res = self.client.get(ORDER_URL)
+        self.assertEqual(len(res.data["results"][0]["tickets"]), 40)
+        self.assertEqual(
+            res.data["results"][0]["tickets"][0]["flight"]["tickets_available"],
+            30 * 30 - 2,
+        )
+
+        with self.assertNumQueries(3):
+            res = self.client.get(detail_url(order.id))
+        self.assertEqual(res.data, OrderRetrieveSerializer(order).data)
 
     def test_order_list_paginated(self):
         [self.sample_order() for _ in range(40)]
@@ -193,3 +233,17 @@ class AuthenticatedOrderApiTests(TestCase):
         res = self.client.delete(url)
 
         self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+
+    def test_shared_flight_rendered_once_per_serializer(self):
+        order = self.sample_order()
+        for seat in range(1, 4):
+            Ticket.objects.create(row=1, seat=seat, flight=self.flight, order=order)
+
+        data = OrderListSerializer(order).data
+
+        flights = [ticket["flight"] for ticket in data["tickets"]]
+        self.assertIs(flights[0], flights[1])
+        self.assertIs(flights[1], flights[2])
+        # Another serializer renders it again.
+        again = OrderListSerializer(order).data
+        self.assertIsNot(again["tickets"][0]["flight"], flights[0])
@@ -0,0 +1,110 @@
+import gzip
+import io
+import json
+import tempfile
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from air_service import reference_data
+from air_service.models import City, Country, ReferenceChange
+
+REFERENCE_URL = reverse("air-service:reference-data")
+
+
+class ReferenceDataTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(
+            get_user_model().objects.create_user(
+                email="test@test.com", password="testpass"
+            )
+        )
+        self.country = Country.objects.create(name="Ukraine")
+        self.city = City.objects.create(name="Kyiv", country=self.country)
+
+    def get(self, **params):
+        res = self.client.get(REFERENCE_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return json.loads(res.content)
+
+    def test_full_bundle(self):
+        body = self.get()
+
+        self.assertTrue(body["full"])
+        self.assertEqual(body["version"], reference_data.current_version())
+        self.assertEqual(
+            body["tables"]["cities"],
+            {
+                "fields": ["id", "name", "country_id"],
+                "rows": [[self.city.pk, "Kyiv", self.country.pk]],
+            },
+        )
+        self.assertEqual(body["tables"]["routes"]["rows"], [])
+
+    def test_gzip(self):
+        res = self.client.get(REFERENCE_URL, HTTP_ACCEPT_ENCODING="gzip, br")
+
+        self.assertEqual(res["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", res["Vary"])
+        self.assertTrue(json.loads(gzip.decompress(res.content))["full"])
+
+    def test_delta(self):
+        version = self.get()["version"]
+        poland = Country.objects.create(name="Poland")
+        city_id = self.city.pk
+        self.city.delete()
+
+        body = self.get(since_version=version)
+
+        self.assertFalse(body["full"])
+        self.assertEqual(
+            body["tables"]["countries"]["rows"], [[poland.pk, "Poland"]]
+        )
+        self.assertEqual(body["tables"]["countries"]["deleted"], [])
+        self.assertEqual(body["tables"]["cities"]["deleted"], [city_id])
+        self.assertNotIn("airports", body["tables"])
+
+    def test_bulk_import_replaces_table(self):
+        version = self.get()["version"]
+        with tempfile.NamedTemporaryFile("w", suffix=".json") as fixture:
+            json.dump(
+                [{"model": "air_service.country", "pk": 99, "fields": {"name": "Spain"}}],
+                fixture,
+            )
+            fixture.flush()
+            call_command("import_reference_data", fixture.name, stdout=io.StringIO())
+
+        body = self.get(since_version=version)
+
+        self.assertTrue(body["tables"]["countries"]["replace"])
+        self.assertEqual(len(body["tables"]["countries"]["rows"]), 2)
+
+    def test_pruned_version_gets_full_bundle(self):
+        version = self.get()["version"]
+        Country.objects.create(name="Poland")
+        Country.objects.create(name="Spain")
+        ReferenceChange.objects.update(created_at=timezone.now() - timedelta(days=60))
+
+        reference_data.prune()
+
+        self.assertEqual(ReferenceChange.objects.count(), 1)
+        self.assertTrue(self.get(since_version=version)["full"])
+
+    def test_not_modified(self):
+        etag = self.client.get(REFERENCE_URL)["ETag"]
+
+        res = self.client.get(REFERENCE_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_invalid_since_version(self):
+        res = self.client.get(REFERENCE_URL, {"since_version": "abc"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,101 @@
+import gzip
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from air_service import response_cache
+from air_service.models import Airplane, AirplaneType, Country, Order
+
+COUNTRY_URL = reverse("air-service:country-list")
+ORDER_URL = reverse("air-service:order-list")
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+)
+class ResponseCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.user = get_user_model().objects.create_user(
+            email="test@test.com", password="testpass"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        airplane_type = AirplaneType.objects.create(name="Jet")
+        for number in range(20):
+            Airplane.objects.create(
+                name=f"Airplane {number}",
+                airplane_type=airplane_type,
+                rows=10,
+                seats_in_row=6,
+            )
+
+    def test_hit_is_served_compressed(self):
+        url = reverse("air-service:airplane-list")
+        first = self.client.get(url, HTTP_ACCEPT_ENCODING="gzip, deflate")
+
+        with self.assertNumQueries(0):
+            res = self.client.get(url, HTTP_ACCEPT_ENCODING="gzip, deflate")
+
+        self.assertEqual(res["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", res["Vary"])
+        self.assertEqual(res["Content-Type"], "application/json")
+        self.assertEqual(res.content, first.content)
+        self.assertEqual(int(res["Content-Length"]), len(res.content))
+        self.assertEqual(
+            len(json.loads(gzip.decompress(res.content))["results"]), 20
+        )
+
+    def test_table_change_bypasses_stored_body(self):
+        first = self.client.get(COUNTRY_URL)
+        with self.captureOnCommitCallbacks(execute=True):
+            Country.objects.create(name="Ukraine")
+
+        res = self.client.get(COUNTRY_URL)
+
+        self.assertNotEqual(res["ETag"], first["ETag"])
+        self.assertEqual(json.loads(res.content)["count"], 1)
+
+    def test_identity_client(self):
+        url = reverse("air-service:airplane-list")
+        self.client.get(url, HTTP_ACCEPT_ENCODING="gzip")
+
+        res = self.client.get(url, HTTP_ACCEPT_ENCODING="gzip;q=0, identity")
+
+        self.assertNotIn("Content-Encoding", res)
+        self.assertEqual(len(json.loads(res.content)["results"]), 20)
+
+    def test_small_bodies_are_not_compressed(self):
+        self.client.get(COUNTRY_URL)
+
+        res = self.client.get(COUNTRY_URL, HTTP_ACCEPT_ENCODING="gzip")
+
+        self.assertNotIn("Content-Encoding", res)
+        self.assertEqual(json.loads(res.content)["results"], [])
+        self.assertIn("ETag", res)
+
+    def test_user_scoped_lists_are_cached_per_user(self):
+        Order.objects.create(user=self.user)
+        self.client.get(ORDER_URL)
+        other = APIClient()
+        other.force_authenticate(
+            get_user_model().objects.create_user(
+                email="other@test.com", password="testpass"
+            )
+        )
+
+        res = other.get(ORDER_URL)
+
+        self.assertEqual(json.loads(res.content)["count"], 0)
+        self.assertIn("Authorization", res["Vary"])
+
+    def test_accepted_encodings(self):
+        self.assertEqual(
+            response_cache.accepted_encodings("gzip;q=0, br ,identity;q=0.5"),
+            {"br", "identity"},
+        )
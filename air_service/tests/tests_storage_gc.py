@@ -0,0 +1,115 @@
+import io
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from air_service import storage_gc
+from air_service.models import Airplane, AirplaneType, OrphanedFile
+from air_service.tests.tests_airplane_images import sample_jpeg
+
+
+class StorageGarbageCollectorTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media_settings = override_settings(MEDIA_ROOT=media_root)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+        self.airplane_type = AirplaneType.objects.create(name="Jet")
+
+    def airplane_with_image(self, name="Boeing") -> Airplane:
+        airplane = Airplane.objects.create(
+            name=name, airplane_type=self.airplane_type, rows=1, seats_in_row=1
+        )
+        airplane.image = default_storage.save(
+            f"upload/airplanes/{name}.jpg", ContentFile(b"image")
+        )
+        airplane.image_variants = {
+            "thumbnail": default_storage.save(
+                f"upload/airplanes/variants/{name}-thumbnail.jpg",
+                ContentFile(b"thumbnail"),
+            )
+        }
+        airplane.save()
+        return airplane
+
+    def test_delete_records_instead_of_removing(self):
+        airplane = self.airplane_with_image()
+        paths = airplane.media_paths
+
+        self.airplane_type.delete()
+
+        self.assertEqual(
+            set(OrphanedFile.objects.values_list("path", flat=True)), set(paths)
+        )
+        self.assertTrue(all(default_storage.exists(path) for path in paths))
+
+        self.assertEqual(storage_gc.collect(batch_size=1), 2)
+        self.assertFalse(any(default_storage.exists(path) for path in paths))
+        self.assertFalse(OrphanedFile.objects.exists())
+
+    def test_referenced_files_are_kept(self):
+        airplane = self.airplane_with_image()
+        storage_gc.record_orphans(airplane.media_paths)
+
+        self.assertEqual(storage_gc.collect(), 0)
+        self.assertTrue(default_storage.exists(airplane.image.name))
+
+    def test_replaced_upload_is_recorded(self):
+        airplane = self.airplane_with_image()
+        old_paths = airplane.media_paths
+        client = APIClient()
+        client.force_authenticate(
+            get_user_model().objects.create_user(
+                email="admin@admin.test", password="testpassword", is_staff=True
+            )
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            client.post(
+                reverse("air-service:airplane-upload-image", args=[airplane.pk]),
+                {"image": ContentFile(sample_jpeg((20, 20)), name="new.jpg")},
+                format="multipart",
+            )
+
+        self.assertEqual(storage_gc.collect(), 2)
+        self.assertFalse(any(default_storage.exists(path) for path in old_paths))
+        airplane.refresh_from_db()
+        self.assertTrue(
+            all(default_storage.exists(path) for path in airplane.media_paths)
+        )
+
+    def test_sweep_finds_untracked_files(self):
+        airplane = self.airplane_with_image()
+        stray = default_storage.save("upload/airplanes/stray.jpg", ContentFile(b"x"))
+
+        orphans = storage_gc.sweep(grace=timedelta(0))
+
+        self.assertEqual(orphans, [stray])
+        storage_gc.collect()
+        self.assertFalse(default_storage.exists(stray))
+        self.assertTrue(default_storage.exists(airplane.image.name))
+
+    def test_sweep_skips_recent_files(self):
+        default_storage.save("upload/airplanes/uploading.jpg", ContentFile(b"x"))
+
+        self.assertEqual(storage_gc.sweep(grace=timedelta(hours=1)), [])
+
+    def test_command(self):
+        stray = default_storage.save("upload/airplanes/stray.jpg", ContentFile(b"x"))
+        os.utime(default_storage.path(stray), (0, 0))
+        out = io.StringIO()
+
+        call_command("collect_media", sweep=True, stdout=out)
+
+        self.assertIn("Deleted 1 files.", out.getvalue())
+        self.assertFalse(default_storage.exists(stray))
@@ -0,0 +1,164 @@
+import io
+import json
+import tempfile
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from air_service import reference_data, table_versions
+from air_service.models import Airport, City, Country, Route, TableVersion
+
+COUNTRY_URL = reverse("air-service:country-list")
+CITY_URL = reverse("air-service:city-list")
+
+
+class TableVersionTests(TestCase):
+    def version(self, model):
+        return table_versions.get_versions().get(table_versions.table_name(model))
+
+    def test_save_and_delete_bump_the_table(self):
+        country = Country.objects.create(name="Ukraine")
+        first = self.version(Country)[0]
+
+        country.delete()
+
+        self.assertEqual(self.version(Country)[0], first + 1)
+        self.assertIsNone(self.version(City))
+
+    def test_import_bumps_imported_tables(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".json") as fixture:
+            json.dump(
+                [{"model": "air_service.country", "pk": 1, "fields": {"name": "Spain"}}],
+                fixture,
+            )
+            fixture.flush()
+            call_command("import_reference_data", fixture.name, stdout=io.StringIO())
+
+        self.assertEqual(
+            list(
+                TableVersion.objects.exclude(table=reference_data.LOCK_ROW)
+                .values_list("table", "version")
+            ),
+            [("air_service_country", 1)],
+        )
+
+
+    @override_settings(
+        CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+    )
+    def test_read_racing_a_bump_is_not_served(self):
+        cache.clear()
+        load_versions = table_versions.load_versions
+
+        def load_then_bump():
+            # Loaded before the bump commits, stored after it.
+            versions = load_versions()
+            with self.captureOnCommitCallbacks(execute=True):
+                Country.objects.create(name="Ukraine")
+            return versions
+
+        with mock.patch.object(table_versions, "load_versions", load_then_bump):
+            self.assertIsNone(self.version(Country))
+
+        self.assertEqual(self.version(Country)[0], 1)
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(
+            get_user_model().objects.create_user(
+                email="test@test.com", password="testpass"
+            )
+        )
+        self.country = Country.objects.create(name="Ukraine")
+        City.objects.create(name="Kyiv", country=self.country)
+
+    def test_validators_and_cache_headers(self):
+        res = self.client.get(COUNTRY_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res["ETag"].startswith('"'))
+        self.assertIn("Last-Modified", res)
+        self.assertIn("private", res["Cache-Control"])
+        self.assertNotIn("public", res["Cache-Control"])
+        self.assertIn("max-age=60", res["Cache-Control"])
+        self.assertIn("Accept", res["Vary"])
+        self.assertIn("Authorization", res["Vary"])
+
+    def test_not_modified_without_queries(self):
+        etag = self.client.get(COUNTRY_URL)["ETag"]
+
+        # Only the version lookup, the cache is a DummyCache in tests.
+        with self.assertNumQueries(1):
+            res = self.client.get(COUNTRY_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res["ETag"], etag)
+        self.assertFalse(res.content)
+
+    def test_if_modified_since(self):
+        last_modified = self.client.get(COUNTRY_URL)["Last-Modified"]
+
+        res = self.client.get(COUNTRY_URL, HTTP_IF_MODIFIED_SINCE=last_modified)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_related_table_change_invalidates(self):
+        etag = self.client.get(CITY_URL)["ETag"]
+
+        self.country.name = "Ukraine renamed"
+        self.country.save()
+
+        res = self.client.get(CITY_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res["ETag"], etag)
+
+    def test_route_country_change_invalidates(self):
+        airport = Airport.objects.create(
+            name="Boryspil", closest_big_city=City.objects.get(name="Kyiv")
+        )
+        route = Route.objects.create(
+            source=airport, destination=airport, distance=10
+        )
+        # The detail shows the airports with their city and country.
+        url = reverse("air-service:route-detail", args=[route.pk])
+        etag = self.client.get(url)["ETag"]
+
+        self.country.name = "Ukraine renamed"
+        self.country.save()
+
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn("Ukraine Renamed", json.dumps(res.data))
+
+    def test_detail(self):
+        url = reverse("air-service:country-detail", args=[self.country.pk])
+        etag = self.client.get(url)["ETag"]
+
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_representations_have_different_etags(self):
+        json_etag = self.client.get(COUNTRY_URL)["ETag"]
+        api_etag = self.client.get(COUNTRY_URL, HTTP_ACCEPT="text/html")["ETag"]
+
+        self.assertNotEqual(json_etag, api_etag)
+
+    def test_writes_have_no_validators(self):
+        staff = get_user_model().objects.create_user(
+            email="admin@test.com", password="testpass", is_staff=True
+        )
+        self.client.force_authenticate(staff)
+
+        res = self.client.post(COUNTRY_URL, {"name": "Poland"})
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertNotIn("ETag", res)
@@ -0,0 +1,138 @@
+import multiprocessing
+import os
+import tempfile
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+from rest_framework.throttling import SimpleRateThrottle
+from rest_framework_simplejwt.tokens import AccessToken
+
+from air_service.throttling import SharedMemoryTokenBucket, shared_buckets
+
+FLIGHT_URL = reverse("air-service:flight-list")
+ASYNC_FLIGHT_URL = reverse("air-service:async-flight-list")
+ORDER_URL = reverse("air-service:order-list")
+COUNTRY_URL = reverse("air-service:country-list")
+
+RATES = {
+    "anon": "100/day",
+    "user": "1000/day",
+    "order_create": "2/min",
+    "flight_search": "2/min",
+}
+
+
+def consume_in_child(buckets):
+    buckets.consume("shared", capacity=3, rate=0.001)
+
+
+class SharedMemoryTokenBucketTests(SimpleTestCase):
+    def test_bucket_empties_and_refills(self):
+        buckets = SharedMemoryTokenBucket(slots=16)
+
+        results = [buckets.consume("key", 3, 1.0, now=100.0) for _ in range(4)]
+
+        self.assertEqual([allowed for allowed, _ in results], [True, True, True, False])
+        self.assertAlmostEqual(results[-1][1], 1.0)
+        self.assertTrue(buckets.consume("key", 3, 1.0, now=101.0)[0])
+        self.assertFalse(buckets.consume("key", 3, 1.0, now=101.0)[0])
+
+    def test_keys_are_independent(self):
+        buckets = SharedMemoryTokenBucket(slots=1024)
+        buckets.consume("first", 1, 1.0, now=0.0)
+
+        self.assertFalse(buckets.consume("first", 1, 1.0, now=0.0)[0])
+        self.assertTrue(buckets.consume("second", 1, 1.0, now=0.0)[0])
+
+    def test_state_is_shared_with_forked_workers(self):
+        buckets = SharedMemoryTokenBucket(slots=16)
+        process = multiprocessing.get_context("fork").Process(
+            target=consume_in_child, args=(buckets,)
+        )
+        process.start()
+        process.join()
+
+        buckets.consume("shared", 3, 0.001)
+        buckets.consume("shared", 3, 0.001)
+        self.assertFalse(buckets.consume("shared", 3, 0.001)[0])
+
+    def test_file_is_shared_without_forking(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, "buckets")
+        # Separately opened, like the table of an unrelated worker.
+        first = SharedMemoryTokenBucket(slots=16, path=path)
+        second = SharedMemoryTokenBucket(slots=16, path=path)
+
+        first.consume("shared", 2, 0.001)
+        second.consume("shared", 2, 0.001)
+        self.assertFalse(first.consume("shared", 2, 0.001)[0])
+
+    def test_file_backed_state_is_shared_with_forked_workers(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        buckets = SharedMemoryTokenBucket(
+            slots=16, path=os.path.join(directory.name, "buckets")
+        )
+        buckets.consume("other", 3, 0.001)
+        process = multiprocessing.get_context("fork").Process(
+            target=consume_in_child, args=(buckets,)
+        )
+        process.start()
+        process.join()
+
+        buckets.consume("shared", 3, 0.001)
+        buckets.consume("shared", 3, 0.001)
+        self.assertFalse(buckets.consume("shared", 3, 0.001)[0])
+
+
+@mock.patch.object(SimpleRateThrottle, "THROTTLE_RATES", RATES)
+class ScopedThrottleTests(TestCase):
+    def setUp(self):
+        shared_buckets.reset()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.test", password="testpassword"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_flight_search_is_limited(self):
+        statuses = [self.client.get(FLIGHT_URL).status_code for _ in range(3)]
+
+        self.assertEqual(statuses, [200, 200, 429])
+        self.assertEqual(self.client.get(COUNTRY_URL).status_code, 200)
+
+    def test_async_flight_search_is_limited(self):
+        self.client.force_authenticate(None)
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.user)}"
+        )
+        responses = [self.client.get(ASYNC_FLIGHT_URL) for _ in range(3)]
+
+        self.assertEqual([res.status_code for res in responses], [200, 200, 429])
+        self.assertIn("Retry-After", responses[-1])
+
+    def test_order_create_is_limited(self):
+        statuses = [self.client.post(ORDER_URL, {}).status_code for _ in range(3)]
+
+        self.assertEqual(statuses, [400, 400, 429])
+        self.assertEqual(self.client.get(ORDER_URL).status_code, 200)
+
+    def test_limits_are_per_user(self):
+        for _ in range(2):
+            self.client.get(FLIGHT_URL)
+        other = get_user_model().objects.create_user(
+            email="other@test.test", password="testpassword"
+        )
+        self.client.force_authenticate(other)
+
+        self.assertEqual(self.client.get(FLIGHT_URL).status_code, 200)
+
+    @override_settings(THROTTLE_ENABLED=False)
+    def test_throttling_can_be_disabled(self):
+        statuses = {self.client.get(FLIGHT_URL).status_code for _ in range(3)}
+        self.assertEqual(statuses, {200})
@@ -0,0 +1,121 @@
+import os
+import tempfile
+import time
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, modify_settings, override_settings
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from air_service.traffic import (
+    TrafficRecorder,
+    endpoint_name,
+    load_traffic,
+    schedule,
+)
+
+COUNTRY_URL = reverse("air-service:country-list")
+
+
+class TrafficRecorderTests(SimpleTestCase):
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix=".jsonl")
+        os.close(handle)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_records_are_written_in_background(self):
+        recorder = TrafficRecorder(self.path, flush_interval=0.01)
+        for index in range(3):
+            recorder.record({"ts": index, "method": "GET", "path": f"/{index}/"})
+        recorder.flush()
+
+        self.assertEqual(
+            [entry["path"] for entry in load_traffic(self.path)],
+            ["/0/", "/1/", "/2/"]
+        )
+
+    def test_full_queue_drops_instead_of_blocking(self):
+        recorder = TrafficRecorder(self.path, queue_size=1)
+        recorder._ensure_writer = lambda: None
+
+        recorder.record({"ts": 1, "method": "GET", "path": "/"})
+        recorder.record({"ts": 2, "method": "GET", "path": "/"})
+
+        self.assertEqual(recorder.dropped, 1)
+
+    def test_sample_rate(self):
+        self.assertFalse(TrafficRecorder(self.path, sample_rate=0).should_sample())
+        self.assertTrue(TrafficRecorder(self.path, sample_rate=1).should_sample())
+
+
+class ReplayPlanningTests(SimpleTestCase):
+    entries = [
+        {"ts": 100.0, "method": "GET", "path": "/a/"},
+        {"ts": 101.0, "method": "GET", "path": "/b/"},
+        {"ts": 104.0, "method": "GET", "path": "/c/"},
+    ]
+
+    def test_original_pace(self):
+        self.assertEqual(
+            [offset for offset, _ in schedule(self.entries, 1)],
+            [0.0, 1.0, 4.0]
+        )
+
+    def test_accelerated_pace(self):
+        self.assertEqual(
+            [offset for offset, _ in schedule(self.entries, 4)],
+            [0.0, 0.25, 1.0]
+        )
+
+    def test_as_fast_as_possible(self):
+        self.assertEqual(
+            [offset for offset, _ in schedule(self.entries, 0)],
+            [0.0, 0.0, 0.0]
+        )
+
+    def test_endpoint_name_groups_ids(self):
+        self.assertEqual(
+            endpoint_name("GET", "/api/v1/air_services/flights/17/"),
+            "GET /api/v1/air_services/flights/{id}/"
+        )
+
+
+class TrafficRecorderMiddlewareTests(TestCase):
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix=".jsonl")
+        os.close(handle)
+        self.user = get_user_model().objects.create_user(
+            email="test@test.test", password="testpassword"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_api_request_is_recorded(self):
+        with override_settings(
+            TRAFFIC_RECORDING_PATH=self.path,
+            TRAFFIC_RECORDING_SAMPLE_RATE=1.0,
+        ), modify_settings(
+            MIDDLEWARE={"append": "air_service.middleware.TrafficRecorderMiddleware"}
+        ):
+            self.client.get(COUNTRY_URL, {"country_name": "a"})
+            self.client.get("/admin/login/")
+
+        entries = self.wait_for_entries()
+
+        self.assertEqual(len(entries), 1)
+        self.assertEqual(entries[0]["method"], "GET")
+        self.assertEqual(entries[0]["path"], COUNTRY_URL)
+        self.assertEqual(entries[0]["query"], "country_name=a")
+        self.assertEqual(entries[0]["user"], self.user.id)
+        self.assertEqual(entries[0]["status"], 200)
+
+    def wait_for_entries(self):
+        deadline = time.monotonic() + 5
+        while not os.path.getsize(self.path) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return load_traffic(self.path)
@@ -0,0 +1,214 @@
+"""
+Token-bucket throttles with O(1) state per client.
+
+A rate of ``N/period`` is a bucket of ``N`` tokens refilled at
+``N / period`` tokens per second; each request takes one token. With Redis
+the bucket is updated by one atomic Lua script, otherwise it lives in shared
+memory: the file ``THROTTLE_SHARED_PATH`` that every worker of the deployment
+maps, or if unset an anonymous mapping of the process and its forks.
+"""
+import fcntl
+import hashlib
+import logging
+import mmap
+import multiprocessing
+import os
+import struct
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+
+from django.conf import settings
+from rest_framework.throttling import (
+    AnonRateThrottle,
+    SimpleRateThrottle,
+    UserRateThrottle,
+)
+
+logger = logging.getLogger(__name__)
+
+TOKEN_BUCKET_LUA = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local clock = redis.call("TIME")
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local bucket = redis.call("HMGET", KEYS[1], "tokens", "ts")
+local tokens = tonumber(bucket[1])
+local updated = tonumber(bucket[2])
+if tokens == nil then
+    tokens = capacity
+    updated = now
+end
+tokens = math.min(capacity, tokens + (now - updated) * rate)
+local allowed = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+end
+redis.call("HSET", KEYS[1], "tokens", tostring(tokens), "ts", tostring(now))
+redis.call("PEXPIRE", KEYS[1], math.ceil((capacity - tokens) / rate * 1000) + 1000)
+return {allowed, tostring((1 - tokens) / rate)}
+"""
+
+
+class RedisTokenBucket:
+    def __init__(self, client):
+        self.script = client.register_script(TOKEN_BUCKET_LUA)
+
+    def consume(self, key: str, capacity: int, rate: float) -> tuple[bool, float]:
+        allowed, wait = self.script(keys=[key], args=[capacity, rate])
+        return bool(allowed), max(float(wait), 0.0)
+
+
+class SharedMemoryTokenBucket:
+    """
+    Fixed-size hash table of buckets in a shared mmap.
+
+    Each slot holds a key fingerprint, the token count and the last refill
+    time. Colliding keys evict each other, which only ever resets a bucket
+    to full, so the limiter errs on the side of allowing requests.
+
+    With a ``path`` the table is a file mapped by each process on first use
+    and guarded by ``flock``, so unrelated processes share it. Without one it
+    is anonymous memory, shared only with processes forked after creation.
+    """
+
+    slot = struct.Struct("Qdd")
+
+    def __init__(self, slots: int, path: str | None = None):
+        self.slots = slots
+        self.path = path
+        if path:
+            self._pid = None
+            self._thread_lock = threading.Lock()
+        else:
+            self._memory = mmap.mmap(-1, slots * self.slot.size)
+            self._lock = multiprocessing.Lock()
+
+    def _open(self):
+        size = self.slots * self.slot.size
+        # flock only excludes other open files, so forked workers must not
+        # keep the descriptor of their parent.
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        if os.fstat(fd).st_size < size:
+            os.ftruncate(fd, size)
+        self._fd, self._memory, self._pid = fd, mmap.mmap(fd, size), os.getpid()
+
+    @contextmanager
+    def _locked(self):
+        if not self.path:
+            with self._lock:
+                yield
+            return
+        with self._thread_lock:
+            if self._pid != os.getpid():
+                self._open()
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def consume(
+        self, key: str, capacity: int, rate: float, now: float | None = None
+    ) -> tuple[bool, float]:
+        fingerprint = int.from_bytes(
+            hashlib.blake2b(key.encode(), digest_size=8).digest(), "little"
+        )
+        offset = fingerprint % self.slots * self.slot.size
+        now = time.time() if now is None else now
+        with self._locked():
+            stored, tokens, updated = self.slot.unpack_from(self._memory, offset)
+            if stored != fingerprint:
+                tokens, updated = capacity, now
+            tokens = min(capacity, tokens + max(now - updated, 0) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self.slot.pack_into(self._memory, offset, fingerprint, tokens, now)
+        return allowed, 0.0 if allowed else (1 - tokens) / rate
+
+    def reset(self):
+        with self._locked():
+            self._memory[:] = bytes(len(self._memory))
+
+
+shared_buckets = SharedMemoryTokenBucket(
+    settings.THROTTLE_SHARED_SLOTS, settings.THROTTLE_SHARED_PATH or None
+)
+
+
+@lru_cache(maxsize=None)
+def get_bucket_backend():
+    if settings.USE_REDIS:
+        from django_redis import get_redis_connection
+
+        return RedisTokenBucket(get_redis_connection("default"))
+    return shared_buckets
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    """``SimpleRateThrottle`` with the timestamp history replaced by a token bucket."""
+
+    cache_format = "throttle:%(scope)s:%(ident)s"
+
+    def allow_request(self, request, view):
+        if self.rate is None or not settings.THROTTLE_ENABLED:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        try:
+            allowed, self._wait = get_bucket_backend().consume(
+                self.key, self.num_requests, self.num_requests / self.duration
+            )
+        except Exception:
+            # A limiter outage must not take the API down with it.
+            logger.exception("Throttle backend failed, allowing request")
+            return True
+        return allowed
+
+    def wait(self):
+        return self._wait
+
+
+class AnonTokenBucketThrottle(TokenBucketThrottle, AnonRateThrottle):
+    pass
+
+
+class UserTokenBucketThrottle(TokenBucketThrottle, UserRateThrottle):
+    pass
+
+
+class ScopedTokenBucketThrottle(TokenBucketThrottle):
+    """
+    Per-action limits for expensive endpoints.
+
+    Views map actions to rate scopes, e.g.
+    ``throttle_scopes = {"create": "order_create"}``; function views may set
+    a single ``throttle_scope``. Other requests are not limited.
+    """
+
+    def __init__(self):
+        # The rate depends on the view, see allow_request().
+        pass
+
+    def allow_request(self, request, view):
+        self.scope = getattr(view, "throttle_scopes", {}).get(
+            getattr(view, "action", None)
+        ) or getattr(view, "throttle_scope", None)
+        if not self.scope:
+            return True
+        self.rate = self.get_rate()
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+        return super().allow_request(request, view)
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            ident = request.user.pk
+        else:
+            ident = self.get_ident(request)
+        return self.cache_format % {"scope": self.scope, "ident": ident}
@@ -0,0 +1,137 @@
+import json
+import logging
+import os
+import queue
+import random
+import re
+import threading
+import time
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+ID_SEGMENT = re.compile(r"/\d+(?=/|$)")
+
+
+def endpoint_name(method: str, path: str) -> str:
+    """``GET /flights/17/`` -> ``GET /flights/{id}/`` for grouping."""
+    return f"{method} {ID_SEGMENT.sub('/{id}', path)}"
+
+
+class TrafficRecorder:
+    """
+    Append sampled request records to a JSONL file.
+
+    ``record`` never blocks the request: entries go to a bounded queue that a
+    daemon thread drains in batches. When the queue is full the entry is
+    dropped and counted in ``dropped``.
+    """
+
+    def __init__(
+        self,
+        path,
+        sample_rate: float = 1.0,
+        queue_size: int = 10000,
+        batch_size: int = 500,
+        flush_interval: float = 1.0,
+    ):
+        self.path = Path(path)
+        self.sample_rate = sample_rate
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def should_sample(self) -> bool:
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
+
+    def record(self, entry: dict):
+        self._ensure_writer()
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self, timeout: float = 5.0):
+        """Block until everything queued so far is written."""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def _ensure_writer(self):
+        # Writer threads do not survive fork, so pre-forking servers get one
+        # per worker process.
+        if self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid != os.getpid() or not self._thread.is_alive():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(
+                    target=self._run, name="traffic-recorder", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            try:
+                while len(batch) < self.batch_size:
+                    batch.append(self._queue.get(timeout=self.flush_interval))
+            except queue.Empty:
+                pass
+            self._write(batch)
+            for _ in batch:
+                self._queue.task_done()
+
+    def _write(self, batch: list[dict]):
+        data = "".join(
+            json.dumps(entry, separators=(",", ":")) + "\n" for entry in batch
+        ).encode()
+        try:
+            # One O_APPEND write per batch keeps lines from several worker
+            # processes from interleaving.
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, data)
+            finally:
+                os.close(fd)
+        except OSError:
+            logger.exception("Could not write traffic records to %s", self.path)
+
+
+def load_traffic(path, limit: int | None = None) -> list[dict]:
+    entries = []
+    with open(path) as traffic:
+        for line in traffic:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if "method" in entry and "path" in entry and "ts" in entry:
+                entries.append(entry)
+            if limit and len(entries) >= limit:
+                break
+    entries.sort(key=lambda entry: entry["ts"])
+    return entries
+
+
+def schedule(entries: list[dict], speed: float) -> list[tuple[float, dict]]:
+    """
+    Pair every entry with its offset in seconds from the replay start.
+
+    ``speed`` 1 keeps the recorded pace, 2 replays twice as fast and 0 sends
+    everything immediately.
+    """
+    if not entries:
+        return []
+    first = entries[0]["ts"]
+    return [
+        ((entry["ts"] - first) / speed if speed > 0 else 0.0, entry)
+        for entry in entries
+    ]
@@ -1,7 +1,13 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 
+from air_service import async_views
+
 from air_service.views import (
+    ReferenceDataView,
+    FlightOccupancyViewSet,
+    FlightScheduleViewSet,
+    RouteOccupancyViewSet,
     CountryViewSet,
     CityViewSet,
     CrewViewSet,
@@ -25,9 +31,27 @@ router.register("airports", AirportViewSet)
 router.register("airplanes", AirplaneViewSet)
 router.register("routes", RouteViewSet)
 router.register("flights", FlightViewSet)
+router.register("flight_schedules", FlightScheduleViewSet)
 router.register("tickets", TicketViewSet)
 router.register("orders", OrderViewSet)
+router.register(
+    "analytics/flights", FlightOccupancyViewSet, basename="flight-occupancy"
+)
+router.register("analytics/routes", RouteOccupancyViewSet, basename="route-occupancy")
 
 urlpatterns = [
     path("", include(router.urls)),
+    path("async/flights/", async_views.flight_list, name="async-flight-list"),
+    path(
+        "async/flights/<int:pk>/",
+        async_views.flight_detail,
+        name="async-flight-detail",
+    ),
+    path("async/routes/", async_views.route_list, name="async-route-list"),
+    path(
+        "async/flights/availability/",
+        async_views.flight_availability,
+        name="async-flight-availability",
+    ),
+    path("reference/", ReferenceDataView.as_view(), name="reference-data"),
 ]
@@ -1,13 +1,21 @@
-from django.db.models import Count, F
+import gzip
+
+from django.db import transaction
+from django.db.models import Count, Prefetch, Sum
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
 from django.utils.decorators import method_decorator
-from django.views.decorators.cache import cache_page
 from django_filters.rest_framework import DjangoFilterBackend
 from drf_spectacular.utils import extend_schema, OpenApiParameter
-from rest_framework import viewsets, status
+from rest_framework import mixins, viewsets, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework.response import Response
+from rest_framework.views import APIView
 
+from air_service import reference_data
+from air_service.bulk import BulkWriteMixin
 from air_service.filters import (
     RouteFilter,
     FlightFilter,
@@ -17,6 +25,7 @@ from air_service.filters import (
     AirplaneTypeFilter,
     AirportFilter,
     AirplaneFilter,
+    OccupancyFilter,
 )
 from air_service.models import (
     Country,
@@ -29,8 +38,12 @@ from air_service.models import (
     Flight,
     Ticket,
     Order,
+    FlightOccupancy,
+    RouteDailyOccupancy,
+    FlightSchedule,
 )
 from air_service.ordering import AirServiceOrdering
+from air_service.response_cache import cache_response
 from air_service.serializers import (
     CountrySerializer,
     CitySerializer,
@@ -61,11 +74,18 @@ from air_service.serializers import (
     TicketRetrieveSerializer,
     OrderRetrieveSerializer,
     AirplaneImageSerializer,
+    FlightOccupancySerializer,
+    RouteDailyOccupancySerializer,
+    RouteOccupancySummarySerializer,
+    FlightScheduleSerializer,
 )
+from air_service.table_versions import ConditionalGetMixin
+from air_service.tasks import expand_flight_schedule
 
 
-class CountryViewSet(viewsets.ModelViewSet):
+class CountryViewSet(ConditionalGetMixin, BulkWriteMixin, viewsets.ModelViewSet):
     model = Country
+    version_models = (Country, City)
     queryset = Country.objects.all()
     ordering_fields = ("pk", "name")
     filter_backends = (DjangoFilterBackend,)
@@ -88,7 +108,7 @@ class CountryViewSet(viewsets.ModelViewSet):
 
         return queryset.order_by(*ordering_fields)
 
-    @method_decorator(cache_page(60 * 15))
+    @method_decorator(cache_response(60 * 15))
     @extend_schema(
         parameters=[
             OpenApiParameter(
@@ -103,8 +123,9 @@ class CountryViewSet(viewsets.ModelViewSet):
         return super().list(request, *args, **kwargs)
 
 
-class CityViewSet(viewsets.ModelViewSet):
+class CityViewSet(ConditionalGetMixin, BulkWriteMixin, viewsets.ModelViewSet):
     model = City
+    version_models = (City, Country, Airport)
     queryset = City.objects.select_related()
     ordering_fields = ("pk", "name")
     filter_backends = (DjangoFilterBackend,)
@@ -130,7 +151,7 @@ class CityViewSet(viewsets.ModelViewSet):
 
         return queryset.order_by(*ordering_fields)
 
-    @method_decorator(cache_page(60 * 15))
+    @method_decorator(cache_response(60 * 15))
     @extend_schema(
         parameters=[
             OpenApiParameter(
@@ -172,7 +193,7 @@ class CrewViewSet(viewsets.ModelViewSet):
 
         return queryset.order_by(*ordering_fields)
 
-    @method_decorator(cache_page(60 * 15))
+    @method_decorator(cache_response(60 * 15))
     @extend_schema(
         parameters=[
             OpenApiParameter(
@@ -187,8 +208,9 @@ class CrewViewSet(viewsets.ModelViewSet):
         return super().list(request, *args, **kwargs)
 
 
-class AirplaneTypeViewSet(viewsets.ModelViewSet):
+class AirplaneTypeViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     model = AirplaneType
+    version_models = (AirplaneType, Airplane)
     queryset = AirplaneType.objects.all()
     ordering_fields = ("pk", "name")
     filter_backends = (DjangoFilterBackend,)
@@ -213,7 +235,7 @@ class AirplaneTypeViewSet(viewsets.ModelViewSet):
 
         return queryset.order_by(*ordering_fields)
 
-    @method_decorator(cache_page(60 * 15))
+    @method_decorator(cache_response(60 * 15))
     @extend_schema(
         parameters=[
             OpenApiParameter(
@@ -228,8 +250,9 @@ class AirplaneTypeViewSet(viewsets.ModelViewSet):
         return super().list(request, *args, **kwargs)
 
 
-class AirportViewSet(viewsets.ModelViewSet):
+class AirportViewSet(ConditionalGetMixin, BulkWriteMixin, viewsets.ModelViewSet):
     model = Airport
+    version_models = (Airport, City, Country)
     queryset = Airport.objects.select_related()
     ordering_fields = ("pk", "name")
     filter_backends = (DjangoFilterBackend,)
@@ -255,7 +278,7 @@ class AirportViewSet(viewsets.ModelViewSet):
 
         return queryset.order_by(*ordering_fields)
 
-    @method_decorator(cache_page(60 * 15))
+    @method_decorator(cache_response(60 * 15))
     @extend_schema(
         parameters=[
             OpenApiParameter(
@@ -317,7 +340,7 @@ class AirplaneViewSet(viewsets.ModelViewSet):
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-    @method_decorator(cache_page(60 * 15))
+    @method_decorator(cache_response(60 * 15))
     @extend_schema(
         parameters=[
             OpenApiParameter(
@@ -332,8 +355,9 @@ class AirplaneViewSet(viewsets.ModelViewSet):
         return super().list(request, *args, **kwargs)
 
 
-class RouteViewSet(viewsets.ModelViewSet):
+class RouteViewSet(ConditionalGetMixin, BulkWriteMixin, viewsets.ModelViewSet):
     model = Route
+    version_models = (Route, Airport, City, Country)
     queryset = Route.objects.select_related()
     ordering_fields = ("pk", "distance")
     filter_backends = (DjangoFilterBackend,)
@@ -360,7 +384,7 @@ class RouteViewSet(viewsets.ModelViewSet):
 
         return queryset.order_by(*ordering_fields)
 
-    @method_decorator(cache_page(60 * 15))
+    @method_decorator(cache_response(60 * 15))
     @extend_schema(
         parameters=[
             OpenApiParameter(
@@ -375,12 +399,13 @@ class RouteViewSet(viewsets.ModelViewSet):
         return super().list(request, *args, **kwargs)
 
 
-class FlightViewSet(viewsets.ModelViewSet):
+class FlightViewSet(BulkWriteMixin, viewsets.ModelViewSet):
     model = Flight
     queryset = Flight.objects.select_related()
     ordering_fields = ("pk", "departure_time", "arrival_time")
     filter_backends = (DjangoFilterBackend,)
     filterset_class = FlightFilter
+    throttle_scopes = {"list": "flight_search"}
 
     def get_serializer_class(self):
         if self.action == "list":
@@ -394,12 +419,7 @@ class FlightViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         queryset = super().get_queryset()
         if self.action in ["list", "retrieve"]:
-            queryset = queryset.select_related().annotate(
-                tickets_available=
-                F("airplane__rows")
-                * F("airplane__seats_in_row")
-                - Count("tickets")
-            )
+            queryset = queryset.select_related().with_tickets_available()
 
         ordering_fields = AirServiceOrdering.get_ordering_fields(
             self.request, list(self.ordering_fields)
@@ -407,7 +427,7 @@ class FlightViewSet(viewsets.ModelViewSet):
 
         return queryset.order_by(*ordering_fields)
 
-    @method_decorator(cache_page(60 * 15))
+    @method_decorator(cache_response(60 * 15))
     @extend_schema(
         parameters=[
             OpenApiParameter(
@@ -422,6 +442,34 @@ class FlightViewSet(viewsets.ModelViewSet):
         return super().list(request, *args, **kwargs)
 
 
+class FlightScheduleViewSet(viewsets.ModelViewSet):
+    """
+    Recurring flights. Creating or changing a schedule queues the expansion
+    of its flights, see air_service.schedules.
+    """
+
+    queryset = FlightSchedule.objects.all()
+    serializer_class = FlightScheduleSerializer
+    permission_classes = [IsAdminUser]
+
+    def perform_create(self, serializer):
+        self.queue_expansion(serializer.save())
+
+    def perform_update(self, serializer):
+        self.queue_expansion(serializer.save())
+
+    @staticmethod
+    def queue_expansion(schedule):
+        transaction.on_commit(lambda: expand_flight_schedule.delay(schedule.pk))
+
+    @extend_schema(request=None, responses={202: None})
+    @action(detail=True, methods=["POST"])
+    def expand(self, request, pk=None):
+        """Expand the schedule again, e.g. after flights were deleted by hand."""
+        self.queue_expansion(self.get_object())
+        return Response(status=status.HTTP_202_ACCEPTED)
+
+
 class TicketViewSet(viewsets.ModelViewSet):
     model = Ticket
     serializer_class = TicketSerializer
@@ -451,7 +499,7 @@ class TicketViewSet(viewsets.ModelViewSet):
 
         return TicketSerializer
 
-    @method_decorator(cache_page(60 * 15))
+    @method_decorator(cache_response(60 * 15, per_user=True))
     @extend_schema(
         parameters=[
             OpenApiParameter(
@@ -474,12 +522,15 @@ class OrderViewSet(viewsets.ModelViewSet):
     permission_classes = [
         IsAuthenticated,
     ]
+    throttle_scopes = {"create": "order_create"}
 
     def get_queryset(self):
         queryset = self.queryset.filter(user=self.request.user)
-        if self.action == "list":
+        if self.action in ["list", "retrieve"]:
+            # Orders, their tickets and the tickets' flights with everything
+            # the nested serializers read: three queries for any order size.
             queryset = queryset.prefetch_related(
-                "tickets__flight__route__source", "tickets__flight__route__destination"
+                "tickets", Prefetch("tickets__flight", queryset=self.flights())
             )
 
         ordering_fields = AirServiceOrdering.get_ordering_fields(
@@ -488,6 +539,21 @@ class OrderViewSet(viewsets.ModelViewSet):
 
         return queryset.order_by(*ordering_fields)
 
+    def flights(self):
+        if self.action == "list":
+            # FlightListSerializer: route names, airplane name, availability.
+            return Flight.objects.select_related(
+                "airplane",
+                "route__source__closest_big_city",
+                "route__destination__closest_big_city",
+            ).with_tickets_available()
+        # FlightDetailSerializer: airports with their city and country.
+        return Flight.objects.select_related(
+            "airplane__airplane_type",
+            "route__source__closest_big_city__country",
+            "route__destination__closest_big_city__country",
+        )
+
     def get_serializer_class(self):
         if self.action == "list":
             return OrderListSerializer
@@ -500,7 +566,7 @@ class OrderViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
-    @method_decorator(cache_page(60 * 15))
+    @method_decorator(cache_response(60 * 15, per_user=True))
     @extend_schema(
         parameters=[
             OpenApiParameter(
@@ -513,3 +579,91 @@ class OrderViewSet(viewsets.ModelViewSet):
     )
     def list(self, request, *args, **kwargs):
         return super().list(request, *args, **kwargs)
+
+
+class FlightOccupancyViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
+    """Sold seats per flight, see air_service.occupancy."""
+
+    queryset = FlightOccupancy.objects.all()
+    serializer_class = FlightOccupancySerializer
+    permission_classes = [IsAdminUser]
+    filter_backends = (DjangoFilterBackend,)
+    filterset_class = OccupancyFilter
+
+
+class RouteOccupancyViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
+    """Sold seats per route and day, see air_service.occupancy."""
+
+    queryset = RouteDailyOccupancy.objects.all()
+    serializer_class = RouteDailyOccupancySerializer
+    permission_classes = [IsAdminUser]
+    filter_backends = (DjangoFilterBackend,)
+    filterset_class = OccupancyFilter
+
+    @extend_schema(responses=RouteOccupancySummarySerializer(many=True))
+    @action(detail=False, methods=["GET"])
+    def summary(self, request):
+        """Totals per route over the requested days."""
+        queryset = (
+            self.filter_queryset(self.get_queryset())
+            .order_by("route")
+            .values("route")
+            .annotate(flights=Sum("flights"), seats=Sum("seats"), sold=Sum("sold"))
+        )
+        page = self.paginate_queryset(queryset)
+        return self.get_paginated_response(
+            RouteOccupancySummarySerializer(page, many=True).data
+        )
+
+
+class ReferenceDataView(APIView):
+    """
+    Countries, cities, airports, airplane types and routes in one response.
+
+    Pass the ``version`` of the last response as ``?since_version=`` to get
+    only what changed since, see ``air_service.reference_data``.
+    """
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                name="since_version",
+                type=int,
+                description="Version the client already holds; returns a delta.",
+                required=False,
+            ),
+        ],
+        responses={200: dict},
+    )
+    def get(self, request):
+        since = request.query_params.get("since_version")
+        if since is not None:
+            if not since.isdigit():
+                raise ValidationError(
+                    {"since_version": "A non-negative integer is required."}
+                )
+            since = int(since)
+
+        version = reference_data.current_version()
+        etag = f'"reference-{version}-{since}"'
+        conditional = get_conditional_response(request, etag=etag)
+        if conditional is not None:
+            return conditional
+
+        body = gzipped = None
+        if since is not None:
+            body = reference_data.build_delta(since)
+        if body is None:
+            bundle = reference_data.get_bundle()
+            body, gzipped = bundle.body, bundle.gzipped
+
+        response = HttpResponse(content_type="application/json")
+        if "gzip" in request.headers.get("Accept-Encoding", ""):
+            response.content = gzipped or gzip.compress(body)
+            response["Content-Encoding"] = "gzip"
+        else:
+            response.content = body
+        response["ETag"] = etag
+        response["Content-Length"] = len(response.content)
+        patch_vary_headers(response, ["Accept-Encoding"])
+        return response
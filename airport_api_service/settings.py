@@ -14,8 +14,6 @@ import os
 from datetime import timedelta
 from pathlib import Path
 
-from sendgrid import SendGridAPIClient
-
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -62,6 +60,7 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "air_service.middleware.ReplicaRoutingMiddleware",
 ]
 
 MIDDLEWARE = (
@@ -70,6 +69,22 @@ MIDDLEWARE = (
         + ["django_prometheus.middleware.PrometheusAfterMiddleware"]
 )
 
+QUERY_COUNT_HEADER = os.getenv("QUERY_COUNT_HEADER", "false").lower() == "true"
+
+if QUERY_COUNT_HEADER:
+    MIDDLEWARE.insert(1, "air_service.middleware.QueryCountMiddleware")
+
+TRAFFIC_RECORDING = os.getenv("TRAFFIC_RECORDING", "false").lower() == "true"
+TRAFFIC_RECORDING_PATH = os.getenv(
+    "TRAFFIC_RECORDING_PATH", str(BASE_DIR / "requests.jsonl")
+)
+TRAFFIC_RECORDING_PREFIX = os.getenv("TRAFFIC_RECORDING_PREFIX", "/api/")
+TRAFFIC_RECORDING_SAMPLE_RATE = float(os.getenv("TRAFFIC_RECORDING_SAMPLE_RATE", "0.1"))
+TRAFFIC_RECORDING_QUEUE_SIZE = int(os.getenv("TRAFFIC_RECORDING_QUEUE_SIZE", "10000"))
+
+if TRAFFIC_RECORDING:
+    MIDDLEWARE.insert(1, "air_service.middleware.TrafficRecorderMiddleware")
+
 ROOT_URLCONF = "airport_api_service.urls"
 
 TEMPLATES = [
@@ -104,8 +119,43 @@ if DATABASE_ENGINE == "postgresql":
             "PASSWORD": os.environ.get("POSTGRES_PASSWORD"),
             "HOST": os.environ.get("POSTGRES_HOST"),
             "PORT": os.environ.get("POSTGRES_PORT", "5432"),
+            "CONN_HEALTH_CHECKS": True,
         }
     }
+    if os.getenv("DATABASE_POOL", "true").lower() == "true":
+        from psycopg_pool import ConnectionPool
+
+        # psycopg_pool keeps connections open across requests; Django
+        # requires CONN_MAX_AGE=0 with pooling. CONN_HEALTH_CHECKS does not
+        # apply to pooled connections, the pool checks them when lent.
+        DATABASES["default"]["OPTIONS"] = {
+            "pool": {
+                "check": ConnectionPool.check_connection,
+                "min_size": int(os.getenv("DATABASE_POOL_MIN_SIZE", "2")),
+                "max_size": int(os.getenv("DATABASE_POOL_MAX_SIZE", "10")),
+                "timeout": float(os.getenv("DATABASE_POOL_TIMEOUT", "10")),
+                "max_idle": float(os.getenv("DATABASE_POOL_MAX_IDLE", "600")),
+                "max_lifetime": float(os.getenv("DATABASE_POOL_MAX_LIFETIME", "3600")),
+            }
+        }
+    else:
+        DATABASES["default"]["CONN_MAX_AGE"] = int(os.getenv("CONN_MAX_AGE", "60"))
+    if os.getenv("DATABASE_PREPARED_STATEMENTS", "false").lower() == "true":
+        # Server-side binding lets psycopg prepare a query shape once it ran
+        # prepare_threshold times on a connection.
+        DATABASES["default"].setdefault("OPTIONS", {}).update(
+            server_side_binding=True,
+            prepare_threshold=int(os.getenv("DATABASE_PREPARE_THRESHOLD", "5")),
+        )
+    # Comma separated hosts of streaming replicas, exposed as replica_1, ...
+    for index, host in enumerate(
+        filter(None, os.environ.get("POSTGRES_REPLICA_HOSTS", "").split(",")), 1
+    ):
+        DATABASES[f"replica_{index}"] = {
+            **DATABASES["default"],
+            "HOST": host.strip(),
+            "TEST": {"MIRROR": "default"},
+        }
 else:
     DATABASES = {
         "default": {
@@ -114,6 +164,16 @@ else:
         }
     }
 
+# Prepared statements kept per connection (LRU), see DATABASE_PREPARED_STATEMENTS.
+DATABASE_PREPARED_MAX = int(os.getenv("DATABASE_PREPARED_MAX", "100"))
+
+DATABASE_ROUTERS = ["air_service.db_router.ReplicaRouter"]
+
+# Seconds a user's reads stay on the primary after a write.
+REPLICA_PIN_SECONDS = int(os.getenv("REPLICA_PIN_SECONDS", "5"))
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "2"))
+REPLICA_LAG_CHECK_INTERVAL = float(os.getenv("REPLICA_LAG_CHECK_INTERVAL", "5"))
+
 USE_REDIS = os.getenv("USE_REDIS", "false").lower() == "true"
 
 if USE_REDIS:
@@ -135,6 +195,20 @@ if USE_REDIS:
     DEFAULT_FROM_EMAIL = os.environ.get("DEFAULT_FROM_EMAIL")
     CELERY_TIMEZONE = "Europe/Kiev"
     CELERY_BEAT_SCHEDULER = "django_celery_beat.schedulers:DatabaseScheduler"
+    CELERY_BEAT_SCHEDULE = {
+        "collect-orphaned-files": {
+            "task": "air_service.tasks.collect_orphaned_files",
+            "schedule": 300,
+        },
+        "sweep-media": {
+            "task": "air_service.tasks.sweep_media",
+            "schedule": 24 * 60 * 60,
+        },
+        "compact-occupancy": {
+            "task": "air_service.tasks.compact_occupancy",
+            "schedule": 60,
+        },
+    }
 else:
     CACHES = {
         "default": {
@@ -142,6 +216,8 @@ else:
         }
     }
     CELERY_BROKER_URL = None
+    # No broker to queue to, e.g. image processing runs in the request.
+    CELERY_TASK_ALWAYS_EAGER = True
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -185,6 +261,42 @@ else:
 
 MEDIA_URL = "/media/"
 
+# Hand media transfers to the front proxy after authorization: "nginx"
+# (X-Accel-Redirect to MEDIA_ACCEL_PREFIX, an internal location aliased to
+# MEDIA_ROOT) or "sendfile" (X-Sendfile). Empty: Django sends the files.
+MEDIA_ACCEL = os.getenv("MEDIA_ACCEL", "")
+MEDIA_ACCEL_PREFIX = os.getenv("MEDIA_ACCEL_PREFIX", "/protected-media/")
+
+# See air_service.table_versions. Catalogue responses may be cached by any
+# cache for CATALOGUE_CACHE_MAX_AGE seconds, then revalidated with ETags.
+TABLE_VERSIONS_CACHE_TTL = int(os.getenv("TABLE_VERSIONS_CACHE_TTL", "300"))
+CATALOGUE_CACHE_MAX_AGE = int(os.getenv("CATALOGUE_CACHE_MAX_AGE", "60"))
+
+# See air_service.storage_gc.
+STORAGE_GC_BATCH_SIZE = int(os.getenv("STORAGE_GC_BATCH_SIZE", "500"))
+STORAGE_GC_SWEEP_GRACE = int(os.getenv("STORAGE_GC_SWEEP_GRACE", "3600"))
+
+# See air_service.reference_data. Clients older than this many days of
+# changes get the full bundle instead of a delta.
+REFERENCE_CHANGES_RETENTION = int(os.getenv("REFERENCE_CHANGES_RETENTION", "30"))
+
+# See air_service.availability (server-sent events, ASGI only).
+AVAILABILITY_STREAM_MAX_FLIGHTS = int(os.getenv("AVAILABILITY_STREAM_MAX_FLIGHTS", "20"))
+AVAILABILITY_STREAM_HEARTBEAT = int(os.getenv("AVAILABILITY_STREAM_HEARTBEAT", "15"))
+AVAILABILITY_STREAM_QUEUE_SIZE = int(os.getenv("AVAILABILITY_STREAM_QUEUE_SIZE", "100"))
+
+# See air_service.occupancy: booking changes folded into the load-factor
+# totals per compaction run.
+OCCUPANCY_COMPACT_BATCH_SIZE = int(os.getenv("OCCUPANCY_COMPACT_BATCH_SIZE", "500"))
+
+# See air_service.schedules.
+SCHEDULE_EXPANSION_BATCH_SIZE = int(os.getenv("SCHEDULE_EXPANSION_BATCH_SIZE", "1000"))
+SCHEDULE_MAX_DAYS = int(os.getenv("SCHEDULE_MAX_DAYS", "400"))
+
+# See air_service.bulk.
+BULK_MAX_ROWS = int(os.getenv("BULK_MAX_ROWS", "1000"))
+BULK_BATCH_SIZE = int(os.getenv("BULK_BATCH_SIZE", "500"))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
@@ -197,14 +309,20 @@ REST_FRAMEWORK = {
         "air_service.permissions.IsAdminAllORIsAuthenticatedOrReadOnly",
     ],
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "user.authentication.CachedJWTAuthentication",
     ],
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
     "DEFAULT_THROTTLE_CLASSES": [
-        "rest_framework.throttling.AnonRateThrottle",
-        "rest_framework.throttling.UserRateThrottle",
+        "air_service.throttling.AnonTokenBucketThrottle",
+        "air_service.throttling.UserTokenBucketThrottle",
+        "air_service.throttling.ScopedTokenBucketThrottle",
     ],
-    "DEFAULT_THROTTLE_RATES": {"anon": "100/day", "user": "1000/day"},
+    "DEFAULT_THROTTLE_RATES": {
+        "anon": "100/day",
+        "user": "1000/day",
+        "order_create": "20/min",
+        "flight_search": "120/min",
+    },
     "DEFAULT_FILTER_BACKENDS": [
         "django_filters.rest_framework.DjangoFilterBackend",
         "rest_framework.filters.SearchFilter",
@@ -214,6 +332,28 @@ REST_FRAMEWORK = {
     "PAGE_SIZE": 30,
 }
 
+# Seconds an authenticated user stays cached, shared (Django cache) and per
+# process; see user.authentication.
+AUTH_USER_CACHE_TTL = int(os.getenv("AUTH_USER_CACHE_TTL", "300"))
+AUTH_USER_CACHE_LOCAL_TTL = float(os.getenv("AUTH_USER_CACHE_LOCAL_TTL", "5"))
+TOKEN_REVOCATION_SYNC_INTERVAL = float(
+    os.getenv("TOKEN_REVOCATION_SYNC_INTERVAL", "1")
+)
+TOKEN_REVOCATION_REBUILD_INTERVAL = int(
+    os.getenv("TOKEN_REVOCATION_REBUILD_INTERVAL", "3600")
+)
+TOKEN_REVOCATION_BLOOM_CAPACITY = int(
+    os.getenv("TOKEN_REVOCATION_BLOOM_CAPACITY", "100000")
+)
+TOKEN_REVOCATION_BLOOM_ERROR_RATE = 0.001
+
+THROTTLE_ENABLED = os.getenv("THROTTLE_ENABLED", "true").lower() == "true"
+# Buckets in the shared memory limiter used without Redis (24 bytes each).
+THROTTLE_SHARED_SLOTS = int(os.getenv("THROTTLE_SHARED_SLOTS", "65536"))
+# File the workers of one deployment map to share those buckets. Unset, they
+# live in anonymous memory, shared only with workers forked after creation.
+THROTTLE_SHARED_PATH = os.getenv("THROTTLE_SHARED_PATH", "")
+
 SPECTACULAR_SETTINGS = {
     "TITLE": "Airport service API",
     "DESCRIPTION": "Order tickets for your air trips",
@@ -236,5 +376,3 @@ SIMPLE_JWT = {
 DEFAULT_FROM_EMAIL = os.environ.get("DEFAULT_FROM_EMAIL")
 
 SENDGRID_API_KEY = os.environ.get("SENDGRID_API_KEY")
-
-SENDGRID_CLIENT = SendGridAPIClient(SENDGRID_API_KEY)
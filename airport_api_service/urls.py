@@ -16,8 +16,6 @@ Including another URLconf
 """
 
 from django.conf import settings
-from django.conf.urls.static import static
-
 from django.contrib import admin
 from django.urls import path, include
 from drf_spectacular.views import (
@@ -26,6 +24,8 @@ from drf_spectacular.views import (
     SpectacularRedocView,
 )
 
+from air_service.media_views import MediaView
+
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("api/v1/air_services/", include("air_service.urls", namespace="air-service")),
@@ -42,4 +42,9 @@ urlpatterns = [
         name="redoc",
     ),
     path("prometheus/", include("django_prometheus.urls")),
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    path(
+        f"{settings.MEDIA_URL.strip('/')}/<path:path>",
+        MediaView.as_view(),
+        name="media",
+    ),
+]
@@ -0,0 +1,164 @@
+import threading
+import time
+from functools import partial
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from user.revocation import get_revocation
+
+# Bump when the cached fields change, so entries of the old shape are not
+# read back after a deploy.
+USER_CACHE_VERSION = 2
+
+# What authentication, permission checks and the /users/me/ profile read.
+# Other fields of a cached user are loaded from the database when accessed.
+CACHED_FIELDS = (
+    "id",
+    "email",
+    "first_name",
+    "last_name",
+    "is_active",
+    "is_staff",
+    "is_superuser",
+)
+
+
+class UserCache:
+    """
+    Two-level cache of authenticated users: a short-lived in-process dict in
+    front of the Django cache (Redis when ``USE_REDIS`` is on).
+
+    Entries hold ``CACHED_FIELDS`` and a digest of the password, never the
+    password hash. Their key includes a per-user generation: ``invalidate``
+    increments it, which also supersedes an entry a concurrent request
+    stores from a row it read before the change. Other processes may serve
+    their local copy for up to ``AUTH_USER_CACHE_LOCAL_TTL`` seconds.
+    """
+
+    def __init__(self):
+        self._local: dict = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(user_id, generation) -> str:
+        return f"auth-user:{user_id}:{generation}"
+
+    @staticmethod
+    def generation_key(user_id) -> str:
+        return f"auth-user-generation:{user_id}"
+
+    def generation(self, user_id):
+        key = self.generation_key(user_id)
+        generation = cache.get(key, version=USER_CACHE_VERSION)
+        if generation is None:
+            # Never set or expired: a value no earlier generation had.
+            cache.add(
+                key,
+                time.time_ns(),
+                settings.AUTH_USER_CACHE_TTL,
+                version=USER_CACHE_VERSION,
+            )
+            generation = cache.get(key, version=USER_CACHE_VERSION)
+        return generation
+
+    def get(self, user_id, load) -> tuple:
+        """``(user, password_digest)``, calling ``load()`` on a miss."""
+        now = time.monotonic()
+        entry = self._local.get(user_id)
+        if entry is not None and entry[0] > now:
+            return self._build(entry[1])
+
+        key = self.key(user_id, self.generation(user_id))
+        values = cache.get(key, version=USER_CACHE_VERSION)
+        if values is None:
+            user = load()
+            values = (
+                {field: getattr(user, field) for field in CACHED_FIELDS},
+                get_md5_hash_password(user.password),
+            )
+            cache.set(
+                key, values, settings.AUTH_USER_CACHE_TTL, version=USER_CACHE_VERSION
+            )
+        with self._lock:
+            self._local[user_id] = (now + settings.AUTH_USER_CACHE_LOCAL_TTL, values)
+        # A new instance every time, so concurrent requests never share one.
+        return self._build(values)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._local.pop(user_id, None)
+        try:
+            cache.incr(self.generation_key(user_id), version=USER_CACHE_VERSION)
+        except ValueError:
+            # No generation stored, the next read starts a new one.
+            pass
+
+    def clear(self):
+        with self._lock:
+            self._local.clear()
+
+    @staticmethod
+    def _build(values) -> tuple:
+        fields, password_digest = values
+        model = get_user_model()
+        # from_db() takes the loaded values in field order.
+        names = [
+            field.attname
+            for field in model._meta.concrete_fields
+            if field.attname in fields
+        ]
+        user = model.from_db(
+            DEFAULT_DB_ALIAS, names, [fields[name] for name in names]
+        )
+        return user, password_digest
+
+
+user_cache = UserCache()
+
+
+def invalidate_user(user_id):
+    """Drop a user now and again after commit, when a racing read may have
+    cached the old row."""
+    user_cache.invalidate(user_id)
+    transaction.on_commit(lambda: user_cache.invalidate(user_id))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    ``JWTAuthentication`` that resolves the token's user from ``user_cache``
+    instead of querying the database on every request, and rejects revoked
+    tokens.
+    """
+
+    def get_validated_token(self, raw_token):
+        token = super().get_validated_token(raw_token)
+        if get_revocation().is_revoked(token):
+            raise InvalidToken(_("Token has been revoked"))
+        return token
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        user, password_digest = user_cache.get(
+            user_id, partial(super().get_user, validated_token)
+        )
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        if api_settings.CHECK_REVOKE_TOKEN and validated_token.get(
+            api_settings.REVOKE_TOKEN_CLAIM
+        ) != password_digest:
+            raise AuthenticationFailed(
+                _("The user's password has been changed."), code="password_changed"
+            )
+        return user
@@ -0,0 +1,22 @@
+# Generated by Django 5.1.1 on 2026-10-19 12:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("user", "0002_alter_user_managers_remove_user_username_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RevocationEntry",
+            fields=[
+                ("id", models.BigAutoField(primary_key=True, serialize=False)),
+                ("member", models.CharField(max_length=255)),
+                ("created", models.FloatField(db_index=True)),
+                ("expires", models.FloatField(db_index=True)),
+            ],
+        ),
+    ]
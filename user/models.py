@@ -3,11 +3,33 @@ from django.db import models
 from django.utils.translation import gettext as _
 
 
+class UserQuerySet(models.QuerySet):
+    def update(self, **kwargs):
+        """
+        ``update`` sends no signals: drop the updated users from the
+        authentication cache here, so that deactivating or demoting users
+        in bulk takes effect right away.
+        """
+        # Imported here, user.authentication loads the User model.
+        from user.authentication import invalidate_user
+
+        user_ids = list(self.values_list("pk", flat=True))
+        rows = super().update(**kwargs)
+        for user_id in user_ids:
+            invalidate_user(user_id)
+        return rows
+
+    update.alters_data = True
+
+
 class UserManager(DjangoUserManger):
     """Define a model manager for User model with no username field."""
 
     use_in_migrations = True
 
+    def get_queryset(self):
+        return UserQuerySet(self.model, using=self._db)
+
     def _create_user(self, email, password, **extra_fields):
         """Create and save a User with the given email and password."""
         if not email:
@@ -45,3 +67,19 @@ class User(AbstractUser):
     REQUIRED_FIELDS = []
 
     objects = UserManager()
+
+
+class RevocationEntry(models.Model):
+    """
+    Revocation log used without Redis, replayed by every process, see
+    user.revocation. Times are Unix timestamps.
+    """
+
+    id = models.BigAutoField(primary_key=True)
+    # "jti:<jti>" or "user:<user id>:<watermark>"
+    member = models.CharField(max_length=255)
+    created = models.FloatField(db_index=True)
+    expires = models.FloatField(db_index=True)
+
+    def __str__(self) -> str:
+        return self.member
@@ -0,0 +1,284 @@
+"""
+JWT revocation without a database query per request.
+
+Two kinds of entries are kept, each expiring with the tokens it covers:
+
+* revoked JTIs (``/users/logout/``), kept until the token's own ``exp``;
+* per-user watermarks (``/users/logout_all/``): tokens of that user issued
+  before the watermark are invalid. Kept for the longest token lifetime.
+
+With Redis the entries are shared keys plus a sorted-set change log that
+every process replays into an in-process Bloom filter (JTIs) and dict
+(watermarks) at most every ``TOKEN_REVOCATION_SYNC_INTERVAL`` seconds. A
+check is then a Bloom filter probe and a dict lookup; Redis is only asked
+when the filter says "maybe". Without Redis the log is the
+``RevocationEntry`` table, replayed the same way into a dict of JTIs.
+"""
+import hashlib
+import logging
+import math
+import threading
+import time
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import DatabaseError
+from rest_framework_simplejwt.settings import api_settings
+
+from user.models import RevocationEntry
+
+logger = logging.getLogger(__name__)
+
+CLOCK_SKEW_SECONDS = 5
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings, sized for ``capacity`` entries."""
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.size = max(
+            8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        )
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray(math.ceil(self.size / 8))
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        for index in range(self.hashes):
+            yield (first + index * second) % self.size
+
+    def add(self, item: str):
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(
+            self._bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(item)
+        )
+
+    def clear(self):
+        self._bits[:] = bytes(len(self._bits))
+
+
+def max_token_lifetime() -> int:
+    return math.ceil(
+        max(
+            api_settings.ACCESS_TOKEN_LIFETIME,
+            api_settings.REFRESH_TOKEN_LIFETIME,
+        ).total_seconds()
+    )
+
+
+class TokenRevocation:
+    """
+    Revocation state of one process, shared through ``redis`` or, without
+    it, the database.
+
+    Revocations made by another process are seen after the next sync, so a
+    revoked token may still be accepted elsewhere for up to
+    ``TOKEN_REVOCATION_SYNC_INTERVAL`` seconds.
+    """
+
+    jti_key = "revoked:jti:{}"
+    user_key = "revoked:user:{}"
+    log_key = "revoked:log"
+
+    def __init__(self, redis=None, clock=time.time):
+        self.redis = redis
+        self.clock = clock
+        self._bloom = BloomFilter(
+            settings.TOKEN_REVOCATION_BLOOM_CAPACITY,
+            settings.TOKEN_REVOCATION_BLOOM_ERROR_RATE,
+        )
+        # jti -> expiry, used instead of the Bloom filter without Redis.
+        self._jtis: dict[str, float] = {}
+        # user id -> (watermark, expiry)
+        self._watermarks: dict[str, tuple[int, float]] = {}
+        self._lock = threading.Lock()
+        self._synced_until = None
+        self._next_sync = 0.0
+        self._next_rebuild = 0.0
+
+    def revoke_token(self, token):
+        """Revoke one token until it expires on its own."""
+        jti = token[api_settings.JTI_CLAIM]
+        expires = token["exp"]
+        now = self.clock()
+        if expires <= now:
+            return
+        with self._lock:
+            if self.redis is None:
+                self._jtis = {
+                    key: expiry for key, expiry in self._jtis.items() if expiry > now
+                }
+                self._jtis[jti] = expires
+            else:
+                self._bloom.add(jti)
+        if self.redis is None:
+            self._log_to_database(f"jti:{jti}", now, expires)
+            return
+        pipe = self.redis.pipeline()
+        pipe.set(self.jti_key.format(jti), 1, ex=math.ceil(expires - now))
+        pipe.zadd(self.log_key, {f"jti:{jti}": now})
+        pipe.zremrangebyscore(self.log_key, "-inf", now - max_token_lifetime())
+        pipe.execute()
+
+    def revoke_user(self, user_id):
+        """Revoke every token of ``user_id`` issued before now."""
+        now = self.clock()
+        # ``iat`` has second precision: tokens issued in the current second,
+        # e.g. by logging in right after logging out everywhere, stay valid.
+        watermark = int(now)
+        lifetime = max_token_lifetime()
+        with self._lock:
+            self._remember_watermark(str(user_id), watermark, now + lifetime)
+        if self.redis is None:
+            self._log_to_database(
+                f"user:{user_id}:{watermark}", now, now + lifetime
+            )
+        else:
+            pipe = self.redis.pipeline()
+            pipe.set(self.user_key.format(user_id), watermark, ex=lifetime)
+            pipe.zadd(self.log_key, {f"user:{user_id}:{watermark}": now})
+            pipe.zremrangebyscore(self.log_key, "-inf", now - lifetime)
+            pipe.execute()
+
+    def is_revoked(self, token) -> bool:
+        self.sync()
+        now = self.clock()
+
+        user_id = token.get(api_settings.USER_ID_CLAIM)
+        entry = self._watermarks.get(str(user_id))
+        if entry is not None and entry[1] > now and token.get("iat", 0) < entry[0]:
+            return True
+
+        jti = token.get(api_settings.JTI_CLAIM)
+        if self.redis is None:
+            return self._jtis.get(jti, 0) > now
+        if jti is None or jti not in self._bloom:
+            return False
+        try:
+            return bool(self.redis.exists(self.jti_key.format(jti)))
+        except Exception:
+            logger.exception("Revocation store failed, rejecting possibly revoked token")
+            return True
+
+    def sync(self, force: bool = False):
+        """Replay revocations logged by other processes since the last sync."""
+        now = self.clock()
+        if not force and now < self._next_sync:
+            return
+        self._next_sync = now + settings.TOKEN_REVOCATION_SYNC_INTERVAL
+        if self.redis is None:
+            self._sync_database(now)
+            return
+
+        lifetime = max_token_lifetime()
+        rebuild = now >= self._next_rebuild
+        if rebuild or self._synced_until is None:
+            since = now - lifetime
+        else:
+            # Scores come from each writer's clock; re-reading a few seconds
+            # is harmless and covers small clock differences.
+            since = self._synced_until - CLOCK_SKEW_SECONDS
+        try:
+            entries = self.redis.zrangebyscore(
+                self.log_key, since, "+inf", withscores=True
+            )
+        except Exception:
+            # Keep serving from what this process already knows.
+            logger.exception("Revocation store failed, skipping sync")
+            return
+
+        if rebuild:
+            # Expired JTIs cannot be removed from a Bloom filter, so it is
+            # rebuilt from the log, which only holds live entries. Filled
+            # before it replaces the old one, checks meanwhile use the old.
+            bloom = BloomFilter(
+                settings.TOKEN_REVOCATION_BLOOM_CAPACITY,
+                settings.TOKEN_REVOCATION_BLOOM_ERROR_RATE,
+            )
+        else:
+            bloom = self._bloom
+        watermarks = []
+        for member, score in entries:
+            if isinstance(member, bytes):
+                member = member.decode()
+            kind, _, value = member.partition(":")
+            if kind == "jti":
+                bloom.add(value)
+            elif kind == "user":
+                user_id, _, watermark = value.rpartition(":")
+                watermarks.append((user_id, int(watermark), score + lifetime))
+
+        with self._lock:
+            if rebuild:
+                self._bloom = bloom
+                self._watermarks = {
+                    user_id: entry
+                    for user_id, entry in self._watermarks.items()
+                    if entry[1] > now
+                }
+                self._next_rebuild = now + settings.TOKEN_REVOCATION_REBUILD_INTERVAL
+            for user_id, watermark, expires in watermarks:
+                self._remember_watermark(user_id, watermark, expires)
+            self._synced_until = now
+
+    def _sync_database(self, now: float):
+        if self._synced_until is None:
+            since = now - max_token_lifetime()
+        else:
+            # Entries commit in any order; re-read a few seconds as above.
+            since = self._synced_until - CLOCK_SKEW_SECONDS
+        try:
+            entries = list(
+                RevocationEntry.objects.filter(
+                    created__gte=since, expires__gt=now
+                ).values_list("member", "expires")
+            )
+        except DatabaseError:
+            logger.exception("Revocation store failed, skipping sync")
+            return
+
+        with self._lock:
+            self._jtis = {
+                jti: expiry for jti, expiry in self._jtis.items() if expiry > now
+            }
+            for member, expires in entries:
+                kind, _, value = member.partition(":")
+                if kind == "jti":
+                    self._jtis[value] = expires
+                elif kind == "user":
+                    user_id, _, watermark = value.rpartition(":")
+                    self._remember_watermark(user_id, int(watermark), expires)
+            self._synced_until = now
+
+    def _log_to_database(self, member: str, now: float, expires: float):
+        RevocationEntry.objects.filter(expires__lte=now).delete()
+        RevocationEntry.objects.create(member=member, created=now, expires=expires)
+
+    def clear(self):
+        with self._lock:
+            self._bloom.clear()
+            self._jtis.clear()
+            self._watermarks.clear()
+            self._synced_until = None
+            self._next_sync = self._next_rebuild = 0.0
+
+    def _remember_watermark(self, user_id, watermark, expires):
+        # Callers hold self._lock.
+        current = self._watermarks.get(user_id)
+        if current is None or current[0] < watermark:
+            self._watermarks[user_id] = (watermark, expires)
+
+
+@lru_cache(maxsize=None)
+def get_revocation() -> TokenRevocation:
+    if settings.USE_REDIS:
+        from django_redis import get_redis_connection
+
+        return TokenRevocation(get_redis_connection("default"))
+    return TokenRevocation()
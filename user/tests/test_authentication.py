@@ -0,0 +1,145 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.tokens import AccessToken
+
+from user.authentication import (
+    USER_CACHE_VERSION,
+    CachedJWTAuthentication,
+    UserCache,
+    user_cache,
+)
+from user.revocation import get_revocation
+
+ME_URL = reverse("users:manage-user")
+LOCMEM_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+}
+
+
+@override_settings(TOKEN_REVOCATION_SYNC_INTERVAL=60)
+class CachedJWTAuthenticationTests(TestCase):
+    def setUp(self):
+        user_cache.clear()
+        # Revocations are read once per interval, not counted below.
+        get_revocation().sync(force=True)
+        self.user = get_user_model().objects.create_user(
+            email="test@test.com", password="testpass"
+        )
+        self.token = str(AccessToken.for_user(self.user))
+        self.authentication = CachedJWTAuthentication()
+
+    def authenticate(self):
+        request = APIRequestFactory().get(
+            "/", HTTP_AUTHORIZATION=f"Bearer {self.token}"
+        )
+        return self.authentication.authenticate(request)[0]
+
+    def test_user_is_loaded_once(self):
+        with self.assertNumQueries(1):
+            self.authenticate()
+        with self.assertNumQueries(0):
+            user = self.authenticate()
+
+        self.assertEqual(user.pk, self.user.pk)
+
+    def test_cached_user_is_a_copy(self):
+        self.authenticate().first_name = "changed"
+        self.assertEqual(self.authenticate().first_name, "")
+
+    def test_save_invalidates(self):
+        self.authenticate()
+        self.user.is_staff = True
+        self.user.save()
+
+        with self.assertNumQueries(1):
+            self.assertTrue(self.authenticate().is_staff)
+
+    def test_deactivated_user_is_rejected(self):
+        self.authenticate()
+        self.user.is_active = False
+        self.user.save()
+
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_queryset_update_invalidates(self):
+        self.authenticate()
+
+        get_user_model().objects.filter(pk=self.user.pk).update(is_active=False)
+
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_deleted_user_is_rejected(self):
+        self.authenticate()
+        self.user.delete()
+
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_profile_update_invalidates(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.token}")
+        client.get(ME_URL)
+
+        res = client.patch(ME_URL, {"first_name": "Taras"})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        self.assertEqual(client.get(ME_URL).data["first_name"], "Taras")
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class SharedUserCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        user_cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.com", password="testpass"
+        )
+        self.token = str(AccessToken.for_user(self.user))
+
+    def authenticate(self):
+        # A fresh process every time: only the shared cache is reused.
+        user_cache.clear()
+        request = APIRequestFactory().get(
+            "/", HTTP_AUTHORIZATION=f"Bearer {self.token}"
+        )
+        return CachedJWTAuthentication().authenticate(request)[0]
+
+    def test_password_hash_is_not_cached(self):
+        self.authenticate()
+
+        fields, _ = cache.get(
+            UserCache.key(self.user.pk, user_cache.generation(self.user.pk)),
+            version=USER_CACHE_VERSION,
+        )
+        self.assertNotIn("password", fields)
+        self.assertNotIn(self.user.password, fields.values())
+
+    def test_row_read_before_a_change_is_not_served(self):
+        get_user = JWTAuthentication.get_user
+
+        def get_user_then_deactivate(authentication, token):
+            # Read before the deactivation commits, cached after it.
+            user = get_user(authentication, token)
+            with self.captureOnCommitCallbacks(execute=True):
+                get_user_model().objects.filter(pk=self.user.pk).update(
+                    is_active=False
+                )
+            return user
+
+        with mock.patch.object(
+            JWTAuthentication, "get_user", get_user_then_deactivate
+        ):
+            self.assertTrue(self.authenticate().is_active)
+
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
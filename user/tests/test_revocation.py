@@ -0,0 +1,274 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from user.authentication import user_cache
+from user.models import RevocationEntry
+from user.revocation import (
+    BloomFilter,
+    TokenRevocation,
+    get_revocation,
+    max_token_lifetime,
+)
+
+ME_URL = reverse("users:manage-user")
+LOGOUT_URL = reverse("users:logout")
+LOGOUT_ALL_URL = reverse("users:logout-all")
+REFRESH_URL = reverse("users:token_refresh")
+VERIFY_URL = reverse("users:token_verify")
+
+
+class FakeRedis:
+    """The few commands TokenRevocation uses, with a controllable clock."""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.keys = {}
+        self.log = {}
+        self.calls = []
+
+    def pipeline(self):
+        return self
+
+    def execute(self):
+        pass
+
+    def set(self, key, value, ex):
+        self.keys[key] = (value, self.clock() + ex)
+
+    def exists(self, key):
+        self.calls.append(("exists", key))
+        entry = self.keys.get(key)
+        return int(entry is not None and entry[1] > self.clock())
+
+    def zadd(self, key, mapping):
+        self.log.update(mapping)
+
+    def zremrangebyscore(self, key, low, high):
+        self.log = {member: score for member, score in self.log.items() if score > high}
+
+    def zrangebyscore(self, key, low, high, withscores):
+        self.calls.append(("zrangebyscore", low))
+        return [
+            (member.encode(), score)
+            for member, score in sorted(self.log.items(), key=lambda item: item[1])
+            if score >= low
+        ]
+
+
+class BloomFilterTests(TestCase):
+    def test_added_items_are_found(self):
+        bloom = BloomFilter(1000, 0.001)
+        for index in range(1000):
+            bloom.add(f"jti-{index}")
+
+        self.assertTrue(all(f"jti-{index}" in bloom for index in range(1000)))
+
+    def test_false_positive_rate(self):
+        bloom = BloomFilter(1000, 0.01)
+        for index in range(1000):
+            bloom.add(f"jti-{index}")
+
+        false_positives = sum(f"other-{index}" in bloom for index in range(10000))
+        self.assertLess(false_positives, 300)
+
+
+class SharedTokenRevocationTests(TestCase):
+    def setUp(self):
+        self.now = timezone.now().timestamp()
+        self.redis = FakeRedis(lambda: self.now)
+        self.writer = TokenRevocation(self.redis, clock=lambda: self.now)
+        self.reader = TokenRevocation(self.redis, clock=lambda: self.now)
+        self.user = get_user_model().objects.create_user(
+            email="test@test.com", password="testpass"
+        )
+
+    def test_revoked_token_is_seen_by_other_processes_after_sync(self):
+        token = AccessToken.for_user(self.user)
+        self.assertFalse(self.reader.is_revoked(token))
+
+        self.writer.revoke_token(token)
+
+        self.assertTrue(self.writer.is_revoked(token))
+        self.now += 2
+        self.assertTrue(self.reader.is_revoked(token))
+
+    def test_valid_token_is_checked_in_memory(self):
+        self.writer.revoke_token(AccessToken.for_user(self.user))
+        token = AccessToken.for_user(self.user)
+        self.reader.sync(force=True)
+        self.redis.calls.clear()
+
+        self.assertFalse(self.reader.is_revoked(token))
+        self.assertEqual(self.redis.calls, [])
+
+    def test_revoked_token_expires_with_the_token(self):
+        token = AccessToken.for_user(self.user)
+        self.writer.revoke_token(token)
+
+        self.now = token["exp"] + 1
+        self.assertFalse(self.writer.is_revoked(token))
+
+    def test_user_watermark(self):
+        old = AccessToken.for_user(self.user)
+        old.set_iat(at_time=timezone.now() - timedelta(minutes=1))
+
+        self.writer.revoke_user(self.user.pk)
+        self.now += 2
+
+        self.assertTrue(self.reader.is_revoked(old))
+        self.assertFalse(self.reader.is_revoked(AccessToken.for_user(self.user)))
+
+    def test_sync_reads_only_new_entries(self):
+        self.reader.sync(force=True)
+        first = self.redis.calls[-1][1]
+        self.now += 10
+        self.reader.sync(force=True)
+
+        self.assertGreater(self.redis.calls[-1][1], first)
+
+    def test_rebuild_swaps_in_a_filled_filter(self):
+        token = AccessToken.for_user(self.user)
+        self.writer.revoke_token(token)
+        self.reader.sync(force=True)
+        old = self.reader._bloom
+
+        self.now += settings.TOKEN_REVOCATION_REBUILD_INTERVAL + 1
+        self.reader.sync()
+
+        self.assertIsNot(self.reader._bloom, old)
+        self.assertIn(token[api_settings.JTI_CLAIM], old)
+        self.assertTrue(self.reader.is_revoked(token))
+
+
+class DatabaseTokenRevocationTests(TestCase):
+    """Without Redis, other processes replay the RevocationEntry table."""
+
+    def setUp(self):
+        self.now = timezone.now().timestamp()
+        self.writer = TokenRevocation(clock=lambda: self.now)
+        self.reader = TokenRevocation(clock=lambda: self.now)
+        self.user = get_user_model().objects.create_user(
+            email="test@test.com", password="testpass"
+        )
+
+    def test_revoked_token_is_seen_by_other_processes_after_sync(self):
+        token = AccessToken.for_user(self.user)
+        self.assertFalse(self.reader.is_revoked(token))
+
+        self.writer.revoke_token(token)
+
+        self.assertTrue(self.writer.is_revoked(token))
+        self.now += 2
+        self.assertTrue(self.reader.is_revoked(token))
+        self.now = token["exp"] + 1
+        self.assertFalse(self.reader.is_revoked(token))
+
+    def test_user_watermark(self):
+        old = AccessToken.for_user(self.user)
+        old.set_iat(at_time=timezone.now() - timedelta(minutes=1))
+        self.reader.sync(force=True)
+
+        self.writer.revoke_user(self.user.pk)
+        self.now += 2
+
+        self.assertTrue(self.reader.is_revoked(old))
+        self.assertFalse(self.reader.is_revoked(AccessToken.for_user(self.user)))
+
+    def test_expired_entries_are_deleted(self):
+        self.writer.revoke_token(AccessToken.for_user(self.user))
+        self.now += max_token_lifetime() + 1
+
+        self.writer.revoke_user(self.user.pk)
+
+        self.assertEqual(RevocationEntry.objects.count(), 1)
+
+
+class LogoutApiTests(TestCase):
+    def setUp(self):
+        get_revocation().clear()
+        user_cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.com", password="testpass"
+        )
+        self.refresh = RefreshToken.for_user(self.user)
+        self.access = self.refresh.access_token
+
+    def authorize(self, token):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    def test_logout_revokes_access_and_refresh_token(self):
+        self.authorize(self.access)
+        res = self.client.post(LOGOUT_URL, {"refresh": str(self.refresh)})
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+
+        self.assertEqual(
+            self.client.get(ME_URL).status_code, status.HTTP_401_UNAUTHORIZED
+        )
+        self.client.credentials()
+        res = self.client.post(REFRESH_URL, {"refresh": str(self.refresh)})
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        res = self.client.post(VERIFY_URL, {"token": str(self.access)})
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_logout_keeps_other_sessions(self):
+        self.authorize(self.access)
+        self.client.post(LOGOUT_URL)
+
+        self.authorize(AccessToken.for_user(self.user))
+        self.assertEqual(self.client.get(ME_URL).status_code, status.HTTP_200_OK)
+
+    def test_logout_rejects_refresh_token_of_another_user(self):
+        other = get_user_model().objects.create_user(
+            email="other@test.com", password="testpass"
+        )
+        self.authorize(self.access)
+
+        res = self.client.post(
+            LOGOUT_URL, {"refresh": str(RefreshToken.for_user(other))}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_logout_all_revokes_earlier_tokens(self):
+        issued = timezone.now() - timedelta(minutes=1)
+        self.refresh.set_iat(at_time=issued)
+        self.access.set_iat(at_time=issued)
+        self.authorize(self.access)
+
+        res = self.client.post(LOGOUT_ALL_URL)
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+
+        self.assertEqual(
+            self.client.get(ME_URL).status_code, status.HTTP_401_UNAUTHORIZED
+        )
+        self.client.credentials()
+        res = self.client.post(REFRESH_URL, {"refresh": str(self.refresh)})
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        self.authorize(AccessToken.for_user(self.user))
+        self.assertEqual(self.client.get(ME_URL).status_code, status.HTTP_200_OK)
+
+    def test_revocation_check_does_not_query_the_database(self):
+        self.authorize(self.access)
+        self.client.get(ME_URL)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(ME_URL).status_code, status.HTTP_200_OK)
+
+    def test_expired_local_entries_are_dropped(self):
+        revocation = TokenRevocation(clock=lambda: self.access["exp"] + 1)
+        revocation._jtis["stale"] = self.access["exp"]
+
+        revocation.revoke_token(RefreshToken.for_user(self.user))
+
+        self.assertNotIn("stale", revocation._jtis)
@@ -1,11 +1,14 @@
 from django.urls import path
-from rest_framework_simplejwt.views import (
-    TokenObtainPairView,
-    TokenRefreshView,
-    TokenVerifyView
-)
+from rest_framework_simplejwt.views import TokenObtainPairView
 
-from user.views import CreateUserView, ManageUserView
+from user.views import (
+    CreateUserView,
+    LogoutAllView,
+    LogoutView,
+    ManageUserView,
+    RevocableTokenRefreshView,
+    RevocableTokenVerifyView,
+)
 
 app_name = "users"
 
@@ -13,6 +16,16 @@ urlpatterns = [
     path("register/", CreateUserView.as_view(), name="create"),
     path("me/", ManageUserView.as_view(), name="manage-user"),
     path('token/', TokenObtainPairView.as_view(), name="token_obtain_pair"),
-    path('token/refresh/', TokenRefreshView.as_view(), name="token_refresh"),
-    path('token/verify/', TokenVerifyView.as_view(), name="token_verify"),
+    path(
+        'token/refresh/',
+        RevocableTokenRefreshView.as_view(),
+        name="token_refresh"
+    ),
+    path(
+        'token/verify/',
+        RevocableTokenVerifyView.as_view(),
+        name="token_verify"
+    ),
+    path("logout/", LogoutView.as_view(), name="logout"),
+    path("logout_all/", LogoutAllView.as_view(), name="logout-all"),
 ]
@@ -1,7 +1,17 @@
-from rest_framework import generics
-from rest_framework.permissions import IsAuthenticated
+from django.contrib.auth import get_user_model
+from rest_framework import generics, status
+from rest_framework.permissions import IsAuthenticated, SAFE_METHODS
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from rest_framework_simplejwt.views import TokenRefreshView, TokenVerifyView
 
-from user.serializers import UserSerializer
+from user.revocation import get_revocation
+from user.serializers import (
+    LogoutSerializer,
+    RevocableTokenRefreshSerializer,
+    RevocableTokenVerifySerializer,
+    UserSerializer,
+)
 
 
 class CreateUserView(generics.CreateAPIView):
@@ -14,4 +24,43 @@ class ManageUserView(generics.RetrieveUpdateAPIView):
     permission_classes = [IsAuthenticated, ]
 
     def get_object(self):
-        return self.request.user
+        if self.request.method in SAFE_METHODS:
+            return self.request.user
+        # request.user may come from the authentication cache, updates
+        # start from the current row.
+        return get_user_model().objects.get(pk=self.request.user.pk)
+
+
+class RevocableTokenRefreshView(TokenRefreshView):
+    serializer_class = RevocableTokenRefreshSerializer
+
+
+class RevocableTokenVerifyView(TokenVerifyView):
+    serializer_class = RevocableTokenVerifySerializer
+
+
+class LogoutView(generics.GenericAPIView):
+    """Revoke the access token of the request and, if given, a refresh token."""
+
+    serializer_class = LogoutSerializer
+    permission_classes = [IsAuthenticated, ]
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        revocation = get_revocation()
+        revocation.revoke_token(request.auth)
+        if serializer.validated_data.get("refresh"):
+            revocation.revoke_token(serializer.validated_data["refresh"])
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class LogoutAllView(APIView):
+    """Revoke every token issued to the user so far, on all devices."""
+
+    permission_classes = [IsAuthenticated, ]
+
+    def post(self, request, *args, **kwargs):
+        get_revocation().revoke_user(request.user.pk)
+        return Response(status=status.HTTP_204_NO_CONTENT)